@@ -6,6 +6,7 @@ Usa a nova experiencia Foundry (azure-ai-projects 2.x + OpenAI Responses API).
 Uso:
     python test_agent.py
     python test_agent.py --agent-name fin-market-declarative
+    python test_agent.py --stream   # imprime a resposta conforme chega (+ TTFT)
 
 Exemplos de perguntas:
     - Qual e a cotacao da PETR4?
@@ -16,6 +17,7 @@ Exemplos de perguntas:
 import argparse
 import os
 import sys
+import time
 
 from azure.ai.projects import AIProjectClient
 from azure.identity import DefaultAzureCredential
@@ -30,7 +32,39 @@ DEFAULT_ENDPOINT = os.environ.get(
 DEFAULT_AGENT_NAME = "fin-market-declarative"
 
 
-def test_agent(endpoint, agent_name):
+def stream_response(openai_client, conversation_id, agent_name, user_input):
+    """Envia a mensagem com stream=True e imprime o texto conforme chega.
+
+    Retorna (TTFT em s ou None, tempo total em s).
+    """
+    started = time.perf_counter()
+    ttft = None
+    events = openai_client.responses.create(
+        conversation=conversation_id,
+        extra_body={
+            "agent": {
+                "name": agent_name,
+                "type": "agent_reference",
+            }
+        },
+        input=user_input,
+        stream=True,
+    )
+    for event in events:
+        if event.type == "response.output_text.delta":
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            print(event.delta, end="", flush=True)
+        elif event.type == "response.failed":
+            # O erro vem na resposta, nao no evento
+            error = event.response.error
+            raise RuntimeError(error.message if error else "resposta falhou")
+        elif event.type == "error":
+            raise RuntimeError(event.message)
+    return ttft, time.perf_counter() - started
+
+
+def test_agent(endpoint, agent_name, stream=False):
     """Testa o agente declarativo via Responses API."""
     credential = DefaultAzureCredential()
     project_client = AIProjectClient(
@@ -61,6 +95,15 @@ def test_agent(endpoint, agent_name):
         print("\nAgente: ", end="", flush=True)
 
         try:
+            if stream:
+                ttft, total = stream_response(
+                    openai_client, conversation.id, agent_name, user_input
+                )
+                first = f"{ttft:.2f}s" if ttft is not None else "-"
+                print(f"\n\n⏱️  TTFT {first} | total {total:.2f}s")
+                print("\n" + "─" * 60 + "\n")
+                continue
+
             # Enviar mensagem via Responses API com agent_reference
             response = openai_client.responses.create(
                 conversation=conversation.id,
@@ -90,9 +133,14 @@ def main():
     parser.add_argument(
         "--agent-name", default=DEFAULT_AGENT_NAME, help="Nome do agente"
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Imprime a resposta conforme chega e mede TTFT e tempo total",
+    )
     args = parser.parse_args()
 
-    test_agent(args.endpoint, args.agent_name)
+    test_agent(args.endpoint, args.agent_name, stream=args.stream)
 
 
 if __name__ == "__main__":
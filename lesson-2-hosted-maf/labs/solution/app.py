@@ -125,18 +125,19 @@ _project_root = os.path.dirname(os.path.abspath(__file__))
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
-from src.agent.finance_agent import create_finance_agent  # noqa: E402
+from src.agent.lifecycle import agent_lifecycle  # noqa: E402
 from azure.ai.agentserver.agentframework import AgentFrameworkAIAgentAdapter  # noqa: E402
 
 
 async def main():
     """Inicia o agente como HTTP server."""
-    agent, credential = await create_finance_agent()
+    # Cria agente/credencial uma vez, aquece o token e mantem-no renovado
+    agent = await agent_lifecycle.get_agent()
     try:
         adapter = AgentFrameworkAIAgentAdapter(agent)
         await adapter.run_async()
     finally:
-        await credential.close()
+        await agent_lifecycle.aclose()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 """Modulo do agente baseado no Microsoft Agent Framework."""
 
 from src.agent.finance_agent import create_finance_agent
+from src.agent.lifecycle import FinanceAgentLifecycle, agent_lifecycle
 
-__all__ = ["create_finance_agent"]
+__all__ = ["create_finance_agent", "FinanceAgentLifecycle", "agent_lifecycle"]
@@ -9,7 +9,17 @@ from agent_framework.azure import AzureAIClient
 from azure.identity.aio import DefaultAzureCredential
 from opentelemetry import trace
 
-from tools.finance_tools import get_stock_quote, get_exchange_rate, get_market_summary
+from tools.finance_tools import (
+    get_stock_quote,
+    get_stock_quotes,
+    get_exchange_rate,
+    get_market_summary,
+    get_top_movers,
+    get_sector_performance,
+    get_price_history,
+    get_indicators,
+    get_portfolio_risk,
+)
 
 tracer = trace.get_tracer(__name__)
 
@@ -31,9 +41,18 @@ SYSTEM_PROMPT = (
     "constitui recomendacao de investimento'\n"
     "- Formate valores no padrao brasileiro (R$ 1.234,56)\n"
     "- Seja objetivo e direto nas respostas\n"
+    "- Para comparar varias acoes, use get_stock_quotes com todos os tickers em uma unica chamada\n"
+    "- Para maiores altas/quedas e desempenho por setor, use get_top_movers e get_sector_performance\n"
+    "- Para desempenho historico (ex: ultimo mes), use get_price_history\n"
+    "- Para medias moveis, RSI e volatilidade, use get_indicators (nao calcule de cabeca)\n"
+    "- Para valor total e risco (VaR) de uma carteira, use get_portfolio_risk\n"
 )
 
-TOOLS = [get_stock_quote, get_exchange_rate, get_market_summary]
+TOOLS = [
+    get_stock_quote, get_stock_quotes, get_exchange_rate, get_market_summary,
+    get_top_movers, get_sector_performance, get_price_history,
+    get_indicators, get_portfolio_risk,
+]
 
 
 async def create_finance_agent():
@@ -0,0 +1,105 @@
+"""
+Ciclo de vida do agente de mercado financeiro no processo.
+
+Credencial, AzureAIClient e agente sao criados uma unica vez e reutilizados
+por todas as requisicoes. No startup o cache de tokens e aquecido e uma
+task em background renova o token antes de expirar, para que nenhuma
+requisicao pague a aquisicao de token no caminho critico.
+"""
+
+import asyncio
+import logging
+import time
+
+from opentelemetry import trace
+
+from src.agent.finance_agent import create_finance_agent
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Escopo usado pelo AzureAIClient para chamar o Foundry
+TOKEN_SCOPE = "https://ai.azure.com/.default"
+
+# Renovar o token com esta antecedencia (s) em relacao a expiracao
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_RETRY_INTERVAL = 30
+
+
+class FinanceAgentLifecycle:
+    """Mantem agente, client e credencial vivos durante todo o processo."""
+
+    def __init__(self):
+        self._agent = None
+        self._credential = None
+        self._loop = None
+        self._refresh_task = None
+        self._lock = None
+        self._lock_loop = None
+
+    async def get_agent(self):
+        """Retorna o agente, criando-o na primeira chamada."""
+        loop = asyncio.get_running_loop()
+        if self._agent is None or self._loop is not loop:
+            async with self._get_lock(loop):
+                if self._agent is None or self._loop is not loop:
+                    await self._start(loop)
+        return self._agent
+
+    def _get_lock(self, loop):
+        # Criado no primeiro uso e por event loop: a instancia e construida no
+        # import, e um asyncio.Lock disputado em outro loop levanta RuntimeError
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    async def start(self):
+        """Cria o agente e aquece o cache de tokens (chamar no startup)."""
+        await self.get_agent()
+
+    async def _start(self, loop):
+        if self._loop is not None and self._loop is not loop:
+            # Recursos presos a um event loop anterior nao podem ser reutilizados
+            logger.warning("Event loop mudou; recriando agente e credencial.")
+            self._agent = self._credential = self._refresh_task = None
+
+        with tracer.start_as_current_span("agent_lifecycle_start"):
+            agent, credential = await create_finance_agent()
+            token = await credential.get_token(TOKEN_SCOPE)
+
+        self._agent, self._credential, self._loop = agent, credential, loop
+        self._refresh_task = asyncio.create_task(self._refresh_token_loop(token.expires_on))
+        logger.info("Agente criado e cache de tokens aquecido.")
+
+    async def _refresh_token_loop(self, expires_on: float):
+        """Renova o token antes da expiracao, fora do caminho das requisicoes."""
+        while True:
+            await asyncio.sleep(
+                max(expires_on - time.time() - TOKEN_REFRESH_MARGIN, TOKEN_RETRY_INTERVAL)
+            )
+            try:
+                token = await self._credential.get_token(TOKEN_SCOPE)
+                expires_on = token.expires_on
+            except Exception as exc:
+                logger.warning("Falha ao renovar token: %s", exc)
+                expires_on = time.time() + TOKEN_REFRESH_MARGIN + TOKEN_RETRY_INTERVAL
+
+    async def aclose(self):
+        """Hook de shutdown: encerra a renovacao, o agente e a credencial."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+        agent, credential = self._agent, self._credential
+        self._agent = self._credential = self._refresh_task = self._loop = None
+
+        if agent is not None and hasattr(agent, "__aexit__"):
+            try:
+                await agent.__aexit__(None, None, None)
+            except Exception as exc:
+                logger.warning("Falha ao encerrar agente: %s", exc)
+        if credential is not None:
+            await credential.close()
+
+
+# Instancia unica por processo
+agent_lifecycle = FinanceAgentLifecycle()
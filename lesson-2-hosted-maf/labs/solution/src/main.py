@@ -1,13 +1,15 @@
 """
 Entrypoint do agente de mercado financeiro.
-Expoe a funcao run() que e chamada pelo Agent Server HTTP ou diretamente.
+Expoe a funcao run() que e chamada pelo Agent Server HTTP ou diretamente,
+e run_stream() para consumir a resposta em streaming.
 Habilita OpenTelemetry com Azure Monitor para observabilidade.
 """
 
 import asyncio
 import os
 import sys
-from typing import Optional
+import time
+from typing import AsyncIterator, Optional
 
 from dotenv import load_dotenv
 from opentelemetry import trace
@@ -28,40 +30,78 @@ _project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
-from src.agent.finance_agent import create_finance_agent
+from src.agent.lifecycle import agent_lifecycle
 
 
-async def run(user_input: str, thread_id: Optional[str] = None) -> str:
+async def run_stream(
+    user_input: str, thread_id: Optional[str] = None
+) -> AsyncIterator[str]:
     """
-    Entrypoint principal do agente.
+    Entrypoint de streaming do agente: gera os trechos da resposta a
+    medida que chegam do modelo.
+
+    Registra no span agent_run o tempo ate o primeiro chunk e a taxa de
+    chunks por segundo.
 
     Args:
         user_input: Mensagem do usuario.
         thread_id: ID de thread existente para manter contexto (opcional).
 
-    Returns:
-        Resposta do agente como string.
+    Yields:
+        Trechos de texto da resposta do agente.
     """
     with tracer.start_as_current_span("agent_run") as span:
         span.set_attribute("user_input", user_input)
         span.set_attribute("thread_id", thread_id or "new")
 
-        agent, credential = await create_finance_agent()
+        # Agente, client e credencial sao criados uma unica vez por processo
+        agent = await agent_lifecycle.get_agent()
 
-        try:
-            if thread_id:
-                # Reutilizar thread existente
-                thread = agent.get_thread(thread_id)
-            else:
-                thread = agent.get_new_thread()
+        if thread_id:
+            # Reutilizar thread existente
+            thread = agent.get_thread(thread_id)
+        else:
+            thread = agent.get_new_thread()
 
-            response_text = ""
+        started = time.perf_counter()
+        first_chunk_at = None
+        chunk_count = 0
+        response_length = 0
+        try:
             async for chunk in agent.run_stream(user_input, thread=thread):
-                if chunk.text:
-                    response_text += chunk.text
+                if not chunk.text:
+                    continue
+                if first_chunk_at is None:
+                    first_chunk_at = time.perf_counter()
+                    span.set_attribute(
+                        "time_to_first_chunk_ms", (first_chunk_at - started) * 1000
+                    )
+                chunk_count += 1
+                response_length += len(chunk.text)
+                yield chunk.text
+        finally:
+            span.set_attribute("chunk_count", chunk_count)
+            span.set_attribute("response_length", response_length)
+            if first_chunk_at is not None:
+                elapsed = time.perf_counter() - first_chunk_at
+                if elapsed > 0:
+                    span.set_attribute("chunks_per_second", chunk_count / elapsed)
 
-            span.set_attribute("response_length", len(response_text))
-            return response_text
 
-        finally:
-            await credential.close()
+async def run(user_input: str, thread_id: Optional[str] = None) -> str:
+    """
+    Entrypoint principal do agente.
+
+    Args:
+        user_input: Mensagem do usuario.
+        thread_id: ID de thread existente para manter contexto (opcional).
+
+    Returns:
+        Resposta do agente como string.
+    """
+    return "".join([chunk async for chunk in run_stream(user_input, thread_id)])
+
+
+async def shutdown() -> None:
+    """Libera agente e credencial compartilhados (chamar ao encerrar o processo)."""
+    await agent_lifecycle.aclose()
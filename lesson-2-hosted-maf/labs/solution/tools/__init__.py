@@ -1,9 +1,25 @@
 """Tools expostas como funcoes-ferramenta do agente."""
 
-from tools.finance_tools import get_stock_quote, get_exchange_rate, get_market_summary
+from tools.finance_tools import (
+    get_stock_quote,
+    get_stock_quotes,
+    get_exchange_rate,
+    get_market_summary,
+    get_top_movers,
+    get_sector_performance,
+    get_price_history,
+    get_indicators,
+    get_portfolio_risk,
+)
 
 __all__ = [
     "get_stock_quote",
+    "get_stock_quotes",
     "get_exchange_rate",
     "get_market_summary",
+    "get_top_movers",
+    "get_sector_performance",
+    "get_price_history",
+    "get_indicators",
+    "get_portfolio_risk",
 ]
@@ -2,65 +2,147 @@
 Funcoes-ferramenta de mercado financeiro para o agente.
 Estas funcoes sao expostas como tools do Microsoft Agent Framework.
 Em producao, conectariam a APIs reais (ex.: B3, Yahoo Finance).
+Cotacoes e cambio vem do snapshot compartilhado em tools/market_data.py.
 """
 
 from typing import Annotated
 from random import uniform, choice
 
+from tools.market_data import get_snapshot
+from tools.price_history import describe_history
+from tools.indicators import describe_indicators
+from tools.portfolio import describe_portfolio
+
 
 def get_stock_quote(
-    ticker: Annotated[str, "Codigo da acao, ex: PETR4, VALE3, ITUB4, AAPL, MSFT"],
+    ticker: Annotated[str, "Codigo ou nome da empresa, ex: PETR4, Petrobras, Itau, AAPL"],
 ) -> str:
     """Retorna a cotacao atual de uma acao da B3 ou mercado internacional."""
-    # Simulacao - em producao, conectar a uma API real
-    prices = {
-        "PETR4": ("Petrobras PN", uniform(28.0, 42.0), "BRL"),
-        "VALE3": ("Vale ON", uniform(55.0, 80.0), "BRL"),
-        "ITUB4": ("Itau Unibanco PN", uniform(25.0, 38.0), "BRL"),
-        "BBDC4": ("Bradesco PN", uniform(12.0, 18.0), "BRL"),
-        "WEGE3": ("WEG ON", uniform(35.0, 55.0), "BRL"),
-        "AAPL": ("Apple Inc", uniform(150.0, 220.0), "USD"),
-        "MSFT": ("Microsoft Corp", uniform(350.0, 450.0), "USD"),
-        "GOOGL": ("Alphabet Inc", uniform(130.0, 180.0), "USD"),
-    }
-
-    ticker_upper = ticker.upper().strip()
-    if ticker_upper in prices:
-        name, price, currency = prices[ticker_upper]
-        change = uniform(-3.0, 3.0)
-        symbol = "R$" if currency == "BRL" else "$"
-        direction = "alta" if change > 0 else "queda"
+    # Simulacao - em producao, o snapshot viria de uma API real (ver market_data)
+    quote = get_snapshot().quote(ticker)
+    if quote is not None:
+        symbol = "R$" if quote.currency == "BRL" else "$"
+        direction = "alta" if quote.change > 0 else "queda"
         return (
-            f"{ticker_upper} ({name}): {symbol} {price:.2f} | "
-            f"Variacao: {change:+.2f}% ({direction})"
+            f"{quote.ticker} ({quote.name}): {symbol} {quote.price:.2f} | "
+            f"Variacao: {quote.change:+.2f}% ({direction})"
+        )
+
+    return f"Ticker '{ticker.upper().strip()}' nao encontrado. Tente PETR4, VALE3, ITUB4, AAPL, MSFT, etc."
+
+
+def get_stock_quotes(
+    tickers: Annotated[list[str], "Lista de codigos ou nomes de empresas, ex: [PETR4, Vale, Itau]"],
+) -> str:
+    """Retorna as cotacoes de varias acoes em uma unica chamada (use para comparar acoes)."""
+    if not tickers:
+        return "Nenhum ticker informado."
+
+    lines = ["Ticker | Nome | Preco | Variacao"]
+    missing = []
+    for ticker, quote in zip(tickers, get_snapshot().quotes(tickers)):
+        if quote is None:
+            missing.append(ticker.upper().strip())
+            continue
+        symbol = "R$" if quote.currency == "BRL" else "$"
+        lines.append(
+            f"{quote.ticker} | {quote.name} | {symbol} {quote.price:.2f} | {quote.change:+.2f}%"
+        )
+
+    if missing:
+        lines.append(f"Nao encontrados: {', '.join(missing)}")
+    return "\n".join(lines)
+
+
+# Mercado informado pelo usuario -> moeda das acoes no snapshot
+MARKET_CURRENCIES = {"b3": "BRL", "brasil": "BRL", "br": "BRL", "eua": "USD", "us": "USD", "usa": "USD"}
+
+
+def get_top_movers(
+    direction: Annotated[str, "alta (maiores altas) ou queda (maiores quedas)"] = "alta",
+    market: Annotated[str, "Mercado: b3, eua ou todos"] = "todos",
+    sector: Annotated[str, "Setor opcional, ex: Financeiro, Saude, Petroleo e Gas"] = "",
+    limit: Annotated[int, "Quantidade de acoes (1 a 20)"] = 5,
+) -> str:
+    """Lista as maiores altas ou quedas do dia entre centenas de acoes da B3 e dos EUA."""
+    snapshot = get_snapshot()
+    losers = direction.lower().strip().startswith(("q", "b", "l"))  # queda/baixa/losers
+    currency = MARKET_CURRENCIES.get(market.lower().strip())
+    sector_name = None
+    if sector.strip():
+        sector_name = snapshot.resolve_sector(sector)
+        if sector_name is None:
+            sectors = ", ".join(st.sector for st in snapshot.sector_stats())
+            return f"Setor '{sector}' nao encontrado. Setores disponiveis: {sectors}."
+
+    movers = snapshot.top_movers(max(1, min(limit, 20)), losers, sector_name, currency)
+    scope = ", ".join(filter(None, [market.upper() if currency else "", sector_name or ""]))
+    title = "Maiores quedas" if losers else "Maiores altas"
+    lines = [f"{title}{f' ({scope})' if scope else ''}:"]
+    for quote in movers:
+        symbol = "R$" if quote.currency == "BRL" else "$"
+        lines.append(
+            f"{quote.ticker} | {quote.name} | {symbol} {quote.price:.2f} | {quote.change:+.2f}%"
         )
+    return "\n".join(lines)
 
-    return f"Ticker '{ticker_upper}' nao encontrado. Tente PETR4, VALE3, ITUB4, AAPL, MSFT, etc."
+
+def get_sector_performance() -> str:
+    """Retorna o desempenho medio do dia por setor, com a maior alta e a maior queda de cada um."""
+    lines = ["Setor | Acoes | Variacao media | Altas/Quedas | Maior alta | Maior queda"]
+    for st in get_snapshot().sector_stats():
+        lines.append(
+            f"{st.sector} | {st.count} | {st.avg_change:+.2f}% | {st.advancers}/{st.decliners} | "
+            f"{st.best.ticker} {st.best.change:+.2f}% | {st.worst.ticker} {st.worst.change:+.2f}%"
+        )
+    return "\n".join(lines)
+
+
+def get_price_history(
+    ticker: Annotated[str, "Ticker ou nome da empresa, ex: VALE3, Petrobras, AAPL"],
+    start: Annotated[str, "Data inicial AAAA-MM-DD ou periodo ate a data final, ex: 5d, 1m, 6m, 1y"] = "1m",
+    end: Annotated[str, "Data final AAAA-MM-DD; vazio para o ultimo pregao"] = "",
+    interval: Annotated[str, "Intervalo: 1d (diario), 1wk (semanal) ou 1mo (mensal)"] = "1d",
+) -> str:
+    """Retorna o historico de precos (OHLC) de uma acao em um periodo."""
+    return describe_history(ticker, start, end, interval)
+
+
+def get_indicators(
+    tickers: Annotated[list[str], "Lista de codigos ou nomes de empresas, ex: [PETR4, Vale, AAPL]"],
+    indicators: Annotated[list[str] | None, "Indicadores: sma, ema, rsi, vol; vazio para todos"] = None,
+    window: Annotated[int, "Janela em pregoes, ex: 9, 14, 20, 50"] = 20,
+) -> str:
+    """Calcula indicadores tecnicos (SMA, EMA, RSI, volatilidade) de varias acoes em uma unica chamada."""
+    return describe_indicators(tickers, indicators, window)
+
+
+async def get_portfolio_risk(
+    holdings: Annotated[str, "Posicoes em texto, ex: 100 PETR4, 50 AAPL, 2000 USD"],
+    base_currency: Annotated[str, "Moeda de referencia, ex: BRL, USD, EUR"] = "BRL",
+    confidence: Annotated[float, "Nivel de confianca do VaR, ex: 0.95, 0.99"] = 0.95,
+    horizon_days: Annotated[int, "Horizonte do VaR em pregoes"] = 1,
+) -> str:
+    """Avalia uma carteira com moedas diferentes e calcula o VaR (historico e Monte Carlo)."""
+    return await describe_portfolio(holdings, base_currency, confidence, horizon_days)
 
 
 def get_exchange_rate(
-    pair: Annotated[str, "Par de moedas, ex: USD/BRL, EUR/BRL, GBP/BRL"],
+    pair: Annotated[str, "Par de moedas, inclusive cruzados e inversos, ex: USD/BRL, EUR/USD, BRL/USD"],
 ) -> str:
     """Retorna a taxa de cambio atual para um par de moedas."""
-    rates = {
-        "USD/BRL": uniform(4.80, 5.50),
-        "EUR/BRL": uniform(5.20, 6.10),
-        "GBP/BRL": uniform(6.00, 7.00),
-        "USD/EUR": uniform(0.85, 0.95),
-        "BTC/USD": uniform(40000.0, 70000.0),
-    }
-
-    pair_upper = pair.upper().strip().replace(" ", "")
-    if pair_upper in rates:
-        rate = rates[pair_upper]
-        change = uniform(-1.5, 1.5)
-        direction = "valorizacao" if change > 0 else "desvalorizacao"
+    snapshot = get_snapshot()
+    rate = snapshot.fx(pair)
+    if rate is not None:
+        direction = "valorizacao" if rate.change > 0 else "desvalorizacao"
         return (
-            f"{pair_upper}: {rate:.4f} | "
-            f"Variacao: {change:+.2f}% ({direction})"
+            f"{rate.pair}: {rate.rate:.4f} | "
+            f"Variacao: {rate.change:+.2f}% ({direction})"
         )
 
-    return f"Par '{pair_upper}' nao encontrado. Pares disponiveis: USD/BRL, EUR/BRL, GBP/BRL, USD/EUR, BTC/USD."
+    pair_upper = pair.upper().strip().replace(" ", "")
+    currencies = ", ".join(snapshot.fx_matrix.currencies)
+    return f"Par '{pair_upper}' nao encontrado. Moedas disponiveis (qualquer combinacao): {currencies}."
 
 
 def get_market_summary(
@@ -0,0 +1,217 @@
+"""
+Indicadores tecnicos (SMA, EMA, RSI, volatilidade) calculados com NumPy
+sobre o historico local de precos (tools/price_history.py).
+
+Os fechamentos dos tickers pedidos sao empilhados em uma matriz
+(tickers x pregoes, alinhada a direita e completada com NaN a esquerda),
+e cada indicador e uma operacao vetorizada sobre o eixo do tempo:
+
+- SMA: media dos ultimos `window` fechamentos;
+- EMA e RSI (suavizacao de Wilder): medias com pesos exponenciais,
+  calculadas como um produto matriz x vetor em vez de um laco por pregao;
+- volatilidade: desvio padrao dos log-retornos, anualizado (252 pregoes).
+
+Os resultados ficam em cache por (ticker, janela, data e versao do
+snapshot); quando a data vira ou uma nova versao do snapshot e publicada,
+o cache e descartado, junto com o historico simulado que o originou.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import numpy as np
+
+from tools.market_data import get_snapshot
+from tools.price_history import CLOSE, get_store, synthetic_stamp
+
+INDICATOR_CACHE_SIZE = int(os.getenv("INDICATOR_CACHE_SIZE", "4096"))
+DEFAULT_WINDOW = 20
+MAX_WINDOW = 200
+TRADING_DAYS = 252
+# Pregoes usados nas medias exponenciais, em multiplos da janela: o peso
+# descartado fica abaixo de 0.3% mesmo na suavizacao de Wilder (1/window)
+LOOKBACK_FACTOR = 6
+
+INDICATORS = ("sma", "ema", "rsi", "vol")
+ALIASES = {
+    "mm": "sma", "mms": "sma", "media": "sma", "media movel": "sma",
+    "mme": "ema", "media exponencial": "ema",
+    "ifr": "rsi",
+    "volatilidade": "vol", "volatility": "vol",
+}
+
+# Colunas de uma linha de resultado
+LAST, SMA, EMA, RSI, VOL = range(5)
+
+
+def parse_indicators(names: Optional[Iterable[str]]) -> tuple:
+    """(indicadores reconhecidos, nomes desconhecidos); vazio = todos."""
+    selected, unknown = [], []
+    for name in names or ():
+        key = name.lower().strip()
+        key = ALIASES.get(key, key)
+        if key in INDICATORS:
+            if key not in selected:
+                selected.append(key)
+        elif key:
+            unknown.append(name)
+    return (selected or list(INDICATORS)), unknown
+
+
+def _weighted(values: np.ndarray, alpha: float) -> np.ndarray:
+    """Media exponencial por linha, ignorando NaN (pesos (1-alpha)^idade)."""
+    weights = (1.0 - alpha) ** np.arange(values.shape[1] - 1, -1, -1)
+    mask = ~np.isnan(values)
+    return (np.where(mask, values, 0.0) @ weights) / (mask @ weights)
+
+
+def compute(closes: np.ndarray, window: int) -> np.ndarray:
+    """Indicadores para uma matriz (k, n) de fechamentos; devolve (k, 5).
+
+    Cada linha precisa de pelo menos window + 1 fechamentos validos.
+    """
+    diff = np.diff(closes, axis=1)
+    gain = _weighted(np.clip(diff, 0.0, None), 1.0 / window)
+    loss = _weighted(np.clip(-diff, 0.0, None), 1.0 / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / loss), 100.0)
+
+    log_returns = np.diff(np.log(closes[:, -(window + 1):]), axis=1)
+    return np.column_stack([
+        closes[:, -1],
+        closes[:, -window:].mean(axis=1),
+        _weighted(closes, 2.0 / (window + 1)),
+        rsi,
+        log_returns.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS) * 100,
+    ])
+
+
+class IndicatorEngine:
+    """Calcula indicadores em lote e guarda cada linha por (ticker, janela, versao).
+
+    A versao e o carimbo (data, versao do snapshot) do historico de precos.
+    """
+
+    def __init__(self, max_entries: int = INDICATOR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[tuple, Optional[np.ndarray]]" = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def rows(self, tickers: list, window: int) -> dict:
+        """{ticker: linha (5,)} ou None para tickers com historico insuficiente."""
+        version = synthetic_stamp()
+        result, misses = {}, []
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            for ticker in tickers:
+                key = (ticker, window, version)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    result[ticker] = self._cache[key]
+                elif ticker not in misses:
+                    misses.append(ticker)
+        if not misses:
+            return result
+
+        computed = self._compute(misses, window)
+        with self._lock:
+            for ticker, row in computed.items():
+                result[ticker] = row
+                if self._version == version:
+                    self._cache[(ticker, window, version)] = row
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _compute(tickers: list, window: int) -> dict:
+        store = get_store()
+        lookback = LOOKBACK_FACTOR * window + 1
+        tails, result = {}, {}
+        for ticker in tickers:
+            table = store.series(ticker)
+            if table is None or table.shape[1] < window + 1:
+                result[ticker] = None
+            else:
+                tails[ticker] = table[CLOSE, -lookback:]
+        if not tails:
+            return result
+
+        width = max(len(tail) for tail in tails.values())
+        closes = np.full((len(tails), width), np.nan)
+        for i, tail in enumerate(tails.values()):
+            closes[i, width - len(tail):] = tail
+        for ticker, row in zip(tails, compute(closes, window)):
+            result[ticker] = row
+        return result
+
+
+def describe_indicators(tickers: list, indicators: Optional[list] = None,
+                        window: int = DEFAULT_WINDOW) -> str:
+    """Tabela de indicadores para varios tickers, em texto compacto para o LLM."""
+    if not tickers:
+        return "Nenhum ticker informado."
+    selected, unknown = parse_indicators(indicators)
+    if unknown:
+        return (
+            f"Indicador(es) desconhecido(s): {', '.join(unknown)}. "
+            f"Disponiveis: sma, ema, rsi, vol (volatilidade)."
+        )
+    window = max(2, min(int(window), MAX_WINDOW))
+
+    quotes, missing = [], []
+    for ticker, quote in zip(tickers, get_snapshot().quotes(tickers)):
+        if quote is None:
+            missing.append(ticker.upper().strip())
+        else:
+            quotes.append(quote)
+    rows = get_engine().rows([q.ticker for q in quotes], window)
+
+    labels = {"sma": f"SMA{window}", "ema": f"EMA{window}",
+              "rsi": f"RSI{window}", "vol": f"Vol{window} a.a."}
+    lines = [
+        f"Indicadores tecnicos (janela de {window} pregoes):",
+        " | ".join(["Ticker", "Moeda", "Fechamento"] + [labels[k] for k in selected]),
+    ]
+    short = []
+    for quote in quotes:
+        row = rows.get(quote.ticker)
+        if row is None:
+            short.append(quote.ticker)
+            continue
+        cells = [quote.ticker, quote.currency, f"{row[LAST]:.2f}"]
+        for key in selected:
+            if key == "rsi":
+                cells.append(f"{row[RSI]:.1f}")
+            elif key == "vol":
+                cells.append(f"{row[VOL]:.1f}%")
+            else:
+                cells.append(f"{row[SMA if key == 'sma' else EMA]:.2f}")
+        lines.append(" | ".join(cells))
+
+    if "rsi" in selected:
+        lines.append("RSI acima de 70: sobrecomprado; abaixo de 30: sobrevendido.")
+    if short:
+        lines.append(f"Historico insuficiente: {', '.join(short)}")
+    if missing:
+        lines.append(f"Nao encontrados: {', '.join(missing)}")
+    return "\n".join(lines)
+
+
+# =============================================================
+# Engine do processo
+# =============================================================
+
+_engine: Optional[IndicatorEngine] = None
+
+
+def get_engine() -> IndicatorEngine:
+    global _engine
+    if _engine is None:
+        _engine = IndicatorEngine()
+    return _engine
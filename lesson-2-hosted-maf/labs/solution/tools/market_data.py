@@ -0,0 +1,533 @@
+"""
+Snapshot de dados de mercado compartilhado pelas tools do agente.
+
+Carrega uma unica vez por processo um snapshot imutavel e versionado de
+cotacoes e taxas de cambio. As tools consultam o snapshot atual em O(1)
+(dict ticker -> indice sobre arrays compactos) em vez de reconstruir uma
+tabela de precos a cada chamada.
+
+Cada snapshot traz tambem um TickerIndex, que resolve nomes de empresas,
+apelidos e prefixos ("Petrobras", "itau", "Itau Unibanco") para o ticker,
+sem diferenciar acentos e maiusculas.
+
+O snapshot padrao cobre algumas centenas de acoes da B3 e dos EUA
+(market_universe.csv, com setor); alem das cotacoes, cada snapshot
+pre-calcula agregados por setor e responde top-k de altas/quedas
+(top_movers) com heap, sem ordenar o universo inteiro.
+
+Os pares de cambio listados formam uma FxMatrix (moeda x moeda): qualquer
+par cruzado ou inverso (EUR/USD, BRL/USD, GBP/EUR) e triangulado pelo
+pivo USD e respondido com um unico lookup.
+
+Um novo snapshot (ex.: carregado de um feed real) pode ser publicado com
+swap_snapshot(); a troca e atomica, e quem ja obteve o snapshot anterior
+continua lendo uma versao consistente ate terminar.
+
+Opcionalmente, MARKET_DATA_PATH aponta para um JSON no formato:
+
+    {
+      "version": 2,
+      "as_of": "2025-01-15T18:00:00Z",
+      "quotes": [["PETR4", "Petrobras PN", "BRL", 38.72, 1.23, "Petroleo e Gas"], ...],
+      "fx": [["USD/BRL", 5.12, -0.35], ...]
+    }
+
+O setor (ultimo campo de cada cotacao) e opcional.
+"""
+
+import csv
+import heapq
+import json
+import logging
+import os
+import random
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Dados simulados para fins educativos: (ticker, nome, moeda, preco, variacao %)
+DEFAULT_QUOTES = (
+    ("PETR4", "Petrobras PN", "BRL", 38.72, 1.23),
+    ("VALE3", "Vale ON", "BRL", 61.45, -0.87),
+    ("ITUB4", "Itau Unibanco PN", "BRL", 32.18, 0.45),
+    ("BBDC4", "Bradesco PN", "BRL", 13.95, -0.32),
+    ("WEGE3", "WEG ON", "BRL", 41.30, 2.15),
+    ("AAPL", "Apple Inc", "USD", 228.50, 1.85),
+    ("MSFT", "Microsoft Corp", "USD", 445.20, 3.12),
+    ("GOOGL", "Alphabet Inc", "USD", 178.90, -1.45),
+    ("AMZN", "Amazon.com Inc", "USD", 198.75, 2.30),
+    ("NVDA", "NVIDIA Corp", "USD", 142.60, 5.40),
+)
+
+# Universo padrao (ticker;nome;moeda;setor). Acoes fora de DEFAULT_QUOTES
+# recebem preco e variacao simulados, deterministicos por ticker.
+UNIVERSE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_universe.csv")
+
+# (par, taxa, variacao %)
+DEFAULT_FX = (
+    ("USD/BRL", 5.12, -0.35),
+    ("EUR/BRL", 5.58, -0.18),
+    ("GBP/BRL", 6.48, 0.12),
+    ("USD/EUR", 0.9176, -0.17),
+    ("BTC/USD", 67842.50, 2.45),
+    ("ETH/USD", 3456.80, 1.87),
+)
+
+
+# Apelidos alem dos derivados automaticamente (ticker, nome, primeira palavra
+# do nome e raiz do ticker): nome popular -> ticker
+DEFAULT_ALIASES = {
+    "Google": "GOOGL",
+    "Vale do Rio Doce": "VALE3",
+    "Banco Itau": "ITUB4",
+    "Banco Bradesco": "BBDC4",
+}
+
+# Palavras comuns (ou genericas) que nao viram apelido automatico, mesmo
+# sendo a primeira palavra do nome ou a raiz do ticker ("vamos", "azul")
+ALIAS_STOPWORDS = frozenset({
+    "AGRO", "AMERICAN", "ANIMA", "AZUL", "BANCO", "BANK", "BOA", "CAIXA", "CASAS",
+    "CASH", "CRUZEIRO", "EVEN", "GENERAL", "GOL", "GRUPO", "HOME", "INDUSTRIAS",
+    "INTER", "LEVE", "LOJAS", "MERCADO", "MOVE", "PLANO", "PORTO", "POSITIVO",
+    "QUAL", "REDE", "SANTOS", "SAO", "SER", "SMART", "SOJA", "TEND", "TRES",
+    "VAMOS", "VIVA",
+})
+
+# Prefixos menores que isso nao sao resolvidos (muito ambiguos)
+MIN_PREFIX_LENGTH = 3
+
+_NOT_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+
+@lru_cache(maxsize=4096)
+def fold(text: str) -> str:
+    """Chave de busca: maiusculas, sem acentos, so letras e digitos."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NOT_ALNUM.sub("", text.upper())
+
+
+class TickerIndex:
+    """Indice ticker/nome/apelido -> ticker, montado uma vez por snapshot.
+
+    Chaves exatas ficam em um dict; para prefixos, as mesmas chaves ficam
+    em uma lista ordenada e a busca e uma bisseccao. Chaves (ou prefixos)
+    que apontam para mais de um ticker nao sao resolvidas.
+    """
+
+    __slots__ = ("_exact", "_keys", "_values")
+
+    def __init__(self, tickers: Iterable[str], names: Iterable[str], aliases: Optional[dict] = None):
+        exact: dict = {}
+
+        def add(alias: str, ticker: str, derived: bool = False) -> None:
+            key = fold(alias)
+            if not key or (derived and key in ALIAS_STOPWORDS):
+                return
+            if exact.setdefault(key, ticker) != ticker:
+                exact[key] = None  # ambiguo
+
+        tickers = tuple(tickers)
+        for ticker, name in zip(tickers, names):
+            add(name, ticker)
+            add(name.split()[0] if name.split() else "", ticker, derived=True)
+            add(ticker.rstrip("0123456789"), ticker, derived=True)
+        for alias, ticker in (aliases if aliases is not None else DEFAULT_ALIASES).items():
+            if ticker in tickers:
+                add(alias, ticker)
+        # O proprio ticker sempre vence apelidos
+        for ticker in tickers:
+            exact[fold(ticker)] = ticker
+
+        self._exact = exact
+        self._keys = sorted(exact)
+        self._values = tuple(exact[k] for k in self._keys)
+
+    def resolve(self, query: str, prefixes: bool = True) -> Optional[str]:
+        """Ticker para um ticker, nome, apelido ou prefixo; None se ambiguo ou ausente."""
+        key = fold(query)
+        if not key:
+            return None
+        if key in self._exact:
+            return self._exact[key]
+        if not prefixes or len(key) < MIN_PREFIX_LENGTH:
+            return None
+        lo = bisect_left(self._keys, key)
+        hi = bisect_left(self._keys, key + "~", lo)  # "~" > qualquer [A-Z0-9]
+        matches = set(self._values[lo:hi])
+        return matches.pop() if len(matches) == 1 and None not in matches else None
+
+
+class Quote:
+    """Cotacao de uma acao (registro compacto, somente leitura)."""
+
+    __slots__ = ("ticker", "name", "currency", "price", "change", "sector")
+
+    def __init__(
+        self, ticker: str, name: str, currency: str, price: float, change: float, sector: str = "",
+    ):
+        self.ticker = ticker
+        self.name = name
+        self.currency = currency
+        self.price = price
+        self.change = change
+        self.sector = sector
+
+    def __repr__(self):
+        return f"Quote({self.ticker!r}, {self.currency} {self.price:.2f}, {self.change:+.2f}%)"
+
+
+class FxRate:
+    """Taxa de cambio de um par de moedas (registro compacto, somente leitura)."""
+
+    __slots__ = ("pair", "rate", "change")
+
+    def __init__(self, pair: str, rate: float, change: float):
+        self.pair = pair
+        self.rate = rate
+        self.change = change
+
+    def __repr__(self):
+        return f"FxRate({self.pair!r}, {self.rate:.4f}, {self.change:+.2f}%)"
+
+
+class FxMatrix:
+    """Taxas de cambio entre todas as moedas do snapshot (matriz moeda x moeda).
+
+    Cada moeda ligada ao pivo por uma cadeia de pares listados recebe seu
+    valor em unidades do pivo; a matriz inteira e uma unica divisao
+    vetorizada (valor[i] / valor[j]), cobrindo pares cruzados e inversos.
+    A mesma conta sobre as taxas anteriores (taxa / (1 + variacao)) da a
+    variacao de cada par derivado. Moedas sem caminho ate o pivo ficam
+    de fora.
+    """
+
+    __slots__ = ("currencies", "_index", "matrix", "previous")
+
+    def __init__(self, pairs: Iterable[str], rates: Iterable[float],
+                 changes: Iterable[float], pivot: str = "USD"):
+        links: dict = {}  # moeda -> [(outra moeda, taxa, taxa anterior)]
+        for pair, rate, change in zip(pairs, rates, changes):
+            base, _, quote = pair.partition("/")
+            if not quote or rate <= 0:
+                continue
+            previous = rate / (1 + change / 100)
+            links.setdefault(base, []).append((quote, rate, previous))
+            links.setdefault(quote, []).append((base, 1 / rate, 1 / previous))
+        if pivot not in links:
+            pivot = next(iter(links), pivot)
+
+        # Busca em largura a partir do pivo: 1 moeda = taxa outra
+        values = {pivot: (1.0, 1.0)}
+        queue = [pivot]
+        for currency in queue:
+            value, previous = values[currency]
+            for other, rate, prev_rate in links.get(currency, ()):
+                if other not in values:
+                    values[other] = (value / rate, previous / prev_rate)
+                    queue.append(other)
+
+        self.currencies = tuple(values) if links else ()
+        self._index = {c: i for i, c in enumerate(self.currencies)}
+        current = np.array([values[c][0] for c in self.currencies])
+        before = np.array([values[c][1] for c in self.currencies])
+        self.matrix = current[:, None] / current[None, :]
+        self.previous = before[:, None] / before[None, :]
+
+    def rate(self, base: str, quote: str) -> Optional[tuple]:
+        """(taxa, variacao %) de base em quote, ou None se alguma moeda faltar."""
+        i, j = self._index.get(base), self._index.get(quote)
+        if i is None or j is None:
+            return None
+        rate = float(self.matrix[i, j])
+        return rate, (rate / float(self.previous[i, j]) - 1) * 100
+
+    def rates_to(self, currencies: Iterable[str], quote: str) -> np.ndarray:
+        """Taxa de cada moeda em quote (NaN para moedas desconhecidas)."""
+        rows = np.array([self._index.get(c, -1) for c in currencies], dtype=np.intp)
+        j = self._index.get(quote)
+        if j is None:
+            return np.full(len(rows), np.nan)
+        rates = self.matrix[np.maximum(rows, 0), j]
+        rates[rows < 0] = np.nan
+        return rates
+
+
+class SectorStats:
+    """Agregado de um setor em um snapshot (registro compacto, somente leitura)."""
+
+    __slots__ = ("sector", "count", "avg_change", "advancers", "decliners", "best", "worst")
+
+    def __init__(self, sector: str, count: int, avg_change: float, advancers: int,
+                 decliners: int, best: Quote, worst: Quote):
+        self.sector = sector
+        self.count = count
+        self.avg_change = avg_change
+        self.advancers = advancers
+        self.decliners = decliners
+        self.best = best
+        self.worst = worst
+
+    def __repr__(self):
+        return f"SectorStats({self.sector!r}, n={self.count}, {self.avg_change:+.2f}%)"
+
+
+class MarketSnapshot:
+    """Snapshot imutavel de cotacoes e cambio.
+
+    Precos e variacoes ficam em arrays ``array('d')`` indexados pela
+    posicao do ticker, o que permite lookups O(1) e varreduras vetorizadas
+    sobre todo o universo sem objetos intermediarios.
+    """
+
+    __slots__ = (
+        "version", "as_of",
+        "tickers", "names", "currencies", "prices", "changes", "_index", "_quotes", "_resolver",
+        "sectors", "_sector_members", "_sector_stats",
+        "pairs", "rates", "rate_changes", "_fx_index", "_fx", "fx_matrix",
+    )
+
+    def __init__(
+        self,
+        version: int,
+        quotes: Iterable[tuple],
+        fx: Iterable[tuple],
+        as_of: str = "",
+    ):
+        self.version = int(version)
+        self.as_of = as_of
+
+        quotes = [
+            (str(t).upper(), n, c, float(p), float(ch), rest[0] if rest else "")
+            for t, n, c, p, ch, *rest in quotes
+        ]
+        self.tickers = tuple(q[0] for q in quotes)
+        self.names = tuple(q[1] for q in quotes)
+        self.currencies = tuple(q[2] for q in quotes)
+        self.prices = array("d", (q[3] for q in quotes))
+        self.changes = array("d", (q[4] for q in quotes))
+        self._index = {t: i for i, t in enumerate(self.tickers)}
+        self._quotes = tuple(Quote(*q) for q in quotes)
+        self._resolver = TickerIndex(self.tickers, self.names)
+        self.sectors = tuple(q[5] for q in quotes)
+        self._build_sectors()
+
+        fx = [(str(p).upper(), float(r), float(ch)) for p, r, ch in fx]
+        self.pairs = tuple(f[0] for f in fx)
+        self.rates = array("d", (f[1] for f in fx))
+        self.rate_changes = array("d", (f[2] for f in fx))
+        self._fx_index = {p: i for i, p in enumerate(self.pairs)}
+        self._fx = tuple(FxRate(*f) for f in fx)
+        self.fx_matrix = FxMatrix(self.pairs, self.rates, self.rate_changes)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MarketSnapshot":
+        """Cria um snapshot a partir do formato JSON documentado no modulo."""
+        return cls(
+            version=data.get("version", 1),
+            quotes=data.get("quotes", ()),
+            fx=data.get("fx", ()),
+            as_of=data.get("as_of", ""),
+        )
+
+    def resolve(self, query: str, prefixes: bool = True) -> Optional[str]:
+        """Ticker para um ticker, nome de empresa, apelido ou prefixo (ex: "Itau")."""
+        return self._resolver.resolve(query, prefixes)
+
+    def index_of(self, ticker: str) -> int:
+        """Posicao do ticker (ou nome da empresa) nos arrays, ou -1 se nao existir."""
+        i = self._index.get(ticker.upper().strip())
+        if i is None:
+            resolved = self._resolver.resolve(ticker)
+            i = -1 if resolved is None else self._index[resolved]
+        return i
+
+    def quote(self, ticker: str) -> Optional[Quote]:
+        """Retorna a cotacao do ticker ou da empresa, ou None se nao existir."""
+        i = self.index_of(ticker)
+        return None if i < 0 else self._quotes[i]
+
+    def quotes(self, tickers: Iterable[str]) -> list:
+        """Resolve varios tickers de uma vez; itens nao encontrados viram None."""
+        records = self._quotes
+        positions = [self.index_of(t) for t in tickers]
+        return [records[i] if i >= 0 else None for i in positions]
+
+    def _build_sectors(self) -> None:
+        """Pre-calcula membros e agregados por setor (uma vez por snapshot)."""
+        members: dict = {}
+        for i, sector in enumerate(self.sectors):
+            if sector:
+                members.setdefault(sector, array("I")).append(i)
+        self._sector_members = members
+
+        changes, records, stats = self.changes, self._quotes, []
+        for sector, idx in members.items():
+            best = max(idx, key=changes.__getitem__)
+            worst = min(idx, key=changes.__getitem__)
+            stats.append(SectorStats(
+                sector=sector,
+                count=len(idx),
+                avg_change=sum(changes[i] for i in idx) / len(idx),
+                advancers=sum(1 for i in idx if changes[i] > 0),
+                decliners=sum(1 for i in idx if changes[i] < 0),
+                best=records[best],
+                worst=records[worst],
+            ))
+        stats.sort(key=lambda st: st.avg_change, reverse=True)
+        self._sector_stats = tuple(stats)
+
+    def sector_stats(self) -> tuple:
+        """Agregados por setor, do melhor para o pior desempenho medio."""
+        return self._sector_stats
+
+    def resolve_sector(self, name: str) -> Optional[str]:
+        """Nome canonico do setor (sem acento/maiusculas, aceita prefixo)."""
+        key = fold(name)
+        if not key:
+            return None
+        candidates = [s for s in self._sector_members if fold(s).startswith(key)]
+        exact = [s for s in candidates if fold(s) == key]
+        if exact:
+            return exact[0]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def top_movers(
+        self,
+        k: int = 5,
+        losers: bool = False,
+        sector: Optional[str] = None,
+        currency: Optional[str] = None,
+    ) -> list:
+        """Maiores altas (ou quedas) com heap: O(n log k), sem ordenar o universo.
+
+        Args:
+            k: quantidade de acoes
+            losers: True para as maiores quedas
+            sector: nome canonico do setor (ver resolve_sector), ou None para todos
+            currency: "BRL" (B3), "USD" (EUA) ou None para todos
+        """
+        candidates = self._sector_members.get(sector, ()) if sector else range(len(self.tickers))
+        if currency:
+            currencies = self.currencies
+            candidates = [i for i in candidates if currencies[i] == currency]
+        select = heapq.nsmallest if losers else heapq.nlargest
+        return [self._quotes[i] for i in select(k, candidates, key=self.changes.__getitem__)]
+
+    def fx(self, pair: str) -> Optional[FxRate]:
+        """Taxa do par (ex: USD/BRL, EUR/USD, BRL/USD), ou None se alguma moeda faltar.
+
+        Pares listados no snapshot sao devolvidos como estao; os demais sao
+        triangulados pela FxMatrix.
+        """
+        key = pair.upper().strip().replace(" ", "").replace("-", "/")
+        if "/" not in key and len(key) == 6:
+            key = f"{key[:3]}/{key[3:]}"
+        i = self._fx_index.get(key)
+        if i is not None:
+            return self._fx[i]
+        base, _, quote = key.partition("/")
+        cross = self.fx_matrix.rate(base, quote) if base != quote else None
+        return None if cross is None else FxRate(key, *cross)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __repr__(self):
+        return (
+            f"MarketSnapshot(version={self.version}, tickers={len(self.tickers)}, "
+            f"pairs={len(self.pairs)})"
+        )
+
+
+def load_universe(path: str = UNIVERSE_PATH) -> list:
+    """Cotacoes simuladas do universo padrao (com setor).
+
+    Tickers de DEFAULT_QUOTES mantem os valores fixos; os demais recebem
+    preco e variacao de um gerador com semente no proprio ticker, entao os
+    dados sao os mesmos em todas as replicas e reinicios.
+    """
+    fixed = {q[0]: q for q in DEFAULT_QUOTES}
+    if not os.path.exists(path):
+        return list(DEFAULT_QUOTES)
+    quotes = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f, delimiter=";"):
+            ticker, sector = row["ticker"], row["sector"]
+            if ticker in fixed:
+                quotes.append(fixed[ticker] + (sector,))
+                continue
+            rng = random.Random(ticker)
+            price = rng.uniform(4, 90) if row["currency"] == "BRL" else rng.uniform(15, 600)
+            change = max(-9.0, min(9.0, rng.gauss(0.2, 1.8)))
+            quotes.append(
+                (ticker, row["name"], row["currency"], round(price, 2), round(change, 2), sector)
+            )
+    return quotes
+
+
+def default_snapshot() -> MarketSnapshot:
+    """Snapshot com os dados simulados do modulo e do universo padrao."""
+    return MarketSnapshot(version=1, quotes=load_universe(), fx=DEFAULT_FX)
+
+
+def load_snapshot(path: Optional[str] = None) -> MarketSnapshot:
+    """Carrega um snapshot de um arquivo JSON ou, sem arquivo, os dados embutidos."""
+    path = path or os.getenv("MARKET_DATA_PATH")
+    if not path:
+        return default_snapshot()
+    with open(path, encoding="utf-8") as f:
+        snapshot = MarketSnapshot.from_dict(json.load(f))
+    logger.info("Snapshot de mercado carregado de %s: %r", path, snapshot)
+    return snapshot
+
+
+# =============================================================
+# Snapshot corrente do processo
+# =============================================================
+
+_current: Optional[MarketSnapshot] = None
+_lock = threading.Lock()
+
+
+def get_snapshot() -> MarketSnapshot:
+    """Retorna o snapshot corrente, carregando-o na primeira chamada."""
+    snapshot = _current
+    if snapshot is None:
+        with _lock:
+            if _current is None:
+                _publish(load_snapshot())
+            snapshot = _current
+    return snapshot
+
+
+def swap_snapshot(snapshot: MarketSnapshot) -> Optional[MarketSnapshot]:
+    """Publica atomicamente um novo snapshot e retorna o anterior.
+
+    Raises:
+        ValueError: se a versao nao for maior que a do snapshot corrente.
+    """
+    with _lock:
+        previous = _current
+        if previous is not None and snapshot.version <= previous.version:
+            raise ValueError(
+                f"Versao do snapshot deve ser crescente "
+                f"(atual={previous.version}, nova={snapshot.version})"
+            )
+        _publish(snapshot)
+    logger.info("Snapshot de mercado publicado: %r", snapshot)
+    return previous
+
+
+def _publish(snapshot: MarketSnapshot) -> None:
+    global _current
+    _current = snapshot
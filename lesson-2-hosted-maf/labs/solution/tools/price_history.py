@@ -0,0 +1,319 @@
+"""
+Historico de precos OHLC em arquivos memory-mapped, um por ticker.
+
+Layout: PRICE_HISTORY_DIR/<TICKER>.npy, float64 com shape (6, n) em
+formato colunar, datas crescentes:
+
+    linha 0: data (dias desde 1970-01-01)
+    linhas 1-5: abertura, maxima, minima, fechamento, volume
+
+Os arquivos sao abertos com np.load(mmap_mode="r"): o sistema operacional
+pagina apenas o trecho lido, e o mapa fica aberto durante todo o processo.
+Uma consulta de periodo e uma busca binaria nas datas (searchsorted) e uma
+fatia sem copia das colunas, em vez de carregar o historico a cada
+requisicao.
+
+Carga offline a partir de CSVs (um por ticker, colunas
+date,open,high,low,close,volume):
+
+    python -m tools.price_history load-csv ./csv --out ./history
+
+Sem arquivo para um ticker, um historico simulado (deterministico por
+ticker, terminando no preco do snapshot) e gerado e gravado na primeira
+consulta em PRICE_HISTORY_DIR/synthetic/<data>-v<versao do snapshot>/;
+quando a data vira ou uma nova versao do snapshot e publicada, o historico
+e gerado de novo (e os diretorios antigos sao removidos), para nao
+divergir da cotacao atual. PRICE_HISTORY_SYNTHETIC=false desativa esse
+comportamento.
+"""
+
+import argparse
+import csv
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from tools.market_data import get_snapshot
+
+logger = logging.getLogger(__name__)
+
+PRICE_HISTORY_DIR = os.getenv(
+    "PRICE_HISTORY_DIR", os.path.join(tempfile.gettempdir(), "price_history")
+)
+PRICE_HISTORY_SYNTHETIC = os.getenv("PRICE_HISTORY_SYNTHETIC", "true").lower() == "true"
+# Pregoes gerados no historico simulado (~2 anos)
+SYNTHETIC_DAYS = 504
+# Linhas de tabela devolvidas ao LLM; periodos maiores pedem intervalo maior
+MAX_ROWS = 40
+
+DATE, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+INTERVALS = {"1d": "diario", "1wk": "semanal", "1mo": "mensal"}
+
+_RELATIVE = re.compile(r"^(\d+)\s*(d|w|m|y)$")
+_RELATIVE_DAYS = {"d": 1, "w": 7, "m": 30, "y": 365}
+
+
+def to_day(value: str) -> int:
+    """AAAA-MM-DD -> dias desde 1970-01-01."""
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def from_day(day: float) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def write_series(path: str, table: np.ndarray) -> None:
+    """Grava uma tabela (6, n) ordenada por data, de forma atomica."""
+    order = np.argsort(table[DATE], kind="stable")
+    tmp = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp, np.ascontiguousarray(table[:, order], dtype=np.float64))
+    os.replace(tmp, path)
+
+
+def synthetic_stamp() -> tuple:
+    """(data, versao do snapshot) que identifica o historico simulado valido."""
+    return date.today().isoformat(), get_snapshot().version
+
+
+def synthetic_dir(root: str, stamp: tuple) -> str:
+    day, version = stamp
+    return os.path.join(root, "synthetic", f"{day}-v{version}")
+
+
+def synthesize(ticker: str, last_price: float, end: Optional[str] = None,
+               days: int = SYNTHETIC_DAYS) -> np.ndarray:
+    """Historico simulado (passeio aleatorio geometrico) terminando em last_price."""
+    seed = int.from_bytes(hashlib.sha256(ticker.encode()).digest()[:8], "little")
+    rng = np.random.default_rng(seed)
+
+    end_day = np.datetime64(end or date.today().isoformat(), "D")
+    calendar = np.arange(end_day - int(days * 1.6), end_day + 1, dtype="datetime64[D]")
+    dates = calendar[np.is_busday(calendar)][-days:]
+    n = len(dates)
+
+    log_close = np.cumsum(rng.normal(0.0003, 0.018, n))
+    close = last_price * np.exp(log_close - log_close[-1])
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.004, n))
+    spread = np.abs(rng.normal(0, 0.008, n))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = np.round(rng.lognormal(14, 0.5, n))
+    return np.vstack([dates.astype(np.int64), open_, high, low, close, volume]).round(4)
+
+
+class PriceHistoryStore:
+    """Abre (uma vez) e consulta os arquivos memory-mapped por ticker."""
+
+    def __init__(self, root: str = PRICE_HISTORY_DIR, synthetic: bool = PRICE_HISTORY_SYNTHETIC):
+        self.root = root
+        self.synthetic = synthetic
+        self._maps: dict = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def path(self, ticker: str, root: Optional[str] = None) -> str:
+        return os.path.join(root or self.root, f"{ticker.replace('/', '_')}.npy")
+
+    def series(self, ticker: str) -> Optional[np.ndarray]:
+        """Tabela (6, n) memory-mapped do ticker, ou None se nao houver historico."""
+        stamp = synthetic_stamp() if self.synthetic else None
+        if stamp != self._stamp:
+            # Nova data ou versao do snapshot: reabre tudo (simulados sao regerados)
+            with self._lock:
+                if stamp != self._stamp:
+                    self._maps = {}
+                    self._stamp = stamp
+        table = self._maps.get(ticker)
+        if table is not None:
+            return table
+        with self._lock:
+            table = self._maps.get(ticker)
+            if table is None:
+                table = self._open(ticker, stamp)
+                if table is not None and stamp == self._stamp:
+                    self._maps[ticker] = table
+        return table
+
+    def _open(self, ticker: str, stamp: Optional[tuple]) -> Optional[np.ndarray]:
+        path = self.path(ticker)
+        if os.path.exists(path):
+            return np.load(path, mmap_mode="r")
+        quote = get_snapshot().quote(ticker)
+        if not self.synthetic or quote is None:
+            return None
+        folder = synthetic_dir(self.root, stamp)
+        path = self.path(ticker, folder)
+        if not os.path.exists(path):
+            if not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok=True)
+                self._prune_synthetic(folder)
+            write_series(path, synthesize(ticker, quote.price, end=stamp[0]))
+        return np.load(path, mmap_mode="r")
+
+    def _prune_synthetic(self, keep: str) -> None:
+        """Remove historicos simulados de datas/versoes anteriores."""
+        parent = os.path.dirname(keep)
+        for name in os.listdir(parent):
+            old = os.path.join(parent, name)
+            if old != keep:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def range(self, ticker: str, start_day: int, end_day: int) -> Optional[np.ndarray]:
+        """Fatia (6, k) sem copia com as datas em [start_day, end_day]."""
+        table = self.series(ticker)
+        if table is None:
+            return None
+        dates = table[DATE]
+        lo = int(np.searchsorted(dates, start_day, side="left"))
+        hi = int(np.searchsorted(dates, end_day, side="right"))
+        return table[:, lo:hi]
+
+
+def resample(block: np.ndarray, interval: str) -> np.ndarray:
+    """Agrega uma fatia diaria em semanas ou meses (vetorizado com reduceat)."""
+    if interval == "1d" or block.shape[1] == 0:
+        return block
+    days = block[DATE].astype("datetime64[D]")
+    if interval == "1wk":
+        keys = (days - np.datetime64("1970-01-05", "D")).astype(np.int64) // 7  # semanas (seg)
+    else:
+        keys = days.astype("datetime64[M]").astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], block.shape[1]] - 1
+    return np.vstack([
+        block[DATE, ends],
+        block[OPEN, starts],
+        np.maximum.reduceat(block[HIGH], starts),
+        np.minimum.reduceat(block[LOW], starts),
+        block[CLOSE, ends],
+        np.add.reduceat(block[VOLUME], starts),
+    ])
+
+
+def parse_period(start: str, end: str, last_day: int) -> tuple:
+    """(start_day, end_day) a partir de datas AAAA-MM-DD ou periodos (5d, 1m, 1y)."""
+    end_day = to_day(end) if end.strip() else last_day
+    match = _RELATIVE.match(start.strip().lower() or "1m")
+    if match:
+        start_day = end_day - int(match.group(1)) * _RELATIVE_DAYS[match.group(2)]
+    else:
+        start_day = to_day(start.strip())
+    return start_day, end_day
+
+
+def describe_history(ticker: str, start: str = "1m", end: str = "", interval: str = "1d") -> str:
+    """Resumo e tabela OHLC de um periodo, em texto compacto para o LLM."""
+    quote = get_snapshot().quote(ticker)
+    if quote is None:
+        return f"Ticker '{ticker.upper().strip()}' nao encontrado."
+    interval = interval.lower().strip() if interval.lower().strip() in INTERVALS else "1d"
+
+    store = get_store()
+    table = store.series(quote.ticker)
+    if table is None or table.shape[1] == 0:
+        return f"Sem historico de precos para {quote.ticker}."
+    try:
+        start_day, end_day = parse_period(start, end, int(table[DATE, -1]))
+    except ValueError:
+        return f"Periodo invalido (start='{start}', end='{end}'). Use AAAA-MM-DD ou periodos como 5d, 1m, 6m, 1y."
+
+    block = store.range(quote.ticker, start_day, end_day)
+    if block is None or block.shape[1] == 0:
+        return f"Sem historico para {quote.ticker} entre {from_day(start_day)} e {from_day(end_day)}."
+
+    first_close, last_close = block[CLOSE, 0], block[CLOSE, -1]
+    lines = [
+        f"{quote.ticker} ({quote.name}) {from_day(block[DATE, 0])} a {from_day(block[DATE, -1])}, "
+        f"{INTERVALS[interval]}, {block.shape[1]} pregoes, {quote.currency}",
+        f"Inicio: {first_close:.2f} | Fim: {last_close:.2f} | "
+        f"Retorno: {(last_close / first_close - 1) * 100:+.2f}% | "
+        f"Maxima: {block[HIGH].max():.2f} | Minima: {block[LOW].min():.2f}",
+    ]
+
+    rows = resample(block, interval)
+    if rows.shape[1] > MAX_ROWS:
+        lines.append(
+            f"Mostrando os ultimos {MAX_ROWS} de {rows.shape[1]} periodos "
+            f"(use interval 1wk ou 1mo para periodos longos)."
+        )
+        rows = rows[:, -MAX_ROWS:]
+    lines.append("Data | Abertura | Maxima | Minima | Fechamento | Volume")
+    for d, o, h, lo, c, v in rows.T:
+        lines.append(f"{from_day(d)} | {o:.2f} | {h:.2f} | {lo:.2f} | {c:.2f} | {v:.0f}")
+    return "\n".join(lines)
+
+
+# =============================================================
+# Store do processo
+# =============================================================
+
+_store: Optional[PriceHistoryStore] = None
+
+
+def get_store() -> PriceHistoryStore:
+    global _store
+    if _store is None:
+        _store = PriceHistoryStore()
+    return _store
+
+
+# =============================================================
+# Carga offline (CLI)
+# =============================================================
+
+def load_csv(path: str) -> np.ndarray:
+    """Le um CSV date,open,high,low,close,volume em uma tabela (6, n)."""
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = [
+            (to_day(r["date"][:10]), float(r["open"]), float(r["high"]),
+             float(r["low"]), float(r["close"]), float(r.get("volume") or 0))
+            for r in csv.DictReader(f)
+        ]
+    return np.array(rows, dtype=np.float64).reshape(-1, 6).T
+
+
+def load_csv_dir(source: str, dest: str = PRICE_HISTORY_DIR) -> int:
+    """Converte todos os <TICKER>.csv de source em arquivos .npy em dest."""
+    os.makedirs(dest, exist_ok=True)
+    count = 0
+    for name in sorted(os.listdir(source)):
+        if not name.lower().endswith(".csv"):
+            continue
+        ticker = os.path.splitext(name)[0].upper()
+        write_series(os.path.join(dest, f"{ticker}.npy"), load_csv(os.path.join(source, name)))
+        count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga offline do historico OHLC")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load-csv", help="Converte CSVs (um por ticker) em arquivos .npy")
+    load.add_argument("source", help="Diretorio com <TICKER>.csv")
+    load.add_argument("--out", default=PRICE_HISTORY_DIR)
+    synth = sub.add_parser("synthesize", help="Gera historico simulado para todo o snapshot")
+    synth.add_argument("--out", default=PRICE_HISTORY_DIR)
+    args = parser.parse_args()
+
+    if args.command == "load-csv":
+        print(f"{load_csv_dir(args.source, args.out)} tickers gravados em {args.out}")
+    else:
+        stamp = synthetic_stamp()
+        out = synthetic_dir(args.out, stamp)
+        os.makedirs(out, exist_ok=True)
+        snapshot = get_snapshot()
+        for ticker, price in zip(snapshot.tickers, snapshot.prices):
+            write_series(os.path.join(out, f"{ticker}.npy"), synthesize(ticker, price, end=stamp[0]))
+        print(f"{len(snapshot)} tickers gravados em {out}")
+
+
+if __name__ == "__main__":
+    main()
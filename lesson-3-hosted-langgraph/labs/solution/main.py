@@ -3,8 +3,11 @@ Hosted Agent de Mercado Financeiro usando LangGraph no Azure AI Foundry.
 Expoe o agente como Responses API via azure-ai-agentserver-langgraph.
 """
 
+import asyncio
+import contextvars
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_openai import AzureChatOpenAI
 from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
@@ -15,6 +18,11 @@ from typing_extensions import Literal
 from azure.identity import DefaultAzureCredential, get_bearer_token_provider
 from azure.ai.agentserver.langgraph import from_langgraph
 
+from market_data import get_snapshot
+from price_history import describe_history
+from indicators import describe_indicators
+from portfolio import describe_portfolio
+
 logger = logging.getLogger(__name__)
 
 SYSTEM_PROMPT = """Voce e um assistente especialista em mercado financeiro brasileiro e internacional.
@@ -35,6 +43,11 @@ sobre acoes, cambio, indices e tendencias de mercado.
 - Inclua disclaimer: 'Esta informacao e apenas para fins educativos e nao constitui recomendacao de investimento'
 - Formate valores no padrao brasileiro (R$ 1.234,56)
 - Seja objetivo e direto nas respostas
+- Para comparar varias acoes, use get_stock_prices com todos os tickers em uma unica chamada
+- Para maiores altas/quedas e desempenho por setor, use get_top_movers e get_sector_performance
+- Para desempenho historico (ex: ultimo mes), use get_price_history
+- Para medias moveis, RSI e volatilidade, use get_indicators (nao calcule de cabeca)
+- Para valor total e risco (VaR) de uma carteira, use get_portfolio_risk
 """
 
 
@@ -47,31 +60,47 @@ def get_stock_price(ticker: str) -> str:
     """Consulta o preco atual de uma acao pelo ticker.
 
     Args:
-        ticker: Codigo do ticker da acao (ex: PETR4, VALE3, AAPL)
+        ticker: Ticker ou nome da empresa (ex: PETR4, Petrobras, Itau, AAPL)
     """
-    prices = {
-        "PETR4": {"price": 38.72, "change": 1.23, "currency": "BRL"},
-        "VALE3": {"price": 61.45, "change": -0.87, "currency": "BRL"},
-        "ITUB4": {"price": 32.18, "change": 0.45, "currency": "BRL"},
-        "BBDC4": {"price": 13.95, "change": -0.32, "currency": "BRL"},
-        "WEGE3": {"price": 41.30, "change": 2.15, "currency": "BRL"},
-        "AAPL": {"price": 228.50, "change": 1.85, "currency": "USD"},
-        "MSFT": {"price": 445.20, "change": 3.12, "currency": "USD"},
-        "GOOGL": {"price": 178.90, "change": -1.45, "currency": "USD"},
-        "AMZN": {"price": 198.75, "change": 2.30, "currency": "USD"},
-        "NVDA": {"price": 142.60, "change": 5.40, "currency": "USD"},
-    }
-    ticker = ticker.upper().strip()
-    data = prices.get(ticker)
-    if not data:
-        return f"Ticker '{ticker}' nao encontrado. Tickers disponiveis: {', '.join(prices.keys())}"
-    sign = "+" if data["change"] >= 0 else ""
+    quote = get_snapshot().quote(ticker)
+    if quote is None:
+        return (
+            f"Ticker '{ticker.upper().strip()}' nao encontrado. "
+            f"Exemplos: {', '.join(get_snapshot().tickers[:10])}"
+        )
+    sign = "+" if quote.change >= 0 else ""
     return (
-        f"{ticker}: {data['currency']} {data['price']:.2f} "
-        f"({sign}{data['change']:.2f}%)"
+        f"{quote.ticker}: {quote.currency} {quote.price:.2f} "
+        f"({sign}{quote.change:.2f}%)"
     )
 
 
+@tool
+def get_stock_prices(tickers: list[str]) -> str:
+    """Consulta o preco atual de varias acoes em uma unica chamada.
+
+    Use para comparar acoes (ex: PETR4, VALE3 e ITUB4) em vez de chamar
+    get_stock_price uma vez para cada ticker.
+
+    Args:
+        tickers: Lista de tickers ou nomes de empresas (ex: ["PETR4", "Vale", "AAPL"])
+    """
+    if not tickers:
+        return "Nenhum ticker informado."
+    lines = ["Ticker | Moeda | Preco | Var%"]
+    missing = []
+    for ticker, quote in zip(tickers, get_snapshot().quotes(tickers)):
+        if quote is None:
+            missing.append(ticker.upper().strip())
+            continue
+        lines.append(
+            f"{quote.ticker} | {quote.currency} | {quote.price:.2f} | {quote.change:+.2f}%"
+        )
+    if missing:
+        lines.append(f"Nao encontrados: {', '.join(missing)}")
+    return "\n".join(lines)
+
+
 @tool
 def get_market_summary() -> str:
     """Retorna um resumo dos principais indices do mercado financeiro."""
@@ -91,31 +120,133 @@ def get_exchange_rate(pair: str) -> str:
     """Consulta a taxa de cambio de um par de moedas.
 
     Args:
-        pair: Par de moedas (ex: USD/BRL, EUR/BRL, BTC/USD)
+        pair: Par de moedas, inclusive cruzados e inversos (ex: USD/BRL, EUR/USD, BRL/USD, GBP/EUR)
     """
-    rates = {
-        "USD/BRL": {"rate": 5.12, "change": -0.35},
-        "EUR/BRL": {"rate": 5.58, "change": -0.18},
-        "GBP/BRL": {"rate": 6.48, "change": 0.12},
-        "BTC/USD": {"rate": 67842.50, "change": 2.45},
-        "ETH/USD": {"rate": 3456.80, "change": 1.87},
-    }
-    pair = pair.upper().strip()
-    data = rates.get(pair)
-    if not data:
-        return f"Par '{pair}' nao encontrado. Pares disponiveis: {', '.join(rates.keys())}"
-    sign = "+" if data["change"] >= 0 else ""
-    return f"{pair}: {data['rate']:.2f} ({sign}{data['change']:.2f}%)"
+    rate = get_snapshot().fx(pair)
+    if rate is None:
+        return (
+            f"Par '{pair.upper().strip()}' nao encontrado. "
+            f"Moedas disponiveis (qualquer combinacao): "
+            f"{', '.join(get_snapshot().fx_matrix.currencies)}"
+        )
+    sign = "+" if rate.change >= 0 else ""
+    # Pares cruzados/inversos podem ficar abaixo de 1 (ex: BRL/USD 0.1953)
+    precision = 2 if rate.rate >= 1 else 4
+    return f"{rate.pair}: {rate.rate:.{precision}f} ({sign}{rate.change:.2f}%)"
+
+
+# Mercado informado pelo usuario -> moeda das acoes no snapshot
+MARKET_CURRENCIES = {"b3": "BRL", "brasil": "BRL", "br": "BRL", "eua": "USD", "us": "USD", "usa": "USD"}
+
+
+@tool
+def get_top_movers(
+    direction: str = "alta", market: str = "todos", sector: str = "", limit: int = 5
+) -> str:
+    """Lista as maiores altas ou quedas do dia entre centenas de acoes da B3 e dos EUA.
+
+    Args:
+        direction: "alta" para maiores altas ou "queda" para maiores quedas
+        market: "b3", "eua" ou "todos"
+        sector: Setor opcional (ex: Financeiro, Saude, Petroleo e Gas); vazio para todos
+        limit: Quantidade de acoes (1 a 20)
+    """
+    snapshot = get_snapshot()
+    losers = direction.lower().strip().startswith(("q", "b", "l"))  # queda/baixa/losers
+    currency = MARKET_CURRENCIES.get(market.lower().strip())
+    sector_name = None
+    if sector.strip():
+        sector_name = snapshot.resolve_sector(sector)
+        if sector_name is None:
+            return (
+                f"Setor '{sector}' nao encontrado. Setores disponiveis: "
+                f"{', '.join(st.sector for st in snapshot.sector_stats())}"
+            )
+
+    movers = snapshot.top_movers(max(1, min(limit, 20)), losers, sector_name, currency)
+    scope = ", ".join(filter(None, [market.upper() if currency else "", sector_name or ""]))
+    title = "Maiores quedas" if losers else "Maiores altas"
+    lines = [f"{title}{f' ({scope})' if scope else ''}:"]
+    lines += [
+        f"{q.ticker} | {q.name} | {q.currency} {q.price:.2f} | {q.change:+.2f}%" for q in movers
+    ]
+    return "\n".join(lines)
+
+
+@tool
+def get_sector_performance() -> str:
+    """Retorna o desempenho medio do dia por setor, com a maior alta e a maior queda de cada um."""
+    lines = ["Setor | Acoes | Var% media | Altas/Quedas | Maior alta | Maior queda"]
+    for st in get_snapshot().sector_stats():
+        lines.append(
+            f"{st.sector} | {st.count} | {st.avg_change:+.2f}% | {st.advancers}/{st.decliners} | "
+            f"{st.best.ticker} {st.best.change:+.2f}% | {st.worst.ticker} {st.worst.change:+.2f}%"
+        )
+    return "\n".join(lines)
+
+
+@tool
+def get_price_history(ticker: str, start: str = "1m", end: str = "", interval: str = "1d") -> str:
+    """Consulta o historico de precos (OHLC) de uma acao em um periodo.
+
+    Args:
+        ticker: Ticker ou nome da empresa (ex: VALE3, Petrobras, AAPL)
+        start: Data inicial AAAA-MM-DD ou periodo ate a data final (ex: 5d, 1m, 6m, 1y)
+        end: Data final AAAA-MM-DD; vazio para o ultimo pregao
+        interval: 1d (diario), 1wk (semanal) ou 1mo (mensal)
+    """
+    return describe_history(ticker, start, end, interval)
+
+
+@tool
+def get_indicators(tickers: list[str], indicators: list[str] | None = None, window: int = 20) -> str:
+    """Calcula indicadores tecnicos (SMA, EMA, RSI, volatilidade) de varias acoes.
+
+    Use para medias moveis, RSI/IFR e volatilidade em vez de calcular a
+    partir do historico; aceita dezenas de tickers em uma unica chamada.
+
+    Args:
+        tickers: Lista de tickers ou nomes de empresas (ex: ["PETR4", "Vale", "AAPL"])
+        indicators: Indicadores desejados: sma, ema, rsi, vol; vazio para todos
+        window: Janela em pregoes (ex: 9, 14, 20, 50)
+    """
+    return describe_indicators(tickers, indicators, window)
+
+
+@tool
+async def get_portfolio_risk(
+    holdings: str, base_currency: str = "BRL", confidence: float = 0.95, horizon_days: int = 1
+) -> str:
+    """Avalia uma carteira com moedas diferentes e calcula o VaR (historico e Monte Carlo).
+
+    Args:
+        holdings: Posicoes em texto (ex: "100 PETR4, 50 AAPL, 2000 USD")
+        base_currency: Moeda de referencia da avaliacao (ex: BRL, USD, EUR)
+        confidence: Nivel de confianca do VaR (ex: 0.95, 0.99)
+        horizon_days: Horizonte do VaR em pregoes
+    """
+    return await describe_portfolio(holdings, base_currency, confidence, horizon_days)
 
 
 # =============================================================
 # LLM e Graph
 # =============================================================
 
-tools_list = [get_stock_price, get_market_summary, get_exchange_rate]
+tools_list = [
+    get_stock_price, get_stock_prices, get_market_summary, get_exchange_rate,
+    get_top_movers, get_sector_performance, get_price_history, get_indicators,
+    get_portfolio_risk,
+]
 tools_by_name = {t.name: t for t in tools_list}
 _llm_with_tools = None
 
+# Pool limitado para tools sincronas: tool calls paralelas do LLM rodam
+# ao mesmo tempo, e a latencia do node passa a ser a da tool mais lenta.
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+_tool_executor = ThreadPoolExecutor(
+    max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool"
+)
+
 
 def get_llm():
     """Inicializa o LLM com credenciais Azure."""
@@ -158,19 +289,41 @@ def llm_call(state: MessagesState):
     }
 
 
-def tool_node(state: MessagesState):
-    """Node: Executa as tool calls solicitadas pelo LLM."""
-    results = []
+async def _run_tool_call(tool_call: dict) -> ToolMessage:
+    """Executa uma tool call; erros viram um ToolMessage de erro para o LLM."""
+    name = tool_call["name"]
+    fn = tools_by_name.get(name)
+    try:
+        if fn is None:
+            raise ValueError(f"tool '{name}' nao existe")
+        if getattr(fn, "coroutine", None) is not None:
+            observation = await fn.ainvoke(tool_call["args"])
+        else:
+            # copy_context preserva o contexto (callbacks/tracing) na thread
+            ctx = contextvars.copy_context()
+            observation = await asyncio.get_running_loop().run_in_executor(
+                _tool_executor, ctx.run, fn.invoke, tool_call["args"]
+            )
+    except Exception as exc:
+        logger.exception("Erro ao executar a tool %s", name)
+        return ToolMessage(
+            content=f"Erro ao executar {name}: {exc}",
+            tool_call_id=tool_call["id"],
+            status="error",
+        )
+    return ToolMessage(content=str(observation), tool_call_id=tool_call["id"])
+
+
+async def tool_node(state: MessagesState):
+    """Node: Executa em paralelo as tool calls solicitadas pelo LLM."""
     last_message = state["messages"][-1]
     if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
         return {"messages": []}
-    for tool_call in last_message.tool_calls:
-        fn = tools_by_name[tool_call["name"]]
-        observation = fn.invoke(tool_call["args"])
-        results.append(
-            ToolMessage(content=str(observation), tool_call_id=tool_call["id"])
-        )
-    return {"messages": results}
+    # gather preserva a ordem das tool calls nos resultados
+    results = await asyncio.gather(
+        *(_run_tool_call(tool_call) for tool_call in last_message.tool_calls)
+    )
+    return {"messages": list(results)}
 
 
 def should_continue(state: MessagesState) -> Literal["Action", "__end__"]:
@@ -0,0 +1,228 @@
+"""
+Janela de contexto com orcamento de tokens para o llm_call.
+
+Com historico por sessao, o prompt cresce a cada turno (e a cada saida de
+tool). ContextWindow.prepare() monta o prompt enviado ao LLM sem alterar o
+estado do grafo:
+
+1. Conta tokens por mensagem, com cache por impressao digital do conteudo
+   (so mensagens novas sao contadas a cada iteracao; o historico recarregado
+   da sessao reaproveita as contagens dos turnos anteriores).
+2. Se o total passar do orcamento, encurta saidas de tools de turnos
+   anteriores.
+3. Se ainda passar, corta os turnos mais antigos (sempre em uma
+   HumanMessage, para nao separar tool calls das respostas) e os substitui
+   por um resumo gerado em background pelo LLM. Enquanto o resumo nao
+   fica pronto, usa o resumo anterior (ou nenhum).
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+# Saidas de tools de turnos anteriores sao cortadas neste tamanho (caracteres)
+OLD_TOOL_OUTPUT_CHARS = 200
+
+SUMMARY_PROMPT = (
+    "Resuma a conversa abaixo entre um usuario e um assistente de mercado "
+    "financeiro em no maximo 10 linhas. Preserve tickers, valores, pares de "
+    "moedas e os pedidos do usuario. Se houver um resumo anterior, incorpore-o."
+)
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken ausente ou sem acesso ao arquivo de encoding
+    _encoding = None
+
+
+def _text_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def fingerprint(msg: BaseMessage) -> int:
+    """Identidade de uma mensagem pelo conteudo.
+
+    Mensagens recarregadas do session_store ganham ids novos a cada turno,
+    entao os caches usam o conteudo, e nao msg.id, como chave.
+    """
+    if isinstance(msg, AIMessage) and msg.tool_calls:
+        extra = tuple(tc["id"] for tc in msg.tool_calls)
+    else:
+        extra = getattr(msg, "tool_call_id", None)
+    return hash((msg.type, str(msg.content), extra))
+
+
+class TokenCounter:
+    """Conta tokens por mensagem com cache LRU pela impressao digital."""
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[int, int]" = OrderedDict()
+
+    def count(self, msg: BaseMessage) -> int:
+        key = fingerprint(msg)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        text = msg.content if isinstance(msg.content, str) else json.dumps(msg.content)
+        tokens = 4 + _text_tokens(text)  # ~4 tokens de overhead por mensagem
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            tokens += _text_tokens(json.dumps([tc["args"] for tc in msg.tool_calls]))
+
+        self._cache[key] = tokens
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return tokens
+
+
+class ContextWindow:
+    """Monta o prompt do LLM dentro de um orcamento de tokens."""
+
+    def __init__(
+        self,
+        budget: int = CONTEXT_TOKEN_BUDGET,
+        summarize: Optional[Callable[[Optional[str], list], Awaitable[str]]] = None,
+        max_summaries: int = 1000,
+    ):
+        self.budget = budget
+        self.summarize = summarize
+        self.counter = TokenCounter()
+        self.max_summaries = max_summaries
+        # impressao digital do prefixo resumido -> resumo de todo o prefixo
+        self._summaries: "OrderedDict[int, str]" = OrderedDict()
+        self._pending: set = set()
+        self._tasks: set = set()
+
+    def prepare(self, messages: list) -> list:
+        """Retorna as mensagens a enviar ao LLM (sem o system prompt)."""
+        counts = [self.counter.count(m) for m in messages]
+        if sum(counts) <= self.budget:
+            return messages
+
+        # 1. Encurtar saidas de tools de turnos anteriores ao atual
+        last_human = _last_index(messages, HumanMessage)
+        messages = [
+            _collapse_tool_output(m) if i < last_human and isinstance(m, ToolMessage) else m
+            for i, m in enumerate(messages)
+        ]
+        counts = [self.counter.count(m) for m in messages]
+        if sum(counts) <= self.budget:
+            return messages
+
+        # 2. Cortar turnos antigos: maior sufixo (a partir de uma HumanMessage)
+        #    que cabe em metade do orcamento, deixando espaco para o resumo
+        cut = last_human
+        recent_tokens = sum(counts[last_human:])
+        for i in range(last_human - 1, -1, -1):
+            recent_tokens += counts[i]
+            if recent_tokens > self.budget // 2:
+                break
+            if isinstance(messages[i], HumanMessage):
+                cut = i
+        if cut <= 0:
+            return messages
+
+        older, recent = messages[:cut], messages[cut:]
+        summary = self._summary_for(older)
+        if summary:
+            return [SystemMessage(content=f"Resumo da conversa anterior:\n{summary}")] + recent
+        return recent
+
+    def _summary_for(self, older: list) -> Optional[str]:
+        """Resumo mais recente disponivel para older; agenda o que faltar.
+
+        O resumo e incremental: parte do maior prefixo ja resumido e pede ao
+        LLM para incorporar apenas as mensagens seguintes.
+        """
+        prefix_keys, key = [], 0
+        for msg in older:
+            key = hash((key, fingerprint(msg)))
+            prefix_keys.append(key)
+
+        start, summary = 0, None
+        for i in range(len(older) - 1, -1, -1):
+            cached = self._summaries.get(prefix_keys[i])
+            if cached is not None:
+                start, summary = i + 1, cached
+                break
+
+        if start < len(older):
+            self._schedule(prefix_keys[-1], summary, older[start:])
+        return summary
+
+    def _schedule(self, key: int, previous: Optional[str], messages: list) -> None:
+        if self.summarize is None or key in self._pending:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._pending.add(key)
+        # Contexto vazio: sem as contextvars do run atual (config e callbacks do
+        # LangGraph), os tokens do resumo nao vazam para o streaming da resposta
+        task = loop.create_task(
+            self._summarize(key, previous, messages), context=contextvars.Context()
+        )
+        # Referencia forte: o loop so guarda referencias fracas as tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def aclose(self) -> None:
+        """Cancela os resumos em andamento (chamar no shutdown)."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _summarize(self, key: int, previous: Optional[str], messages: list) -> None:
+        try:
+            self._summaries[key] = await self.summarize(previous, messages)
+            if len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+        except Exception as exc:
+            logger.warning("Falha ao resumir historico: %s", exc)
+        finally:
+            self._pending.discard(key)
+
+
+def build_summary_messages(previous: Optional[str], messages: list) -> list:
+    """Prompt para o LLM resumir um trecho do historico."""
+    lines = []
+    if previous:
+        lines.append(f"Resumo anterior:\n{previous}\n")
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            lines.append(f"Usuario: {msg.content}")
+        elif isinstance(msg, AIMessage) and msg.content:
+            lines.append(f"Assistente: {msg.content}")
+        elif isinstance(msg, ToolMessage):
+            lines.append(f"Tool {msg.name or ''}: {str(msg.content)[:OLD_TOOL_OUTPUT_CHARS]}")
+    return [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content="\n".join(lines))]
+
+
+def _collapse_tool_output(msg: ToolMessage) -> ToolMessage:
+    content = str(msg.content)
+    if len(content) <= OLD_TOOL_OUTPUT_CHARS:
+        return msg
+    return msg.model_copy(update={"content": content[:OLD_TOOL_OUTPUT_CHARS] + " [...]"})
+
+
+def _last_index(messages: list, cls) -> int:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], cls):
+            return i
+    return 0
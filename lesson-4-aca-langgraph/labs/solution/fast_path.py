@@ -0,0 +1,168 @@
+"""
+Roteador deterministico para perguntas simples de cotacao e cambio.
+
+Perguntas como "cotacao da PETR4?" ou "quanto esta o dolar?" passam pelo
+grafo como llm_call -> environment -> llm_call: duas chamadas ao LLM para
+uma unica consulta ao snapshot. FastPathRouter reconhece essas intencoes
+antes do grafo, com o indice de tickers/nomes/pares do snapshot e palavras-chave
+em portugues, e responde com as proprias tools em um template fixo (com o
+disclaimer exigido pelo system prompt).
+
+Qualquer coisa ambigua (pedido de analise, ticker desconhecido, acao e
+cambio na mesma frase, mensagem longa) devolve None e segue para o grafo.
+"""
+
+import os
+import re
+import unicodedata
+from typing import Callable, Optional
+
+from market_data import get_snapshot
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+# Mensagens maiores que isso (em palavras) sempre vao para o LLM
+FAST_PATH_MAX_WORDS = 12
+
+DISCLAIMER = (
+    "Esta informacao e apenas para fins educativos e nao constitui "
+    "recomendacao de investimento."
+)
+SIMULATED_NOTE = "Dados simulados, sem acesso ao mercado em tempo real."
+
+# Palavras que indicam pedido de cotacao
+QUOTE_WORDS = frozenset({
+    "cotacao", "cotacoes", "preco", "precos", "quanto", "valor", "vale",
+    "esta", "ta", "custa", "cotada", "cotado", "hoje", "agora", "acao", "acoes",
+})
+# Palavras neutras (artigos, preposicoes, conectivos)
+FILLER_WORDS = frozenset({
+    "a", "o", "as", "os", "e", "de", "da", "do", "das", "dos", "em", "no", "na",
+    "qual", "quais", "me", "diga", "mostre", "ver", "por", "favor", "pf", "pfv",
+    "atual", "atualmente", "para", "pra", "com", "contra", "frente", "ao",
+    "relacao", "cambio", "taxa",
+})
+# Palavras que pedem raciocinio: nunca respondidas pelo fast path
+ANALYSIS_WORDS = frozenset({
+    "porque", "comprar", "vender", "devo", "recomenda",
+    "recomendacao", "analise", "analisar", "compare", "comparar", "comparacao",
+    "melhor", "pior", "tendencia", "previsao", "explique", "explica", "historico",
+    "projecao", "investir", "risco", "carteira", "se", "quando",
+})
+# Inicio de pergunta de continuacao ("e o itau?", "e a vale?"): so faz sentido
+# com o contexto da conversa
+FOLLOW_UP = re.compile(r"^(e|mas|e quanto a|e sobre) (o|a|os|as|no|na|nos|nas|do|da|dos|das)\b")
+SUMMARY_PATTERNS = (
+    re.compile(r"^((me )?(de|da|mostre) (um |o )?|qual (e )?o )?resumo (do|de) mercado( hoje)?$"),
+    re.compile(r"^como (esta|ta|anda) o mercado( hoje| agora)?$"),
+    re.compile(r"^(indices|principais indices)( do mercado)?( hoje)?$"),
+)
+
+# Nome da moeda em portugues -> codigo
+CURRENCY_ALIASES = {
+    "dolar": "USD", "dolares": "USD", "usd": "USD",
+    "euro": "EUR", "euros": "EUR", "eur": "EUR",
+    "libra": "GBP", "libras": "GBP", "gbp": "GBP",
+    "real": "BRL", "reais": "BRL", "brl": "BRL",
+    "bitcoin": "BTC", "btc": "BTC",
+    "ethereum": "ETH", "eth": "ETH",
+}
+# Moeda de cotacao quando so uma moeda e citada ("quanto esta o dolar?")
+DEFAULT_QUOTE_CURRENCY = {"USD": "BRL", "EUR": "BRL", "GBP": "BRL", "BTC": "USD", "ETH": "USD"}
+
+_PAIR = re.compile(r"\b([a-z]{3})\s*/\s*([a-z]{3})\b")
+_NON_WORD = re.compile(r"[^a-z0-9/ ]+")
+
+
+def normalize(text: str) -> str:
+    """Minusculas, sem acentos e sem pontuacao (exceto '/')."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+class FastPathRouter:
+    """Responde sem o LLM as perguntas que cabem em uma unica tool.
+
+    As tools sao recebidas como callables (ex: get_stock_price.func), para
+    que o fast path e o grafo formatem os dados exatamente da mesma forma.
+    """
+
+    def __init__(
+        self,
+        quote: Callable[[str], str],
+        quotes: Callable[[list], str],
+        exchange_rate: Callable[[str], str],
+        market_summary: Callable[[], str],
+        enabled: bool = FAST_PATH_ENABLED,
+    ):
+        self.quote = quote
+        self.quotes = quotes
+        self.exchange_rate = exchange_rate
+        self.market_summary = market_summary
+        self.enabled = enabled
+
+    def route(self, message: str, has_history: bool = False) -> Optional[tuple]:
+        """Retorna (intencao, resposta) ou None se a pergunta deve ir ao grafo."""
+        if not self.enabled:
+            return None
+        text = normalize(message)
+        words = text.replace("/", " / ").split()
+        if not words or len(words) > FAST_PATH_MAX_WORDS or message.count("?") > 1:
+            return None
+        if any(w in ANALYSIS_WORDS for w in words):
+            return None
+
+        if any(p.match(text) for p in SUMMARY_PATTERNS):
+            return "market_summary", self._render(self.market_summary())
+
+        # Com historico, so perguntas completas: "e o itau?" depois de uma
+        # pergunta de RSI ou de carteira depende do contexto e vai ao grafo
+        if has_history and (FOLLOW_UP.match(text) or not any(w in QUOTE_WORDS for w in words)):
+            return None
+
+        snapshot = get_snapshot()
+        tickers, currencies, unknown = [], [], []
+        for word in words:
+            if word in QUOTE_WORDS or word in FILLER_WORDS or word == "/":
+                continue
+            if word in CURRENCY_ALIASES:
+                currencies.append(CURRENCY_ALIASES[word])
+                continue
+            # Ticker, nome ou apelido exato ("petrobras", "itau"); prefixos
+            # ficam para o LLM, ja que aqui qualquer palavra e candidata
+            ticker = snapshot.resolve(word, prefixes=False)
+            if ticker is not None:
+                if ticker not in tickers:
+                    tickers.append(ticker)
+            else:
+                unknown.append(word)
+
+        # Palavra desconhecida (ticker fora do snapshot, prefixo, ...)
+        # ou acao e moeda juntas: deixa o LLM interpretar
+        if unknown or (tickers and currencies):
+            return None
+
+        if tickers:
+            if len(tickers) == 1:
+                return "stock_price", self._render(self.quote(tickers[0]))
+            return "stock_prices", self._render(self.quotes(tickers))
+
+        pair = self._resolve_pair(text, currencies)
+        if pair is not None and snapshot.fx(pair) is not None:
+            return "exchange_rate", self._render(self.exchange_rate(pair))
+        return None
+
+    @staticmethod
+    def _resolve_pair(text: str, currencies: list) -> Optional[str]:
+        match = _PAIR.search(text)
+        if match:
+            return f"{match.group(1)}/{match.group(2)}".upper()
+        if len(currencies) == 1 and currencies[0] in DEFAULT_QUOTE_CURRENCY:
+            return f"{currencies[0]}/{DEFAULT_QUOTE_CURRENCY[currencies[0]]}"
+        if len(currencies) == 2 and currencies[0] != currencies[1]:
+            return f"{currencies[0]}/{currencies[1]}"
+        return None
+
+    @staticmethod
+    def _render(tool_output: str) -> str:
+        return f"{tool_output}\n\n{SIMULATED_NOTE}\n{DISCLAIMER}"
@@ -9,24 +9,65 @@ roda em infraestrutura propria (ACA) e e registrado externamente
 no Foundry para governanca e monitoramento via AI Gateway (APIM).
 """
 
+import asyncio
+import contextvars
+import json
 import os
 import logging
+import time
+import uuid
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from langchain_openai import AzureChatOpenAI
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.ai import add_usage
 from langchain_core.tools import tool
 from langgraph.graph import END, START, MessagesState, StateGraph
 from typing_extensions import Literal
+from opentelemetry import metrics
 
 from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from azure.identity.aio import (
+    DefaultAzureCredential as AsyncDefaultAzureCredential,
+    get_bearer_token_provider as get_async_bearer_token_provider,
+)
+
+from market_data import get_snapshot
+from price_history import describe_history
+from indicators import describe_indicators
+from portfolio import describe_portfolio, shutdown_risk_pool
+from session_store import create_session_store
+from context_window import ContextWindow, build_summary_messages
+from fast_path import FastPathRouter
+from response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
+# Metricas OpenTelemetry (no-op ate que um MeterProvider seja configurado)
+meter = metrics.get_meter(__name__)
+ttft_histogram = meter.create_histogram(
+    "agent.chat.time_to_first_token",
+    unit="ms",
+    description="Tempo ate o primeiro token do LLM em POST /chat/stream",
+)
+fast_path_counter = meter.create_counter(
+    "agent.fast_path.answers",
+    description="Perguntas respondidas pelo fast path, sem o LLM (por intencao)",
+)
+
 SYSTEM_PROMPT = """Voce e um assistente especialista em mercado financeiro brasileiro e internacional.
 
 ## Seu Objetivo
@@ -45,6 +86,11 @@ sobre acoes, cambio, indices e tendencias de mercado.
 - Inclua disclaimer: 'Esta informacao e apenas para fins educativos e nao constitui recomendacao de investimento'
 - Formate valores no padrao brasileiro (R$ 1.234,56)
 - Seja objetivo e direto nas respostas
+- Para comparar varias acoes, use get_stock_prices com todos os tickers em uma unica chamada
+- Para maiores altas/quedas e desempenho por setor, use get_top_movers e get_sector_performance
+- Para desempenho historico (ex: ultimo mes), use get_price_history
+- Para medias moveis, RSI e volatilidade, use get_indicators (nao calcule de cabeca)
+- Para valor total e risco (VaR) de uma carteira, use get_portfolio_risk
 """
 
 
@@ -57,31 +103,47 @@ def get_stock_price(ticker: str) -> str:
     """Consulta o preco atual de uma acao pelo ticker.
 
     Args:
-        ticker: Codigo do ticker da acao (ex: PETR4, VALE3, AAPL)
+        ticker: Ticker ou nome da empresa (ex: PETR4, Petrobras, Itau, AAPL)
     """
-    prices = {
-        "PETR4": {"price": 38.72, "change": 1.23, "currency": "BRL"},
-        "VALE3": {"price": 61.45, "change": -0.87, "currency": "BRL"},
-        "ITUB4": {"price": 32.18, "change": 0.45, "currency": "BRL"},
-        "BBDC4": {"price": 13.95, "change": -0.32, "currency": "BRL"},
-        "WEGE3": {"price": 41.30, "change": 2.15, "currency": "BRL"},
-        "AAPL": {"price": 228.50, "change": 1.85, "currency": "USD"},
-        "MSFT": {"price": 445.20, "change": 3.12, "currency": "USD"},
-        "GOOGL": {"price": 178.90, "change": -1.45, "currency": "USD"},
-        "AMZN": {"price": 198.75, "change": 2.30, "currency": "USD"},
-        "NVDA": {"price": 142.60, "change": 5.40, "currency": "USD"},
-    }
-    ticker = ticker.upper().strip()
-    data = prices.get(ticker)
-    if not data:
-        return f"Ticker '{ticker}' nao encontrado. Tickers disponiveis: {', '.join(prices.keys())}"
-    sign = "+" if data["change"] >= 0 else ""
+    quote = get_snapshot().quote(ticker)
+    if quote is None:
+        return (
+            f"Ticker '{ticker.upper().strip()}' nao encontrado. "
+            f"Exemplos: {', '.join(get_snapshot().tickers[:10])}"
+        )
+    sign = "+" if quote.change >= 0 else ""
     return (
-        f"{ticker}: {data['currency']} {data['price']:.2f} "
-        f"({sign}{data['change']:.2f}%)"
+        f"{quote.ticker}: {quote.currency} {quote.price:.2f} "
+        f"({sign}{quote.change:.2f}%)"
     )
 
 
+@tool
+def get_stock_prices(tickers: list[str]) -> str:
+    """Consulta o preco atual de varias acoes em uma unica chamada.
+
+    Use para comparar acoes (ex: PETR4, VALE3 e ITUB4) em vez de chamar
+    get_stock_price uma vez para cada ticker.
+
+    Args:
+        tickers: Lista de tickers ou nomes de empresas (ex: ["PETR4", "Vale", "AAPL"])
+    """
+    if not tickers:
+        return "Nenhum ticker informado."
+    lines = ["Ticker | Moeda | Preco | Var%"]
+    missing = []
+    for ticker, quote in zip(tickers, get_snapshot().quotes(tickers)):
+        if quote is None:
+            missing.append(ticker.upper().strip())
+            continue
+        lines.append(
+            f"{quote.ticker} | {quote.currency} | {quote.price:.2f} | {quote.change:+.2f}%"
+        )
+    if missing:
+        lines.append(f"Nao encontrados: {', '.join(missing)}")
+    return "\n".join(lines)
+
+
 @tool
 def get_market_summary() -> str:
     """Retorna um resumo dos principais indices do mercado financeiro."""
@@ -101,31 +163,146 @@ def get_exchange_rate(pair: str) -> str:
     """Consulta a taxa de cambio de um par de moedas.
 
     Args:
-        pair: Par de moedas (ex: USD/BRL, EUR/BRL, BTC/USD)
+        pair: Par de moedas, inclusive cruzados e inversos (ex: USD/BRL, EUR/USD, BRL/USD, GBP/EUR)
     """
-    rates = {
-        "USD/BRL": {"rate": 5.12, "change": -0.35},
-        "EUR/BRL": {"rate": 5.58, "change": -0.18},
-        "GBP/BRL": {"rate": 6.48, "change": 0.12},
-        "BTC/USD": {"rate": 67842.50, "change": 2.45},
-        "ETH/USD": {"rate": 3456.80, "change": 1.87},
-    }
-    pair = pair.upper().strip()
-    data = rates.get(pair)
-    if not data:
-        return f"Par '{pair}' nao encontrado. Pares disponiveis: {', '.join(rates.keys())}"
-    sign = "+" if data["change"] >= 0 else ""
-    return f"{pair}: {data['rate']:.2f} ({sign}{data['change']:.2f}%)"
+    rate = get_snapshot().fx(pair)
+    if rate is None:
+        return (
+            f"Par '{pair.upper().strip()}' nao encontrado. "
+            f"Moedas disponiveis (qualquer combinacao): "
+            f"{', '.join(get_snapshot().fx_matrix.currencies)}"
+        )
+    sign = "+" if rate.change >= 0 else ""
+    # Pares cruzados/inversos podem ficar abaixo de 1 (ex: BRL/USD 0.1953)
+    precision = 2 if rate.rate >= 1 else 4
+    return f"{rate.pair}: {rate.rate:.{precision}f} ({sign}{rate.change:.2f}%)"
+
+
+# Mercado informado pelo usuario -> moeda das acoes no snapshot
+MARKET_CURRENCIES = {"b3": "BRL", "brasil": "BRL", "br": "BRL", "eua": "USD", "us": "USD", "usa": "USD"}
+
+
+@tool
+def get_top_movers(
+    direction: str = "alta", market: str = "todos", sector: str = "", limit: int = 5
+) -> str:
+    """Lista as maiores altas ou quedas do dia entre centenas de acoes da B3 e dos EUA.
+
+    Args:
+        direction: "alta" para maiores altas ou "queda" para maiores quedas
+        market: "b3", "eua" ou "todos"
+        sector: Setor opcional (ex: Financeiro, Saude, Petroleo e Gas); vazio para todos
+        limit: Quantidade de acoes (1 a 20)
+    """
+    snapshot = get_snapshot()
+    losers = direction.lower().strip().startswith(("q", "b", "l"))  # queda/baixa/losers
+    currency = MARKET_CURRENCIES.get(market.lower().strip())
+    sector_name = None
+    if sector.strip():
+        sector_name = snapshot.resolve_sector(sector)
+        if sector_name is None:
+            return (
+                f"Setor '{sector}' nao encontrado. Setores disponiveis: "
+                f"{', '.join(st.sector for st in snapshot.sector_stats())}"
+            )
+
+    movers = snapshot.top_movers(max(1, min(limit, 20)), losers, sector_name, currency)
+    scope = ", ".join(filter(None, [market.upper() if currency else "", sector_name or ""]))
+    title = "Maiores quedas" if losers else "Maiores altas"
+    lines = [f"{title}{f' ({scope})' if scope else ''}:"]
+    lines += [
+        f"{q.ticker} | {q.name} | {q.currency} {q.price:.2f} | {q.change:+.2f}%" for q in movers
+    ]
+    return "\n".join(lines)
+
+
+@tool
+def get_sector_performance() -> str:
+    """Retorna o desempenho medio do dia por setor, com a maior alta e a maior queda de cada um."""
+    lines = ["Setor | Acoes | Var% media | Altas/Quedas | Maior alta | Maior queda"]
+    for st in get_snapshot().sector_stats():
+        lines.append(
+            f"{st.sector} | {st.count} | {st.avg_change:+.2f}% | {st.advancers}/{st.decliners} | "
+            f"{st.best.ticker} {st.best.change:+.2f}% | {st.worst.ticker} {st.worst.change:+.2f}%"
+        )
+    return "\n".join(lines)
+
+
+@tool
+def get_price_history(ticker: str, start: str = "1m", end: str = "", interval: str = "1d") -> str:
+    """Consulta o historico de precos (OHLC) de uma acao em um periodo.
+
+    Args:
+        ticker: Ticker ou nome da empresa (ex: VALE3, Petrobras, AAPL)
+        start: Data inicial AAAA-MM-DD ou periodo ate a data final (ex: 5d, 1m, 6m, 1y)
+        end: Data final AAAA-MM-DD; vazio para o ultimo pregao
+        interval: 1d (diario), 1wk (semanal) ou 1mo (mensal)
+    """
+    return describe_history(ticker, start, end, interval)
+
+
+@tool
+def get_indicators(tickers: list[str], indicators: list[str] | None = None, window: int = 20) -> str:
+    """Calcula indicadores tecnicos (SMA, EMA, RSI, volatilidade) de varias acoes.
+
+    Use para medias moveis, RSI/IFR e volatilidade em vez de calcular a
+    partir do historico; aceita dezenas de tickers em uma unica chamada.
+
+    Args:
+        tickers: Lista de tickers ou nomes de empresas (ex: ["PETR4", "Vale", "AAPL"])
+        indicators: Indicadores desejados: sma, ema, rsi, vol; vazio para todos
+        window: Janela em pregoes (ex: 9, 14, 20, 50)
+    """
+    return describe_indicators(tickers, indicators, window)
+
+
+@tool
+async def get_portfolio_risk(
+    holdings: str, base_currency: str = "BRL", confidence: float = 0.95, horizon_days: int = 1
+) -> str:
+    """Avalia uma carteira com moedas diferentes e calcula o VaR (historico e Monte Carlo).
+
+    Args:
+        holdings: Posicoes em texto (ex: "100 PETR4, 50 AAPL, 2000 USD")
+        base_currency: Moeda de referencia da avaliacao (ex: BRL, USD, EUR)
+        confidence: Nivel de confianca do VaR (ex: 0.95, 0.99)
+        horizon_days: Horizonte do VaR em pregoes
+    """
+    return await describe_portfolio(holdings, base_currency, confidence, horizon_days)
 
 
 # =============================================================
 # LLM e Graph
 # =============================================================
 
-tools_list = [get_stock_price, get_market_summary, get_exchange_rate]
+tools_list = [
+    get_stock_price, get_stock_prices, get_market_summary, get_exchange_rate,
+    get_top_movers, get_sector_performance, get_price_history, get_indicators,
+    get_portfolio_risk,
+]
 tools_by_name = {t.name: t for t in tools_list}
+
+# Perguntas simples de cotacao/cambio sao respondidas antes do grafo
+fast_path = FastPathRouter(
+    quote=get_stock_price.func,
+    quotes=get_stock_prices.func,
+    exchange_rate=get_exchange_rate.func,
+    market_summary=get_market_summary.func,
+)
+# Respostas finais de perguntas repetidas, por versao do snapshot de mercado
+response_cache = ResponseCache()
+
+_llm = None
 _llm_with_tools = None
 
+# Pool limitado para tools sincronas: tool calls paralelas do LLM rodam
+# ao mesmo tempo sem bloquear o event loop, e a latencia do node passa a
+# ser a da tool mais lenta.
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+_tool_executor = ThreadPoolExecutor(
+    max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool"
+)
+
 
 def get_llm():
     """Inicializa o LLM com credenciais Azure (Managed Identity do ACA)."""
@@ -135,52 +312,104 @@ def get_llm():
     )
     api_version = os.getenv("OPENAI_API_VERSION", "2025-01-01-preview")
 
-    credential = DefaultAzureCredential()
-    token_provider = get_bearer_token_provider(
-        credential, "https://cognitiveservices.azure.com/.default"
+    scope = "https://cognitiveservices.azure.com/.default"
+    token_provider = get_bearer_token_provider(DefaultAzureCredential(), scope)
+    # Provider async: renovar o token nao bloqueia o event loop no ainvoke
+    async_token_provider = get_async_bearer_token_provider(
+        AsyncDefaultAzureCredential(), scope
     )
     return AzureChatOpenAI(
         azure_deployment=deployment_name,
         azure_ad_token_provider=token_provider,
+        azure_ad_async_token_provider=async_token_provider,
         azure_endpoint=azure_endpoint,
         api_version=api_version,
+        # Sempre em streaming com include_usage: o uso de tokens chega no
+        # usage_metadata tanto em /chat quanto em /chat/stream
+        streaming=True,
+        model_kwargs={"stream_options": {"include_usage": True}},
     )
 
 
+def get_shared_llm():
+    """Retorna o LLM sem tools (singleton), base do agente e do resumo."""
+    global _llm
+    if _llm is None:
+        _llm = get_llm()
+    return _llm
+
+
 def get_llm_with_tools():
     """Retorna o LLM com tools vinculadas (singleton)."""
     global _llm_with_tools
     if _llm_with_tools is None:
-        _llm_with_tools = get_llm().bind_tools(tools_list)
+        _llm_with_tools = get_shared_llm().bind_tools(tools_list)
     return _llm_with_tools
 
 
+async def summarize_history(previous: Optional[str], messages: list) -> str:
+    """Resumo rolante dos turnos antigos, gerado em background."""
+    response = await get_shared_llm().ainvoke(build_summary_messages(previous, messages))
+    return response.content
+
+
+# Orcamento de tokens do historico (CONTEXT_TOKEN_BUDGET)
+context_window = ContextWindow(summarize=summarize_history)
+
+
 # --- Nodes do grafo ---
 
-def llm_call(state: MessagesState):
+async def llm_call(state: MessagesState):
     """Node: LLM decide se chama uma tool ou responde diretamente."""
+    # O estado mantem o historico completo; so o prompt e recortado
+    messages = context_window.prepare(state["messages"])
     return {
         "messages": [
-            get_llm_with_tools().invoke(
-                [SystemMessage(content=SYSTEM_PROMPT)] + state["messages"]
+            await get_llm_with_tools().ainvoke(
+                [SystemMessage(content=SYSTEM_PROMPT)] + messages
             )
         ]
     }
 
 
-def tool_node(state: MessagesState):
-    """Node: Executa as tool calls solicitadas pelo LLM."""
-    results = []
+async def _run_tool_call(tool_call: dict) -> ToolMessage:
+    """Executa uma tool call; erros viram um ToolMessage de erro para o LLM."""
+    name = tool_call["name"]
+    fn = tools_by_name.get(name)
+    try:
+        if fn is None:
+            raise ValueError(f"tool '{name}' nao existe")
+        if getattr(fn, "coroutine", None) is not None:
+            observation = await fn.ainvoke(tool_call["args"])
+        else:
+            # copy_context preserva o contexto (callbacks/tracing) na thread
+            ctx = contextvars.copy_context()
+            observation = await asyncio.get_running_loop().run_in_executor(
+                _tool_executor, ctx.run, fn.invoke, tool_call["args"]
+            )
+    except Exception as exc:
+        logger.exception("Erro ao executar a tool %s", name)
+        return ToolMessage(
+            content=f"Erro ao executar {name}: {exc}",
+            name=name,
+            tool_call_id=tool_call["id"],
+            status="error",
+        )
+    return ToolMessage(
+        content=str(observation), name=name, tool_call_id=tool_call["id"]
+    )
+
+
+async def tool_node(state: MessagesState):
+    """Node: Executa em paralelo as tool calls solicitadas pelo LLM."""
     last_message = state["messages"][-1]
     if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
         return {"messages": []}
-    for tool_call in last_message.tool_calls:
-        fn = tools_by_name[tool_call["name"]]
-        observation = fn.invoke(tool_call["args"])
-        results.append(
-            ToolMessage(content=str(observation), tool_call_id=tool_call["id"])
-        )
-    return {"messages": results}
+    # gather preserva a ordem das tool calls nos resultados
+    results = await asyncio.gather(
+        *(_run_tool_call(tool_call) for tool_call in last_message.tool_calls)
+    )
+    return {"messages": list(results)}
 
 
 def should_continue(state: MessagesState) -> Literal["Action", "__end__"]:
@@ -216,13 +445,37 @@ def build_agent():
 # =============================================================
 
 class ChatRequest(BaseModel):
-    """Corpo da requisicao POST /chat."""
+    """Corpo da requisicao POST /chat.
+
+    session_id identifica a conversa; omitido, uma nova sessao e criada.
+    """
     message: str
+    session_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
-    """Corpo da resposta POST /chat."""
+    """Corpo da resposta POST /chat.
+
+    usage traz input_tokens, output_tokens e total_tokens do turno (zerado
+    quando a resposta veio do fast path ou do cache).
+    """
     response: str
+    session_id: str
+    usage: Optional[dict] = None
+
+
+NO_USAGE = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+
+
+def turn_usage(messages: list) -> Optional[dict]:
+    """Soma o usage_metadata das AIMessages do turno (None se o modelo nao reportou)."""
+    usage = None
+    for msg in messages:
+        if isinstance(msg, AIMessage) and msg.usage_metadata:
+            usage = add_usage(usage, msg.usage_metadata)
+    if usage is None:
+        return None
+    return {key: usage.get(key, 0) for key in NO_USAGE}
 
 
 @asynccontextmanager
@@ -230,8 +483,12 @@ async def lifespan(app: FastAPI):
     """Inicializa o agente LangGraph no startup do servidor."""
     logger.info("Inicializando agente LangGraph...")
     app.state.agent = build_agent()
+    app.state.sessions = create_session_store()
     logger.info("Agente pronto para receber requisicoes.")
     yield
+    await context_window.aclose()
+    await app.state.sessions.aclose()
+    shutdown_risk_pool()
     logger.info("Servidor encerrado.")
 
 
@@ -250,23 +507,174 @@ async def health():
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     """Envia uma mensagem ao agente e retorna a resposta.
 
-    O agente pode chamar tools (get_stock_price, get_market_summary,
-    get_exchange_rate) antes de produzir a resposta final.
+    O agente pode chamar as tools de tools_list antes de produzir a
+    resposta final.
+    O grafo roda de forma assincrona: a requisicao nao ocupa uma thread do
+    threadpool do Starlette enquanto espera o LLM. O historico da sessao
+    (session_id) e carregado antes e salvo depois de cada turno, sob o
+    lock da sessao: turnos concorrentes da mesma sessao rodam em serie.
     """
-    result = app.state.agent.invoke({
-        "messages": [HumanMessage(content=req.message)]
+    session_id = req.session_id or uuid.uuid4().hex
+    # Turnos da mesma sessao em serie: o segundo ve o historico salvo pelo primeiro
+    async with app.state.sessions.lock(session_id):
+        history = await app.state.sessions.load(session_id)
+
+        cache_key = response_cache.key_for(req.message)
+        answer = answer_without_graph(req.message, session_id, history, cache_key)
+        if answer is not None:
+            return ChatResponse(response=answer, session_id=session_id, usage=NO_USAGE)
+
+        result = await app.state.agent.ainvoke({
+            "messages": history + [HumanMessage(content=req.message)]
+        })
+        app.state.sessions.save(session_id, result["messages"])
+        turn = result["messages"][len(history):]
+        usage = turn_usage(turn)
+
+        # Extrair ultima AIMessage com conteudo (somente deste turno)
+        for msg in reversed(turn):
+            if isinstance(msg, AIMessage) and msg.content:
+                content = msg.content if isinstance(msg.content, str) else str(msg.content)
+                if not history:
+                    response_cache.put(cache_key, content)
+                return ChatResponse(response=content, session_id=session_id, usage=usage)
+
+        return ChatResponse(
+            response="Sem resposta do agente.", session_id=session_id, usage=usage
+        )
+
+
+def answer_without_graph(
+    message: str, session_id: str, history: list, cache_key: tuple
+) -> Optional[str]:
+    """Responde pelo fast path ou pelo cache e registra o turno na sessao.
+
+    O cache so vale para perguntas sem historico: com historico, a resposta
+    depende do contexto da conversa. Pelo mesmo motivo, com historico o fast
+    path so responde perguntas completas (nao "e o itau?").
+    """
+    routed = fast_path.route(message, has_history=bool(history))
+    if routed is not None:
+        intent, answer = routed
+        fast_path_counter.add(1, {"intent": intent})
+    elif not history:
+        answer = response_cache.get(cache_key)
+    else:
+        answer = None
+    if answer is None:
+        return None
+    app.state.sessions.save(
+        session_id, history + [HumanMessage(content=message), AIMessage(content=answer)]
+    )
+    return answer
+
+
+def _sse(event: str, data: dict) -> str:
+    """Formata um evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _chat_events(message: str, session_id: str):
+    """Eventos SSE de um turno, com o lock da sessao (turnos em serie)."""
+    async with app.state.sessions.lock(session_id):
+        async for event in _stream_turn(message, session_id):
+            yield event
+
+
+async def _stream_turn(message: str, session_id: str):
+    """Executa o grafo em modo streaming e gera os eventos SSE.
+
+    Eventos:
+        token      - trecho de texto gerado pelo LLM
+        tool_start - o LLM pediu a execucao de tools
+        tool_end   - uma tool terminou (com status success/error)
+        done       - resposta final, session_id, time-to-first-token (ms) e
+                     uso de tokens do turno
+        error      - falha ao executar o agente
+    """
+    started = time.perf_counter()
+    ttft_ms = None
+    response = ""
+    final_state = None
+    try:
+        history = await app.state.sessions.load(session_id)
+        cache_key = response_cache.key_for(message)
+        answer = answer_without_graph(message, session_id, history, cache_key)
+        if answer is not None:
+            ttft_ms = (time.perf_counter() - started) * 1000
+            yield _sse("token", {"content": answer})
+            yield _sse("done", {
+                "response": answer, "session_id": session_id, "ttft_ms": round(ttft_ms, 1),
+                "usage": NO_USAGE,
+            })
+            return
+
+        async for mode, payload in app.state.agent.astream(
+            {"messages": history + [HumanMessage(content=message)]},
+            stream_mode=["messages", "updates", "values"],
+        ):
+            if mode == "values":
+                final_state = payload
+                continue
+            if mode == "messages":
+                chunk, metadata = payload
+                if (
+                    metadata.get("langgraph_node") == "llm_call"
+                    and isinstance(chunk, AIMessageChunk)
+                    and isinstance(chunk.content, str)
+                    and chunk.content
+                ):
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                        ttft_histogram.record(ttft_ms)
+                    yield _sse("token", {"content": chunk.content})
+                continue
+
+            for node, update in payload.items():
+                for msg in (update or {}).get("messages", []):
+                    if isinstance(msg, AIMessage) and msg.tool_calls:
+                        yield _sse("tool_start", {
+                            "tools": [tc["name"] for tc in msg.tool_calls],
+                        })
+                    elif isinstance(msg, AIMessage) and msg.content:
+                        response = msg.content if isinstance(msg.content, str) else str(msg.content)
+                    elif isinstance(msg, ToolMessage):
+                        yield _sse("tool_end", {"tool": msg.name, "status": msg.status})
+    except Exception:
+        logger.exception("Erro no streaming do agente")
+        yield _sse("error", {"detail": "Erro interno ao processar a mensagem."})
+        return
+
+    usage = None
+    if final_state is not None:
+        app.state.sessions.save(session_id, final_state["messages"])
+        usage = turn_usage(final_state["messages"][len(history):])
+    if response and not history:
+        response_cache.put(cache_key, response)
+
+    yield _sse("done", {
+        "response": response or "Sem resposta do agente.",
+        "session_id": session_id,
+        "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+        "usage": usage,
     })
 
-    # Extrair ultima AIMessage com conteudo
-    for msg in reversed(result["messages"]):
-        if isinstance(msg, AIMessage) and msg.content:
-            content = msg.content if isinstance(msg.content, str) else str(msg.content)
-            return ChatResponse(response=content)
 
-    return ChatResponse(response="Sem resposta do agente.")
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Envia uma mensagem ao agente e transmite a resposta via SSE.
+
+    Os tokens do LLM e o progresso das tools chegam a medida que sao
+    gerados, em vez de esperar o grafo terminar como em POST /chat.
+    """
+    return StreamingResponse(
+        _chat_events(req.message, req.session_id or uuid.uuid4().hex),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # =============================================================
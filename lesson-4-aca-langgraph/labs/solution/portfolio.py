@@ -0,0 +1,290 @@
+"""
+Avaliacao de carteiras e Value-at-Risk (VaR).
+
+Recebe posicoes em texto livre ("100 PETR4, 50 AAPL, 2000 USD"), avalia
+cada uma na moeda de referencia e calcula o risco da parte em acoes:
+
+- conversao cambial vetorizada: uma matriz de exposicao (posicoes x
+  moedas) multiplicada pela coluna da moeda de referencia na FxMatrix
+  do snapshot (pares cruzados ja triangulados);
+- VaR historico: P&L da carteira atual aplicado aos retornos dos ultimos
+  VAR_LOOKBACK pregoes do historico local (price_history.py);
+- VaR Monte Carlo: retornos normais multivariados com a media e a
+  covariancia historicas, VAR_PATHS cenarios simulados em lotes em um
+  ProcessPoolExecutor, para que a simulacao (CPU) nao bloqueie o event
+  loop do servidor nem dispute o GIL com as demais requisicoes.
+
+O cambio e mantido constante no horizonte: o risco cambial nao e modelado.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from typing import Optional
+
+import numpy as np
+
+from market_data import get_snapshot
+from price_history import CLOSE, DATE, get_store
+
+VAR_PATHS = int(os.getenv("VAR_PATHS", "100000"))
+VAR_LOOKBACK = int(os.getenv("VAR_LOOKBACK", "250"))
+# Cenarios por tarefa enviada ao pool. Lotes pequenos limitam a memoria e o
+# trabalho que ainda roda apos um timeout (so os lotes ja despachados)
+VAR_CHUNK = int(os.getenv("VAR_CHUNK", "10000"))
+# Deve ficar abaixo do tempo limite de uma tool call
+VAR_TIMEOUT = float(os.getenv("VAR_TIMEOUT", "20"))
+VAR_WORKERS = int(os.getenv("VAR_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+MAX_POSITIONS = 50
+
+_NUMBER = re.compile(r"^\d[\d.,]*$")
+_SEPARATORS = re.compile(r"[;\n]|,\s+|,(?=[^\W\d])|\s+e\s+")
+# Virgula logo apos um simbolo ("PETR4,50 AAPL") tambem separa itens;
+# entre digitos ("1,5") e separador decimal
+_SYMBOL_COMMA = re.compile(r"\b([^\W\d][\w.]*),(?=\d)")
+
+
+def parse_number(text: str) -> float:
+    """Quantidade em formato brasileiro ou americano (2.000, 2,000, 1,5, 1.5)."""
+    if "," in text and "." in text:
+        decimal = "," if text.rfind(",") > text.rfind(".") else "."
+        thousands = "." if decimal == "," else ","
+        return float(text.replace(thousands, "").replace(decimal, "."))
+    sep = "," if "," in text else "."
+    head, _, tail = text.rpartition(sep)
+    if head and len(tail) == 3:
+        return float(text.replace(sep, ""))
+    return float(text.replace(",", "."))
+
+
+def parse_holdings(text: str) -> tuple:
+    """([(quantidade, simbolo), ...], trechos nao entendidos).
+
+    Cada item e "quantidade simbolo" ou "simbolo quantidade"; o simbolo
+    pode ser ticker, nome de empresa ou codigo de moeda.
+    """
+    holdings, invalid = [], []
+    text = _SYMBOL_COMMA.sub(r"\1;", text)
+    for chunk in _SEPARATORS.split(text):
+        words = chunk.replace(":", " ").replace("x ", " ").split()
+        if not words:
+            continue
+        if _NUMBER.match(words[0]) and len(words) > 1:
+            number, symbol = words[0], " ".join(words[1:])
+        elif _NUMBER.match(words[-1]) and len(words) > 1:
+            number, symbol = words[-1], " ".join(words[:-1])
+        else:
+            invalid.append(chunk.strip())
+            continue
+        try:
+            holdings.append((parse_number(number), symbol))
+        except ValueError:
+            invalid.append(chunk.strip())
+    return holdings, invalid
+
+
+class Position:
+    """Posicao avaliada: acao (ticker) ou caixa em moeda (ticker None)."""
+
+    __slots__ = ("symbol", "ticker", "quantity", "currency", "price", "value")
+
+    def __init__(self, symbol: str, ticker: Optional[str], quantity: float,
+                 currency: str, price: float):
+        self.symbol = symbol
+        self.ticker = ticker
+        self.quantity = quantity
+        self.currency = currency
+        self.price = price
+        self.value = 0.0
+
+
+def build_positions(holdings: list, base: str) -> tuple:
+    """(posicoes avaliadas na moeda base, simbolos nao encontrados)."""
+    snapshot = get_snapshot()
+    merged, missing = {}, []
+    for quantity, symbol in holdings[:MAX_POSITIONS]:
+        code = symbol.upper().strip()
+        quote = snapshot.quote(symbol)
+        if quote is not None:
+            key = (quote.ticker, quote.currency, quote.price)
+        elif code in snapshot.fx_matrix.currencies:
+            key = (None, code, 1.0)
+        else:
+            missing.append(symbol)
+            continue
+        merged[key] = merged.get(key, 0.0) + quantity
+
+    positions = [
+        Position(ticker or currency, ticker, quantity, currency, price)
+        for (ticker, currency, price), quantity in merged.items()
+    ]
+    if positions:
+        currencies = sorted({p.currency for p in positions})
+        column = {c: i for i, c in enumerate(currencies)}
+        # Matriz de exposicao (posicoes x moedas) em moeda local
+        exposure = np.zeros((len(positions), len(currencies)))
+        for i, p in enumerate(positions):
+            exposure[i, column[p.currency]] = p.quantity * p.price
+        values = exposure @ snapshot.fx_matrix.rates_to(currencies, base)
+        for p, value in zip(positions, values):
+            p.value = float(value)
+    return positions, missing
+
+
+def aligned_returns(tickers: list, lookback: int = VAR_LOOKBACK) -> Optional[np.ndarray]:
+    """Log-retornos diarios (T, n) nas datas comuns aos tickers, ou None."""
+    store = get_store()
+    tables = [store.series(t) for t in tickers]
+    if any(t is None or t.shape[1] < 3 for t in tables):
+        return None
+    tails = [t[:, -(lookback + 1):] for t in tables]
+    common = reduce(np.intersect1d, (t[DATE] for t in tails))
+    if len(common) < 3:
+        return None
+    closes = np.column_stack([
+        t[CLOSE, np.searchsorted(t[DATE], common)] for t in tails
+    ])
+    return np.diff(np.log(closes), axis=0)
+
+
+def simulate_pnl(values: np.ndarray, mean: np.ndarray, cov: np.ndarray,
+                 paths: int, seed: int) -> np.ndarray:
+    """P&L de `paths` cenarios normais multivariados (roda no pool de processos)."""
+    rng = np.random.default_rng(seed)
+    jitter = np.eye(len(values)) * 1e-12 * max(np.trace(cov), 1e-12)
+    chol = np.linalg.cholesky(cov + jitter)
+    returns = mean + rng.standard_normal((paths, len(values))) @ chol.T
+    return np.expm1(returns) @ values
+
+
+def value_at_risk(pnl: np.ndarray, confidence: float) -> tuple:
+    """(VaR, CVaR) como perdas positivas."""
+    cutoff = np.quantile(pnl, 1.0 - confidence)
+    tail = pnl[pnl <= cutoff]
+    return float(-cutoff), float(-tail.mean()) if len(tail) else float(-cutoff)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_risk_pool() -> ProcessPoolExecutor:
+    """Pool de processos do VaR Monte Carlo (criado no primeiro uso).
+
+    Usa "spawn": o servidor ja tem threads (tools, telemetria), e fork
+    nesse estado pode travar o processo filho.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=VAR_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_risk_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def monte_carlo_var(values: np.ndarray, returns: np.ndarray, horizon: int,
+                          confidence: float, paths: int = VAR_PATHS,
+                          seed: Optional[int] = None) -> tuple:
+    """(VaR, CVaR) Monte Carlo, simulado em lotes no pool de processos.
+
+    Se a espera for cancelada (timeout do asyncio.wait_for) ou um lote
+    falhar, os lotes ainda na fila do pool sao cancelados; apenas os ja
+    despachados aos processos (no maximo VAR_WORKERS + 1) terminam.
+    """
+    mean = returns.mean(axis=0) * horizon
+    cov = np.atleast_2d(np.cov(returns, rowvar=False)) * horizon
+    chunks = [VAR_CHUNK] * (paths // VAR_CHUNK) + ([paths % VAR_CHUNK] if paths % VAR_CHUNK else [])
+    seeds = np.random.SeedSequence(seed).generate_state(len(chunks))
+
+    pool = get_risk_pool()
+    futures = [
+        pool.submit(simulate_pnl, values, mean, cov, size, int(s))
+        for size, s in zip(chunks, seeds)
+    ]
+    try:
+        results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return value_at_risk(np.concatenate(results), confidence)
+
+
+async def describe_portfolio(holdings: str, base_currency: str = "BRL",
+                             confidence: float = 0.95, horizon_days: int = 1) -> str:
+    """Valor e risco (VaR historico e Monte Carlo) da carteira, em texto para o LLM."""
+    base = base_currency.upper().strip() or "BRL"
+    parsed, invalid = parse_holdings(holdings)
+    if not parsed:
+        return (
+            "Nenhuma posicao reconhecida. Informe quantidade e ativo, "
+            "ex: 100 PETR4, 50 AAPL, 2000 USD."
+        )
+    positions, missing = build_positions(parsed, base)
+    if any(np.isnan(p.value) for p in positions):
+        return f"Moeda de referencia '{base}' sem cotacao para converter a carteira."
+    if confidence > 1:
+        confidence /= 100  # aceita 95 ou 0.95
+    confidence = min(max(confidence, 0.5), 0.999)
+    horizon = max(1, min(int(horizon_days), 30))
+
+    total = sum(p.value for p in positions)
+    lines = [
+        f"Carteira em {base}:",
+        f"Ativo | Qtde | Moeda | Preco | Valor ({base}) | Peso",
+    ]
+    for p in sorted(positions, key=lambda p: -p.value):
+        # Caixa: o preco exibido e a taxa de conversao para a moeda base
+        if p.ticker:
+            label, price = p.symbol, p.price
+        else:
+            label, price = f"{p.symbol} (caixa)", p.value / p.quantity
+        weight = p.value / total * 100 if total else 0.0
+        lines.append(
+            f"{label} | {p.quantity:g} | {p.currency} | {price:.2f} | "
+            f"{p.value:.2f} | {weight:.1f}%"
+        )
+    lines.append(f"Total: {total:.2f} {base}")
+
+    stocks = [p for p in positions if p.ticker]
+    returns = aligned_returns([p.ticker for p in stocks]) if stocks else None
+    if stocks and returns is not None and total > 0:
+        values = np.array([p.value for p in stocks])
+        pnl = np.expm1(returns) @ values
+        hist_var, hist_cvar = value_at_risk(pnl, confidence)
+        scale = np.sqrt(horizon)  # regra da raiz do tempo para o historico
+        lines += [
+            f"Risco (horizonte de {horizon} {'pregao' if horizon == 1 else 'pregoes'}, "
+            f"confianca {confidence:.0%}):",
+            f"- VaR historico: {hist_var * scale:.2f} {base} "
+            f"({hist_var * scale / total:.2%}) | CVaR: {hist_cvar * scale:.2f} {base} "
+            f"[{len(pnl)} pregoes]",
+        ]
+        try:
+            mc_var, mc_cvar = await asyncio.wait_for(
+                monte_carlo_var(values, returns, horizon, confidence), VAR_TIMEOUT
+            )
+            lines.append(
+                f"- VaR Monte Carlo: {mc_var:.2f} {base} ({mc_var / total:.2%}) | "
+                f"CVaR: {mc_cvar:.2f} {base} [{VAR_PATHS} cenarios]"
+            )
+        except asyncio.TimeoutError:
+            lines.append("- VaR Monte Carlo indisponivel: simulacao excedeu o tempo limite.")
+        lines.append("Cambio mantido constante no horizonte (risco cambial nao modelado).")
+    elif stocks:
+        lines.append("Historico insuficiente para calcular o VaR.")
+
+    if missing:
+        lines.append(f"Nao encontrados: {', '.join(missing)}")
+    if invalid:
+        lines.append(f"Itens ignorados (sem quantidade): {', '.join(invalid)}")
+    return "\n".join(lines)
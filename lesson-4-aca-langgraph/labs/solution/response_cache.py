@@ -0,0 +1,109 @@
+"""
+Cache de respostas do agente para perguntas repetidas.
+
+Muitos usuarios fazem a mesma pergunta em poucos minutos ("resumo do
+mercado"), e cada uma rodava o grafo inteiro. ResponseCache guarda a
+resposta final por (pergunta normalizada, versao do snapshot de mercado):
+
+- quando um novo snapshot e publicado (swap_snapshot), todas as entradas
+  da versao anterior sao descartadas, ja que as cotacoes mudaram;
+- a memoria e limitada por LRU com contabilidade de bytes
+  (RESPONSE_CACHE_MAX_BYTES) e um TTL de seguranca (RESPONSE_CACHE_TTL);
+- hits e misses sao exportados como contadores OpenTelemetry.
+
+So perguntas sem historico de sessao sao cacheadas: com historico, a
+resposta depende do contexto da conversa.
+"""
+
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from opentelemetry import metrics
+
+from fast_path import normalize
+from market_data import get_snapshot
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+
+meter = metrics.get_meter(__name__)
+hit_counter = meter.create_counter(
+    "agent.response_cache.hits", description="Respostas servidas pelo cache"
+)
+miss_counter = meter.create_counter(
+    "agent.response_cache.misses", description="Perguntas que precisaram rodar o grafo"
+)
+
+
+class ResponseCache:
+    """LRU de respostas limitado em bytes e amarrado a versao do snapshot."""
+
+    def __init__(
+        self,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        ttl: float = RESPONSE_CACHE_TTL,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[tuple, tuple[float, str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._version = None
+
+    def key_for(self, question: str) -> tuple:
+        """Chave (pergunta normalizada, versao do snapshot corrente).
+
+        Obtida antes de rodar o grafo: se o snapshot mudar durante a
+        execucao, put() descarta a resposta calculada com dados antigos.
+        """
+        version = get_snapshot().version
+        if version != self._version:
+            # Novo snapshot: respostas anteriores citam cotacoes antigas
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+        return normalize(question), version
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Resposta cacheada para a chave, ou None."""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            miss_counter.add(1)
+            return None
+        self._entries.move_to_end(key)
+        hit_counter.add(1)
+        return entry[1]
+
+    def put(self, key: tuple, answer: str) -> None:
+        """Guarda a resposta final de uma pergunta sem historico."""
+        if not self.enabled or not answer or key[1] != self._version:
+            return
+        size = sys.getsizeof(key[0]) + sys.getsizeof(answer)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, answer, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
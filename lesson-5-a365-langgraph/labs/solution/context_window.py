@@ -0,0 +1,228 @@
+"""
+Token-budgeted context window for llm_call.
+
+With per-session history, the prompt grows every turn (and with every tool
+output). ContextWindow.prepare() builds the prompt sent to the LLM without
+changing the graph state:
+
+1. Counts tokens per message, cached by a content fingerprint (only new
+   messages are counted on each iteration; history reloaded from the
+   session reuses the counts from previous turns).
+2. If the total is over budget, shortens tool outputs from earlier turns.
+3. If it is still over, cuts the oldest turns (always at a HumanMessage,
+   so tool calls are never separated from their results) and replaces them
+   with a summary generated by the LLM in the background. Until that
+   summary is ready, the previous summary (or none) is used.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+# Tool outputs from earlier turns are cut to this size (characters)
+OLD_TOOL_OUTPUT_CHARS = 200
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below between a user and a financial market "
+    "assistant in at most 10 lines, in Brazilian Portuguese. Keep tickers, "
+    "values, currency pairs and the user's requests. If there is a previous "
+    "summary, incorporate it."
+)
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken missing or encoding file unavailable
+    _encoding = None
+
+
+def _text_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def fingerprint(msg: BaseMessage) -> int:
+    """Identity of a message based on its content.
+
+    Messages reloaded from session_store get new ids every turn, so the
+    caches key on content rather than msg.id.
+    """
+    if isinstance(msg, AIMessage) and msg.tool_calls:
+        extra = tuple(tc["id"] for tc in msg.tool_calls)
+    else:
+        extra = getattr(msg, "tool_call_id", None)
+    return hash((msg.type, str(msg.content), extra))
+
+
+class TokenCounter:
+    """Counts tokens per message, with an LRU cache keyed by fingerprint."""
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[int, int]" = OrderedDict()
+
+    def count(self, msg: BaseMessage) -> int:
+        key = fingerprint(msg)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        text = msg.content if isinstance(msg.content, str) else json.dumps(msg.content)
+        tokens = 4 + _text_tokens(text)  # ~4 tokens of overhead per message
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            tokens += _text_tokens(json.dumps([tc["args"] for tc in msg.tool_calls]))
+
+        self._cache[key] = tokens
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return tokens
+
+
+class ContextWindow:
+    """Builds the LLM prompt within a token budget."""
+
+    def __init__(
+        self,
+        budget: int = CONTEXT_TOKEN_BUDGET,
+        summarize: Optional[Callable[[Optional[str], list], Awaitable[str]]] = None,
+        max_summaries: int = 1000,
+    ):
+        self.budget = budget
+        self.summarize = summarize
+        self.counter = TokenCounter()
+        self.max_summaries = max_summaries
+        # fingerprint of a summarized prefix -> summary of the whole prefix
+        self._summaries: "OrderedDict[int, str]" = OrderedDict()
+        self._pending: set = set()
+        self._tasks: set = set()
+
+    def prepare(self, messages: list) -> list:
+        """Return the messages to send to the LLM (without the system prompt)."""
+        counts = [self.counter.count(m) for m in messages]
+        if sum(counts) <= self.budget:
+            return messages
+
+        # 1. Shorten tool outputs from turns before the current one
+        last_human = _last_index(messages, HumanMessage)
+        messages = [
+            _collapse_tool_output(m) if i < last_human and isinstance(m, ToolMessage) else m
+            for i, m in enumerate(messages)
+        ]
+        counts = [self.counter.count(m) for m in messages]
+        if sum(counts) <= self.budget:
+            return messages
+
+        # 2. Cut old turns: longest suffix (starting at a HumanMessage) that
+        #    fits in half the budget, leaving room for the summary
+        cut = last_human
+        recent_tokens = sum(counts[last_human:])
+        for i in range(last_human - 1, -1, -1):
+            recent_tokens += counts[i]
+            if recent_tokens > self.budget // 2:
+                break
+            if isinstance(messages[i], HumanMessage):
+                cut = i
+        if cut <= 0:
+            return messages
+
+        older, recent = messages[:cut], messages[cut:]
+        summary = self._summary_for(older)
+        if summary:
+            return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + recent
+        return recent
+
+    def _summary_for(self, older: list) -> Optional[str]:
+        """Latest available summary for older; schedules whatever is missing.
+
+        Summaries are incremental: they start from the longest prefix already
+        summarized and ask the LLM to fold in only the messages after it.
+        """
+        prefix_keys, key = [], 0
+        for msg in older:
+            key = hash((key, fingerprint(msg)))
+            prefix_keys.append(key)
+
+        start, summary = 0, None
+        for i in range(len(older) - 1, -1, -1):
+            cached = self._summaries.get(prefix_keys[i])
+            if cached is not None:
+                start, summary = i + 1, cached
+                break
+
+        if start < len(older):
+            self._schedule(prefix_keys[-1], summary, older[start:])
+        return summary
+
+    def _schedule(self, key: int, previous: Optional[str], messages: list) -> None:
+        if self.summarize is None or key in self._pending:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._pending.add(key)
+        # Empty context: without the current run's contextvars (LangGraph config
+        # and callbacks), summary tokens never leak into the answer stream
+        task = loop.create_task(
+            self._summarize(key, previous, messages), context=contextvars.Context()
+        )
+        # Strong reference: the loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def aclose(self) -> None:
+        """Cancel summaries still running (call on shutdown)."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _summarize(self, key: int, previous: Optional[str], messages: list) -> None:
+        try:
+            self._summaries[key] = await self.summarize(previous, messages)
+            if len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+        except Exception as exc:
+            logger.warning("Failed to summarize history: %s", exc)
+        finally:
+            self._pending.discard(key)
+
+
+def build_summary_messages(previous: Optional[str], messages: list) -> list:
+    """Prompt asking the LLM to summarize part of the history."""
+    lines = []
+    if previous:
+        lines.append(f"Previous summary:\n{previous}\n")
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            lines.append(f"User: {msg.content}")
+        elif isinstance(msg, AIMessage) and msg.content:
+            lines.append(f"Assistant: {msg.content}")
+        elif isinstance(msg, ToolMessage):
+            lines.append(f"Tool {msg.name or ''}: {str(msg.content)[:OLD_TOOL_OUTPUT_CHARS]}")
+    return [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content="\n".join(lines))]
+
+
+def _collapse_tool_output(msg: ToolMessage) -> ToolMessage:
+    content = str(msg.content)
+    if len(content) <= OLD_TOOL_OUTPUT_CHARS:
+        return msg
+    return msg.model_copy(update={"content": content[:OLD_TOOL_OUTPUT_CHARS] + " [...]"})
+
+
+def _last_index(messages: list, cls) -> int:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], cls):
+            return i
+    return 0
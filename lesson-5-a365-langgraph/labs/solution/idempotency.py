@@ -0,0 +1,191 @@
+"""
+Idempotent activity handling for Bot Framework retries.
+
+Bot Framework channels retry /api/messages deliveries when they time out.
+Without deduplication every retry runs the LangGraph agent (and the LLM)
+again. ActivityDeduplicator keys each activity on conversation.id +
+activity.id and:
+
+- returns the cached reply for activities that already completed;
+- coalesces concurrent duplicates onto the same in-flight future, so only
+  one agent run happens per activity.
+
+Completed replies live in a TTL store: in memory by default, or in a
+local SQLite file when IDEMPOTENCY_DB_PATH is set (survives restarts of
+the same replica; not shared across replicas).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+
+def activity_key(activity) -> Optional[str]:
+    """Idempotency key for an activity, or None if it cannot be deduplicated."""
+    if not activity.id or not activity.conversation or not activity.conversation.id:
+        return None
+    return f"{activity.conversation.id}:{activity.id}"
+
+
+class MemoryReplyStore:
+    """In-memory TTL store, bounded to max_entries (oldest evicted first)."""
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: dict) -> None:
+        now = time.monotonic()
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        # Constant TTL: insertion order is expiry order, so purge from the front
+        while self._entries:
+            oldest_key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at >= now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[oldest_key]
+
+
+class SqliteReplyStore:
+    """TTL store backed by a local SQLite file.
+
+    Queries run in a worker thread so disk I/O never blocks the event loop.
+    """
+
+    def __init__(self, path: str, ttl: float = IDEMPOTENCY_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS replies ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM replies WHERE expires_at < ?", (time.time(),))
+
+    def _get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM replies WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, key: str, value: dict) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO replies (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl),
+            )
+            self._conn.execute("DELETE FROM replies WHERE expires_at < ?", (now,))
+
+    async def get(self, key: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: dict) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+
+def create_reply_store():
+    """Reply store selected by IDEMPOTENCY_DB_PATH (SQLite) or in memory."""
+    path = os.getenv("IDEMPOTENCY_DB_PATH")
+    if path:
+        logger.info("Idempotency store: SQLite at %s", path)
+        return SqliteReplyStore(path)
+    return MemoryReplyStore()
+
+
+class ActivityDeduplicator:
+    """Runs each activity key at most once and remembers its reply."""
+
+    def __init__(self, store=None):
+        self.store = store or create_reply_store()
+        self._inflight: dict = {}
+
+    async def begin(self, key: str) -> bool:
+        """Claim a key for processing.
+
+        Returns False if the key is already in flight or already answered.
+        The in-flight slot is taken synchronously before the store is read,
+        so a concurrent complete() cannot land between the check and the
+        claim: either its reply is found here, or the key was still in flight.
+        """
+        if key in self._inflight:
+            return False
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            cached = await self.store.get(key)
+        except BaseException as exc:
+            self.fail(key, exc)
+            raise
+        if cached is not None:
+            # Already answered: release the slot and hand the cached reply to
+            # any duplicate that started waiting on it meanwhile
+            self._inflight.pop(key, None)
+            future.set_result(cached)
+            return False
+        return True
+
+    async def complete(self, key: str, reply: dict) -> None:
+        """Store the reply and wake up duplicates waiting on the key.
+
+        If the store raises, the key stays in flight: callers must call
+        fail() so later redeliveries are not ignored forever.
+        """
+        await self.store.set(key, reply)
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(reply)
+
+    def fail(self, key: str, exc: BaseException) -> None:
+        """Release the key without caching, so a later retry runs again."""
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(exc)
+            future.exception()  # mark as retrieved when nobody is waiting
+
+    async def run(self, key: Optional[str], factory: Callable[[], Awaitable[dict]]) -> dict:
+        """Return the reply for key, running factory only for the first delivery."""
+        if key is None:
+            return await factory()
+
+        if not await self.begin(key):
+            future = self._inflight.get(key)
+            if future is not None:
+                logger.info("Duplicate activity %s: waiting for in-flight run", key)
+                return await asyncio.shield(future)
+            logger.info("Duplicate activity %s: returning cached reply", key)
+            return await self.store.get(key)
+
+        try:
+            reply = await factory()
+            await self.complete(key, reply)
+        except BaseException as exc:
+            self.fail(key, exc)
+            raise
+        return reply
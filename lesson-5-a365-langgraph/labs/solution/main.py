@@ -8,13 +8,18 @@ This enhanced version adds:
 - Tool Notifications: Progress updates during tool execution
 """
 
+import asyncio
+import contextvars
 import os
 import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from typing import Optional
 
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from langchain_openai import AzureChatOpenAI
@@ -24,20 +29,39 @@ from langgraph.graph import END, START, MessagesState, StateGraph
 from typing_extensions import Literal
 
 from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from azure.identity.aio import (
+    DefaultAzureCredential as AsyncDefaultAzureCredential,
+    get_bearer_token_provider as get_async_bearer_token_provider,
+)
 
 # A365 SDK and Observability
 from azure.monitor.opentelemetry import configure_azure_monitor
-from opentelemetry import trace
+from opentelemetry import context as otel_context, metrics, trace
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
 # Bot Framework
 from botbuilder.core import BotFrameworkAdapter, BotFrameworkAdapterSettings
-from botbuilder.schema import Activity, ActivityTypes
+from botbuilder.schema import Activity, ActivityTypes, Attachment
+
+from idempotency import ActivityDeduplicator, activity_key
+from market_data import get_snapshot
+from price_history import describe_history
+from indicators import describe_indicators
+from portfolio import describe_portfolio, shutdown_risk_pool
+from session_store import create_session_store
+from context_window import ContextWindow, build_summary_messages
+from fast_path import FastPathRouter
+from response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
 # Get tracer for manual instrumentation
 tracer = trace.get_tracer(__name__)
+meter = metrics.get_meter(__name__)
+fast_path_counter = meter.create_counter(
+    "agent.fast_path.answers",
+    description="Questions answered by the fast path without the LLM (by intent)",
+)
 
 SYSTEM_PROMPT = """You are a financial market expert assistant for Brazilian and international markets.
 
@@ -57,6 +81,11 @@ about stocks, currency exchange, indices, and market trends.
 - Include disclaimer: 'Esta informacao e apenas para fins educativos e nao constitui recomendacao de investimento'
 - Format values in Brazilian standard (R$ 1.234,56)
 - Be objective and direct in responses
+- To compare several stocks, call get_stock_prices once with all tickers
+- For top gainers/losers and sector performance, use get_top_movers and get_sector_performance
+- For historical performance (e.g., last month), use get_price_history
+- For moving averages, RSI and volatility, use get_indicators (do not compute them yourself)
+- For a portfolio's total value and risk (VaR), use get_portfolio_risk
 """
 
 
@@ -69,40 +98,62 @@ def get_stock_price(ticker: str) -> str:
     """Query the current stock price by ticker.
 
     Args:
-        ticker: Stock ticker code (e.g., PETR4, VALE3, AAPL)
+        ticker: Ticker or company name (e.g., PETR4, Petrobras, Itau, AAPL)
     """
     with tracer.start_as_current_span("get_stock_price") as span:
         span.set_attribute("ticker", ticker)
-        
-        prices = {
-            "PETR4": {"price": 38.72, "change": 1.23, "currency": "BRL"},
-            "VALE3": {"price": 61.45, "change": -0.87, "currency": "BRL"},
-            "ITUB4": {"price": 32.18, "change": 0.45, "currency": "BRL"},
-            "BBDC4": {"price": 13.95, "change": -0.32, "currency": "BRL"},
-            "WEGE3": {"price": 41.30, "change": 2.15, "currency": "BRL"},
-            "AAPL": {"price": 228.50, "change": 1.85, "currency": "USD"},
-            "MSFT": {"price": 445.20, "change": 3.12, "currency": "USD"},
-            "GOOGL": {"price": 178.90, "change": -1.45, "currency": "USD"},
-            "AMZN": {"price": 198.75, "change": 2.30, "currency": "USD"},
-            "NVDA": {"price": 142.60, "change": 5.40, "currency": "USD"},
-        }
-        ticker = ticker.upper().strip()
-        data = prices.get(ticker)
-        
-        if not data:
+
+        quote = get_snapshot().quote(ticker)
+
+        if quote is None:
             span.set_attribute("found", False)
-            return f"Ticker '{ticker}' nao encontrado. Tickers disponiveis: {', '.join(prices.keys())}"
-        
+            return (
+                f"Ticker '{ticker.upper().strip()}' nao encontrado. "
+                f"Exemplos: {', '.join(get_snapshot().tickers[:10])}"
+            )
+
         span.set_attribute("found", True)
-        span.set_attribute("price", data["price"])
-        
-        sign = "+" if data["change"] >= 0 else ""
+        span.set_attribute("price", quote.price)
+
+        sign = "+" if quote.change >= 0 else ""
         return (
-            f"{ticker}: {data['currency']} {data['price']:.2f} "
-            f"({sign}{data['change']:.2f}%)"
+            f"{quote.ticker}: {quote.currency} {quote.price:.2f} "
+            f"({sign}{quote.change:.2f}%)"
         )
 
 
+@tool
+def get_stock_prices(tickers: list[str]) -> str:
+    """Query current prices for several stocks in a single call.
+
+    Use it to compare stocks (e.g., PETR4, VALE3 and ITUB4) instead of
+    calling get_stock_price once per ticker.
+
+    Args:
+        tickers: List of tickers or company names (e.g., ["PETR4", "Vale", "AAPL"])
+    """
+    with tracer.start_as_current_span("get_stock_prices") as span:
+        span.set_attribute("ticker_count", len(tickers))
+
+        if not tickers:
+            return "Nenhum ticker informado."
+
+        lines = ["Ticker | Moeda | Preco | Var%"]
+        missing = []
+        for ticker, quote in zip(tickers, get_snapshot().quotes(tickers)):
+            if quote is None:
+                missing.append(ticker.upper().strip())
+                continue
+            lines.append(
+                f"{quote.ticker} | {quote.currency} | {quote.price:.2f} | {quote.change:+.2f}%"
+            )
+
+        span.set_attribute("missing_count", len(missing))
+        if missing:
+            lines.append(f"Nao encontrados: {', '.join(missing)}")
+        return "\n".join(lines)
+
+
 @tool
 def get_market_summary() -> str:
     """Returns a summary of main financial market indices."""
@@ -123,40 +174,170 @@ def get_exchange_rate(pair: str) -> str:
     """Query exchange rate for a currency pair.
 
     Args:
-        pair: Currency pair (e.g., USD/BRL, EUR/BRL, BTC/USD)
+        pair: Currency pair, including cross and inverse pairs (e.g., USD/BRL, EUR/USD, BRL/USD, GBP/EUR)
     """
     with tracer.start_as_current_span("get_exchange_rate") as span:
         span.set_attribute("pair", pair)
-        
-        rates = {
-            "USD/BRL": {"rate": 5.12, "change": -0.35},
-            "EUR/BRL": {"rate": 5.58, "change": -0.18},
-            "GBP/BRL": {"rate": 6.48, "change": 0.12},
-            "BTC/USD": {"rate": 67842.50, "change": 2.45},
-            "ETH/USD": {"rate": 3456.80, "change": 1.87},
-        }
-        pair = pair.upper().strip()
-        data = rates.get(pair)
-        
-        if not data:
+
+        rate = get_snapshot().fx(pair)
+
+        if rate is None:
             span.set_attribute("found", False)
-            return f"Par '{pair}' nao encontrado. Pares disponiveis: {', '.join(rates.keys())}"
-        
+            return (
+                f"Par '{pair.upper().strip()}' nao encontrado. "
+                f"Moedas disponiveis (qualquer combinacao): "
+                f"{', '.join(get_snapshot().fx_matrix.currencies)}"
+            )
+
         span.set_attribute("found", True)
-        span.set_attribute("rate", data["rate"])
-        
-        sign = "+" if data["change"] >= 0 else ""
-        return f"{pair}: {data['rate']:.2f} ({sign}{data['change']:.2f}%)"
+        span.set_attribute("rate", rate.rate)
+
+        sign = "+" if rate.change >= 0 else ""
+        # Cross/inverse pairs can be below 1 (e.g. BRL/USD 0.1953)
+        precision = 2 if rate.rate >= 1 else 4
+        return f"{rate.pair}: {rate.rate:.{precision}f} ({sign}{rate.change:.2f}%)"
+
+
+# User-facing market name -> currency of its stocks in the snapshot
+MARKET_CURRENCIES = {"b3": "BRL", "brasil": "BRL", "br": "BRL", "eua": "USD", "us": "USD", "usa": "USD"}
+
+
+@tool
+def get_top_movers(
+    direction: str = "alta", market: str = "todos", sector: str = "", limit: int = 5
+) -> str:
+    """List the day's top gainers or losers across hundreds of B3 and US stocks.
+
+    Args:
+        direction: "alta" for top gainers or "queda" for top losers
+        market: "b3", "eua" or "todos"
+        sector: Optional sector (e.g., Financeiro, Saude, Petroleo e Gas); empty for all
+        limit: Number of stocks (1 to 20)
+    """
+    with tracer.start_as_current_span("get_top_movers") as span:
+        span.set_attribute("direction", direction)
+        span.set_attribute("sector", sector)
+
+        snapshot = get_snapshot()
+        losers = direction.lower().strip().startswith(("q", "b", "l"))  # queda/baixa/losers
+        currency = MARKET_CURRENCIES.get(market.lower().strip())
+        sector_name = None
+        if sector.strip():
+            sector_name = snapshot.resolve_sector(sector)
+            if sector_name is None:
+                span.set_attribute("found", False)
+                return (
+                    f"Setor '{sector}' nao encontrado. Setores disponiveis: "
+                    f"{', '.join(st.sector for st in snapshot.sector_stats())}"
+                )
+
+        movers = snapshot.top_movers(max(1, min(limit, 20)), losers, sector_name, currency)
+        scope = ", ".join(filter(None, [market.upper() if currency else "", sector_name or ""]))
+        title = "Maiores quedas" if losers else "Maiores altas"
+        lines = [f"{title}{f' ({scope})' if scope else ''}:"]
+        lines += [
+            f"{q.ticker} | {q.name} | {q.currency} {q.price:.2f} | {q.change:+.2f}%" for q in movers
+        ]
+        return "\n".join(lines)
+
+
+@tool
+def get_sector_performance() -> str:
+    """Returns the day's average performance per sector, with each sector's top gainer and loser."""
+    with tracer.start_as_current_span("get_sector_performance"):
+        lines = ["Setor | Acoes | Var% media | Altas/Quedas | Maior alta | Maior queda"]
+        for st in get_snapshot().sector_stats():
+            lines.append(
+                f"{st.sector} | {st.count} | {st.avg_change:+.2f}% | {st.advancers}/{st.decliners} | "
+                f"{st.best.ticker} {st.best.change:+.2f}% | {st.worst.ticker} {st.worst.change:+.2f}%"
+            )
+        return "\n".join(lines)
+
+
+@tool
+def get_price_history(ticker: str, start: str = "1m", end: str = "", interval: str = "1d") -> str:
+    """Query a stock's OHLC price history over a period.
+
+    Args:
+        ticker: Ticker or company name (e.g., VALE3, Petrobras, AAPL)
+        start: Start date YYYY-MM-DD or period up to the end date (e.g., 5d, 1m, 6m, 1y)
+        end: End date YYYY-MM-DD; empty for the last trading day
+        interval: 1d (daily), 1wk (weekly) or 1mo (monthly)
+    """
+    with tracer.start_as_current_span("get_price_history") as span:
+        span.set_attribute("ticker", ticker)
+        span.set_attribute("interval", interval)
+        return describe_history(ticker, start, end, interval)
+
+
+@tool
+def get_indicators(tickers: list[str], indicators: list[str] | None = None, window: int = 20) -> str:
+    """Compute technical indicators (SMA, EMA, RSI, volatility) for several stocks.
+
+    Use for moving averages, RSI and volatility instead of computing them
+    from the price history; accepts dozens of tickers in a single call.
+
+    Args:
+        tickers: List of tickers or company names (e.g., ["PETR4", "Vale", "AAPL"])
+        indicators: Indicators to compute: sma, ema, rsi, vol; empty for all
+        window: Window in trading days (e.g., 9, 14, 20, 50)
+    """
+    with tracer.start_as_current_span("get_indicators") as span:
+        span.set_attribute("tickers.count", len(tickers))
+        span.set_attribute("window", window)
+        return describe_indicators(tickers, indicators, window)
+
+
+@tool
+async def get_portfolio_risk(
+    holdings: str, base_currency: str = "BRL", confidence: float = 0.95, horizon_days: int = 1
+) -> str:
+    """Value a mixed-currency portfolio and compute its VaR (historical and Monte Carlo).
+
+    Args:
+        holdings: Positions as text (e.g., "100 PETR4, 50 AAPL, 2000 USD")
+        base_currency: Valuation currency (e.g., BRL, USD, EUR)
+        confidence: VaR confidence level (e.g., 0.95, 0.99)
+        horizon_days: VaR horizon in trading days
+    """
+    with tracer.start_as_current_span("get_portfolio_risk") as span:
+        span.set_attribute("base_currency", base_currency)
+        span.set_attribute("confidence", confidence)
+        return await describe_portfolio(holdings, base_currency, confidence, horizon_days)
 
 
 # =============================================================
 # LLM and Graph
 # =============================================================
 
-tools_list = [get_stock_price, get_market_summary, get_exchange_rate]
+tools_list = [
+    get_stock_price, get_stock_prices, get_market_summary, get_exchange_rate,
+    get_top_movers, get_sector_performance, get_price_history, get_indicators,
+    get_portfolio_risk,
+]
 tools_by_name = {t.name: t for t in tools_list}
+
+# Simple quote/FX questions are answered before the graph runs
+fast_path = FastPathRouter(
+    quote=get_stock_price.func,
+    quotes=get_stock_prices.func,
+    exchange_rate=get_exchange_rate.func,
+    market_summary=get_market_summary.func,
+)
+# Final answers to repeated questions, per market snapshot version
+response_cache = ResponseCache()
+
+_llm = None
 _llm_with_tools = None
 
+# Bounded pool for sync tools: parallel tool calls from the LLM run at the
+# same time without blocking the event loop, so the node only waits for
+# the slowest tool.
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+_tool_executor = ThreadPoolExecutor(
+    max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool"
+)
+
 
 def get_llm():
     """Initialize LLM with Azure credentials (ACA Managed Identity)."""
@@ -164,59 +345,110 @@ def get_llm():
     azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT", "")
     api_version = os.getenv("OPENAI_API_VERSION", "2025-01-01-preview")
 
-    credential = DefaultAzureCredential()
-    token_provider = get_bearer_token_provider(
-        credential, "https://cognitiveservices.azure.com/.default"
+    scope = "https://cognitiveservices.azure.com/.default"
+    token_provider = get_bearer_token_provider(DefaultAzureCredential(), scope)
+    # Async provider: token refreshes during ainvoke don't block the event loop
+    async_token_provider = get_async_bearer_token_provider(
+        AsyncDefaultAzureCredential(), scope
     )
     return AzureChatOpenAI(
         azure_deployment=deployment_name,
         azure_ad_token_provider=token_provider,
+        azure_ad_async_token_provider=async_token_provider,
         azure_endpoint=azure_endpoint,
         api_version=api_version,
     )
 
 
+def get_shared_llm():
+    """Returns the LLM without tools (singleton), shared by agent and summarizer."""
+    global _llm
+    if _llm is None:
+        _llm = get_llm()
+    return _llm
+
+
 def get_llm_with_tools():
     """Returns LLM with bound tools (singleton)."""
     global _llm_with_tools
     if _llm_with_tools is None:
-        _llm_with_tools = get_llm().bind_tools(tools_list)
+        _llm_with_tools = get_shared_llm().bind_tools(tools_list)
     return _llm_with_tools
 
 
+async def summarize_history(previous: Optional[str], messages: list) -> str:
+    """Rolling summary of older turns, generated in the background."""
+    response = await get_shared_llm().ainvoke(build_summary_messages(previous, messages))
+    return response.content
+
+
+# History token budget (CONTEXT_TOKEN_BUDGET)
+context_window = ContextWindow(summarize=summarize_history)
+
+
 # --- Graph nodes ---
 
-def llm_call(state: MessagesState):
+async def llm_call(state: MessagesState):
     """Node: LLM decides whether to call a tool or respond directly."""
-    with tracer.start_as_current_span("llm_call"):
+    with tracer.start_as_current_span("llm_call") as span:
+        # State keeps the full history; only the prompt is trimmed
+        messages = context_window.prepare(state["messages"])
+        span.set_attribute("llm.context.messages", len(messages))
         return {
             "messages": [
-                get_llm_with_tools().invoke(
-                    [SystemMessage(content=SYSTEM_PROMPT)] + state["messages"]
+                await get_llm_with_tools().ainvoke(
+                    [SystemMessage(content=SYSTEM_PROMPT)] + messages
                 )
             ]
         }
 
 
-def tool_node(state: MessagesState):
-    """Node: Execute tool calls requested by LLM."""
+async def _run_tool_call(tool_call: dict) -> ToolMessage:
+    """Run one tool call; failures become an error ToolMessage for the LLM."""
+    name = tool_call["name"]
+    fn = tools_by_name.get(name)
+    try:
+        if fn is None:
+            raise ValueError(f"tool '{name}' nao existe")
+        if getattr(fn, "coroutine", None) is not None:
+            observation = await fn.ainvoke(tool_call["args"])
+        else:
+            # Sync tools run on the bounded pool, never on the event loop;
+            # copy_context keeps the current span as parent of the tool span.
+            ctx = contextvars.copy_context()
+            observation = await asyncio.get_running_loop().run_in_executor(
+                _tool_executor, ctx.run, fn.invoke, tool_call["args"]
+            )
+    except Exception as exc:
+        logger.exception("Error running tool %s", name)
+        return ToolMessage(
+            content=f"Erro ao executar {name}: {exc}",
+            name=name,
+            tool_call_id=tool_call["id"],
+            status="error",
+        )
+    return ToolMessage(
+        content=str(observation), name=name, tool_call_id=tool_call["id"]
+    )
+
+
+async def tool_node(state: MessagesState):
+    """Node: Execute tool calls requested by LLM concurrently."""
     with tracer.start_as_current_span("tool_execution") as span:
-        results = []
         last_message = state["messages"][-1]
-        
+
         if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
             return {"messages": []}
-        
+
         span.set_attribute("tool_count", len(last_message.tool_calls))
-        
-        for tool_call in last_message.tool_calls:
-            fn = tools_by_name[tool_call["name"]]
-            observation = fn.invoke(tool_call["args"])
-            results.append(
-                ToolMessage(content=str(observation), tool_call_id=tool_call["id"])
-            )
-        
-        return {"messages": results}
+
+        # gather keeps results in tool-call order
+        results = await asyncio.gather(
+            *(_run_tool_call(tool_call) for tool_call in last_message.tool_calls)
+        )
+        span.set_attribute("error_count", sum(r.status == "error" for r in results))
+
+        return {"messages": list(results)}
 
 
 def should_continue(state: MessagesState) -> Literal["Action", "__end__"]:
@@ -247,6 +479,49 @@ def build_agent():
     return builder.compile()
 
 
+async def run_conversation_turn(agent, sessions, session_id: str, text: str) -> Optional[str]:
+    """Run one turn on top of the session history and persist the result.
+
+    Simple quote/FX questions are answered by the fast path without the graph
+    (with history, only self-contained ones, not follow-ups like "e o itau?"),
+    and repeated first-turn questions by the response cache.
+
+    Returns the final AI answer of this turn, or None if there is none.
+    """
+    # Turns of the same session run one at a time, each on the history
+    # saved by the previous one (otherwise the last save would win)
+    async with sessions.lock(session_id):
+        history = await sessions.load(session_id)
+        cache_key = response_cache.key_for(text)
+
+        routed = fast_path.route(text, has_history=bool(history))
+        if routed is not None:
+            intent, answer = routed
+            fast_path_counter.add(1, {"intent": intent})
+        elif not history:
+            # Only first turns are cached: with history the answer depends on context
+            answer = response_cache.get(cache_key)
+        else:
+            answer = None
+        if answer is not None:
+            sessions.save(session_id, history + [HumanMessage(content=text), AIMessage(content=answer)])
+            return answer
+
+        result = await agent.ainvoke({
+            "messages": history + [HumanMessage(content=text)]
+        })
+        sessions.save(session_id, result["messages"])
+
+        # Only look at messages produced in this turn
+        for msg in reversed(result["messages"][len(history):]):
+            if isinstance(msg, AIMessage) and msg.content:
+                content = msg.content if isinstance(msg.content, str) else str(msg.content)
+                if not history:
+                    response_cache.put(cache_key, content)
+                return content
+        return None
+
+
 # =============================================================
 # Adaptive Cards - Rich Responses 
 # =============================================================
@@ -289,62 +564,222 @@ def create_adaptive_card(title: str, text: str, facts: Optional[list] = None):
 # Bot Framework Adapter - A365 Conversation Protocol
 # =============================================================
 
+ACTIVITY_WORKERS = int(os.getenv("ACTIVITY_WORKERS", "8"))
+ACTIVITY_QUEUE_SIZE = int(os.getenv("ACTIVITY_QUEUE_SIZE", "100"))
+TYPING_INTERVAL = 3.0  # Teams shows a typing indicator for ~3 seconds
+
+
 class A365BotAdapter:
-    """Adapter to handle Bot Framework Activity protocol from A365."""
-    
-    def __init__(self, agent):
+    """Adapter to handle Bot Framework Activity protocol from A365.
+
+    Message activities are acknowledged right away and queued; a bounded
+    pool of workers runs the agent and replies proactively through the
+    connector client (cached per service URL by BotFrameworkAdapter).
+    """
+
+    def __init__(
+        self,
+        agent,
+        sessions,
+        workers: int = ACTIVITY_WORKERS,
+        queue_size: int = ACTIVITY_QUEUE_SIZE,
+    ):
         self.agent = agent
+        # Conversation history per Bot Framework conversation.id
+        self.sessions = sessions
         self.adapter = BotFrameworkAdapter(BotFrameworkAdapterSettings(
             app_id=os.getenv("MICROSOFT_APP_ID", ""),
             app_password=os.getenv("MICROSOFT_APP_PASSWORD", "")
         ))
-    
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._worker_tasks: list = []
+        # Channel retries reuse the first run's reply instead of a new LLM run
+        self.deduplicator = ActivityDeduplicator()
+
+    def start(self):
+        """Start the worker pool (call from a running event loop)."""
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"activity-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info("Started %d activity workers.", self.workers)
+
+    async def stop(self):
+        """Stop the worker pool; queued activities are dropped."""
+        if not self.queue.empty():
+            logger.warning("Dropping %d queued activities on shutdown.", self.queue.qsize())
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def submit(self, activity: Activity) -> str:
+        """Queue an activity for background processing.
+
+        Returns "accepted", "duplicate" (already queued, running or answered)
+        or "busy" when the queue is full so the caller can shed load.
+        """
+        key = activity_key(activity)
+        if key is not None:
+            if not await self.deduplicator.begin(key):
+                logger.info("Duplicate activity %s ignored", key)
+                return "duplicate"
+        try:
+            # Carry the trace context so the worker span joins the request trace
+            self.queue.put_nowait((activity, otel_context.get_current()))
+            return "accepted"
+        except asyncio.QueueFull as exc:
+            if key is not None:
+                self.deduplicator.fail(key, exc)
+            return "busy"
+
+    async def _worker(self):
+        while True:
+            activity, ctx = await self.queue.get()
+            try:
+                await self.handle_activity(activity, ctx)
+            except Exception:
+                logger.exception("Error handling activity %s", activity.id)
+            finally:
+                self.queue.task_done()
+
+    async def handle_activity(self, activity: Activity, ctx=None):
+        """Run the agent for an activity and reply proactively.
+
+        A typing indicator is refreshed while the agent (and its tools) run.
+        """
+        with tracer.start_as_current_span("handle_activity", context=ctx):
+            key = activity_key(activity)
+            try:
+                connector = await self.adapter.create_connector_client(activity.service_url)
+                typing = asyncio.create_task(self._keep_typing(connector, activity))
+                try:
+                    response = await self.process_activity(activity)
+                finally:
+                    typing.cancel()
+
+                reply = activity.create_reply(response.get("text", ""))
+                reply.attachments = [
+                    Attachment(content_type=a["contentType"], content=a["content"])
+                    for a in response.get("attachments", [])
+                ]
+                await connector.conversations.reply_to_activity(
+                    activity.conversation.id, activity.id, reply
+                )
+                # Only a delivered reply is remembered: if sending fails, the
+                # channel's retry is processed again instead of being dropped
+                if key is not None:
+                    await self.deduplicator.complete(key, response)
+            except BaseException as exc:
+                if key is not None:
+                    self.deduplicator.fail(key, exc)
+                raise
+
+    @staticmethod
+    async def _keep_typing(connector, activity: Activity):
+        typing = activity.create_reply()
+        typing.type = ActivityTypes.typing
+        typing.text = None
+        while True:
+            try:
+                await connector.conversations.send_to_conversation(
+                    activity.conversation.id, typing
+                )
+            except Exception as exc:
+                logger.debug("Could not send typing indicator: %s", exc)
+            await asyncio.sleep(TYPING_INTERVAL)
+
     async def process_activity(self, activity: Activity) -> dict:
         """Process incoming activity and return response."""
         with tracer.start_as_current_span("process_activity") as span:
             span.set_attribute("activity_type", activity.type)
             span.set_attribute("conversation_id", activity.conversation.id if activity.conversation else "")
             
-            if activity.type != ActivityTypes.message or not activity.text:
+            if activity.type != ActivityTypes.message or not activity.text or not activity.conversation:
                 return {"text": "Nenhuma mensagem para processar."}
             
-            # Invoke agent
-            result = self.agent.invoke({
-                "messages": [HumanMessage(content=activity.text)]
-            })
-            
-            # Extract final AI response
-            for msg in reversed(result["messages"]):
-                if isinstance(msg, AIMessage) and msg.content:
-                    content = msg.content if isinstance(msg.content, str) else str(msg.content)
-                    
-                    # Create rich response with adaptive card
-                    return {
-                        "type": ActivityTypes.message,
-                        "text": content,
-                        "attachments": [
-                            create_adaptive_card(
-                                "Resposta do Agente de Mercado Financeiro",
-                                content
-                            )
-                        ]
-                    }
-            
+            # Invoke agent without blocking the event loop, on top of the
+            # conversation history
+            content = await run_conversation_turn(
+                self.agent, self.sessions, activity.conversation.id, activity.text
+            )
+
+            if content:
+                # Create rich response with adaptive card
+                return {
+                    "type": ActivityTypes.message,
+                    "text": content,
+                    "attachments": [
+                        create_adaptive_card(
+                            "Resposta do Agente de Mercado Financeiro",
+                            content
+                        )
+                    ]
+                }
+
             return {"text": "Sem resposta do agente."}
 
 
+# =============================================================
+# Event Loop Lag - detects blocking calls on the event loop
+# =============================================================
+
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+# Worst lag seen since the last metric collection (reset on each export)
+_max_event_loop_lag_ms = 0.0
+
+
+def _observe_event_loop_lag(options):
+    """Callback for the event loop lag gauge."""
+    global _max_event_loop_lag_ms
+    lag, _max_event_loop_lag_ms = _max_event_loop_lag_ms, 0.0
+    yield metrics.Observation(lag)
+
+
+meter.create_observable_gauge(
+    "agent.event_loop.lag",
+    callbacks=[_observe_event_loop_lag],
+    unit="ms",
+    description="Max delay of a scheduled wake-up on the event loop since last export",
+)
+
+
+async def monitor_event_loop_lag(interval: float = EVENT_LOOP_LAG_INTERVAL):
+    """Measure how late the event loop wakes up from a fixed sleep.
+
+    Any blocking call on the loop (sync I/O, CPU-heavy work) shows up as lag,
+    which also delays /health and every other in-flight request.
+    """
+    global _max_event_loop_lag_ms
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag_ms = max((loop.time() - start - interval) * 1000, 0.0)
+        _max_event_loop_lag_ms = max(_max_event_loop_lag_ms, lag_ms)
+        if lag_ms > 1000:
+            logger.warning("Event loop blocked for %.0f ms", lag_ms)
+
+
 # =============================================================
 # FastAPI - HTTP Server
 # =============================================================
 
 class ChatRequest(BaseModel):
-    """Chat request body (simple REST API)."""
+    """Chat request body (simple REST API).
+
+    session_id identifies the conversation; when omitted a new one is created.
+    """
     message: str
+    session_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
     """Chat response body (simple REST API)."""
     response: str
+    session_id: str
 
 
 @asynccontextmanager
@@ -361,11 +796,20 @@ async def lifespan(app: FastAPI):
     
     logger.info("Initializing LangGraph agent...")
     app.state.agent = build_agent()
-    app.state.bot_adapter = A365BotAdapter(app.state.agent)
+    app.state.sessions = create_session_store()
+    app.state.bot_adapter = A365BotAdapter(app.state.agent, app.state.sessions)
+    app.state.bot_adapter.start()
     logger.info("Agent ready to receive requests.")
-    
+
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+
     yield
-    
+
+    lag_monitor.cancel()
+    await app.state.bot_adapter.stop()
+    await context_window.aclose()
+    await app.state.sessions.aclose()
+    shutdown_risk_pool()
     logger.info("Server shutdown.")
 
 
@@ -387,45 +831,65 @@ async def health():
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     """Send message to agent and return response.
 
     Simple REST API endpoint for backward compatibility.
-    Agent can call tools (get_stock_price, get_market_summary, get_exchange_rate)
-    before producing final response.
+    Agent can call any tool in tools_list before producing final response.
     """
     with tracer.start_as_current_span("chat_endpoint"):
-        result = app.state.agent.invoke({
-            "messages": [HumanMessage(content=req.message)]
-        })
-
-        # Extract final AIMessage with content
-        for msg in reversed(result["messages"]):
-            if isinstance(msg, AIMessage) and msg.content:
-                content = msg.content if isinstance(msg.content, str) else str(msg.content)
-                return ChatResponse(response=content)
-
-        return ChatResponse(response="Sem resposta do agente.")
+        session_id = req.session_id or uuid.uuid4().hex
+        content = await run_conversation_turn(
+            app.state.agent, app.state.sessions, session_id, req.message
+        )
+        return ChatResponse(
+            response=content or "Sem resposta do agente.", session_id=session_id
+        )
 
 
 @app.post("/api/messages")
 async def messages(request: Request):
     """Bot Framework Activity endpoint for A365 integration.
-    
-    This endpoint receives Activity objects from Microsoft Agent 365
-    and returns Activity responses with adaptive cards.
+
+    Message activities from a channel are validated, queued and
+    acknowledged with 202; the reply (with an adaptive card) is sent
+    proactively by a worker once the agent finishes, so channel timeouts
+    and retries no longer depend on model latency.
+
+    Activities without a serviceUrl (e.g. manual curl tests) have no
+    channel to reply to and are answered inline, as before.
+
+    Retried deliveries (same conversation.id + activity.id) never run the
+    agent twice: they get the cached reply or join the in-flight run.
     """
     with tracer.start_as_current_span("messages_endpoint"):
         try:
             # Parse incoming activity
             body = await request.json()
             activity = Activity().deserialize(body)
-            
-            # Process through bot adapter
-            response = await app.state.bot_adapter.process_activity(activity)
-            
-            return response
-            
+        except Exception as e:
+            logger.warning(f"Invalid activity payload: {e}")
+            raise HTTPException(status_code=400, detail="Invalid activity payload.")
+
+        try:
+            bot_adapter = app.state.bot_adapter
+            is_message = activity.type == ActivityTypes.message and activity.text
+            if not is_message:
+                return await bot_adapter.process_activity(activity)
+            if not activity.service_url or not activity.conversation:
+                return await bot_adapter.deduplicator.run(
+                    activity_key(activity),
+                    lambda: bot_adapter.process_activity(activity),
+                )
+
+            status = await bot_adapter.submit(activity)
+            if status == "busy":
+                raise HTTPException(status_code=503, detail="Agent busy, retry later.")
+
+            return JSONResponse(status_code=202, content={"status": status})
+
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error processing activity: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail="Internal error processing message.")
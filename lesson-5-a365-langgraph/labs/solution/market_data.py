@@ -0,0 +1,533 @@
+"""
+Market data snapshot shared by the agent tools.
+
+Loads an immutable, versioned snapshot of quotes and exchange rates once
+per process. Tools look up the current snapshot in O(1) (dict ticker ->
+index into compact arrays) instead of rebuilding a price table on every
+call.
+
+Each snapshot also carries a TickerIndex, which resolves company names,
+aliases and prefixes ("Petrobras", "itau", "Itau Unibanco") to the ticker,
+ignoring accents and case.
+
+The default snapshot covers a few hundred B3 and US stocks
+(market_universe.csv, with sector); besides quotes, each snapshot
+precomputes per-sector aggregates and answers top-k gainers/losers
+(top_movers) with a heap, without sorting the whole universe.
+
+The listed FX pairs form an FxMatrix (currency x currency): any cross or
+inverse pair (EUR/USD, BRL/USD, GBP/EUR) is triangulated through the USD
+pivot and answered with a single lookup.
+
+A new snapshot (e.g. loaded from a real feed) can be published with
+swap_snapshot(); the swap is atomic, and callers already holding the
+previous snapshot keep reading a consistent version until they finish.
+
+Optionally, MARKET_DATA_PATH points to a JSON file in this format:
+
+    {
+      "version": 2,
+      "as_of": "2025-01-15T18:00:00Z",
+      "quotes": [["PETR4", "Petrobras PN", "BRL", 38.72, 1.23, "Petroleo e Gas"], ...],
+      "fx": [["USD/BRL", 5.12, -0.35], ...]
+    }
+
+The sector (last field of each quote) is optional.
+"""
+
+import csv
+import heapq
+import json
+import logging
+import os
+import random
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Simulated data for educational purposes: (ticker, name, currency, price, change %)
+DEFAULT_QUOTES = (
+    ("PETR4", "Petrobras PN", "BRL", 38.72, 1.23),
+    ("VALE3", "Vale ON", "BRL", 61.45, -0.87),
+    ("ITUB4", "Itau Unibanco PN", "BRL", 32.18, 0.45),
+    ("BBDC4", "Bradesco PN", "BRL", 13.95, -0.32),
+    ("WEGE3", "WEG ON", "BRL", 41.30, 2.15),
+    ("AAPL", "Apple Inc", "USD", 228.50, 1.85),
+    ("MSFT", "Microsoft Corp", "USD", 445.20, 3.12),
+    ("GOOGL", "Alphabet Inc", "USD", 178.90, -1.45),
+    ("AMZN", "Amazon.com Inc", "USD", 198.75, 2.30),
+    ("NVDA", "NVIDIA Corp", "USD", 142.60, 5.40),
+)
+
+# Default universe (ticker;name;currency;sector). Stocks outside DEFAULT_QUOTES
+# get a simulated price and change, deterministic per ticker.
+UNIVERSE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_universe.csv")
+
+# (pair, rate, change %)
+DEFAULT_FX = (
+    ("USD/BRL", 5.12, -0.35),
+    ("EUR/BRL", 5.58, -0.18),
+    ("GBP/BRL", 6.48, 0.12),
+    ("USD/EUR", 0.9176, -0.17),
+    ("BTC/USD", 67842.50, 2.45),
+    ("ETH/USD", 3456.80, 1.87),
+)
+
+
+# Aliases beyond the ones derived automatically (ticker, name, first word of
+# the name and ticker root): popular name -> ticker
+DEFAULT_ALIASES = {
+    "Google": "GOOGL",
+    "Vale do Rio Doce": "VALE3",
+    "Banco Itau": "ITUB4",
+    "Banco Bradesco": "BBDC4",
+}
+
+# Common (or generic) words that never become automatic aliases, even when
+# they are the first word of the name or the ticker root ("vamos", "azul")
+ALIAS_STOPWORDS = frozenset({
+    "AGRO", "AMERICAN", "ANIMA", "AZUL", "BANCO", "BANK", "BOA", "CAIXA", "CASAS",
+    "CASH", "CRUZEIRO", "EVEN", "GENERAL", "GOL", "GRUPO", "HOME", "INDUSTRIAS",
+    "INTER", "LEVE", "LOJAS", "MERCADO", "MOVE", "PLANO", "PORTO", "POSITIVO",
+    "QUAL", "REDE", "SANTOS", "SAO", "SER", "SMART", "SOJA", "TEND", "TRES",
+    "VAMOS", "VIVA",
+})
+
+# Prefixes shorter than this are not resolved (too ambiguous)
+MIN_PREFIX_LENGTH = 3
+
+_NOT_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+
+@lru_cache(maxsize=4096)
+def fold(text: str) -> str:
+    """Lookup key: uppercase, no accents, letters and digits only."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NOT_ALNUM.sub("", text.upper())
+
+
+class TickerIndex:
+    """Ticker/name/alias -> ticker index, built once per snapshot.
+
+    Exact keys live in a dict; for prefixes, the same keys are kept in a
+    sorted list and lookup is a bisection. Keys (or prefixes) that point to
+    more than one ticker are not resolved.
+    """
+
+    __slots__ = ("_exact", "_keys", "_values")
+
+    def __init__(self, tickers: Iterable[str], names: Iterable[str], aliases: Optional[dict] = None):
+        exact: dict = {}
+
+        def add(alias: str, ticker: str, derived: bool = False) -> None:
+            key = fold(alias)
+            if not key or (derived and key in ALIAS_STOPWORDS):
+                return
+            if exact.setdefault(key, ticker) != ticker:
+                exact[key] = None  # ambiguous
+
+        tickers = tuple(tickers)
+        for ticker, name in zip(tickers, names):
+            add(name, ticker)
+            add(name.split()[0] if name.split() else "", ticker, derived=True)
+            add(ticker.rstrip("0123456789"), ticker, derived=True)
+        for alias, ticker in (aliases if aliases is not None else DEFAULT_ALIASES).items():
+            if ticker in tickers:
+                add(alias, ticker)
+        # The ticker itself always wins over aliases
+        for ticker in tickers:
+            exact[fold(ticker)] = ticker
+
+        self._exact = exact
+        self._keys = sorted(exact)
+        self._values = tuple(exact[k] for k in self._keys)
+
+    def resolve(self, query: str, prefixes: bool = True) -> Optional[str]:
+        """Ticker for a ticker, name, alias or prefix; None if ambiguous or missing."""
+        key = fold(query)
+        if not key:
+            return None
+        if key in self._exact:
+            return self._exact[key]
+        if not prefixes or len(key) < MIN_PREFIX_LENGTH:
+            return None
+        lo = bisect_left(self._keys, key)
+        hi = bisect_left(self._keys, key + "~", lo)  # "~" > any [A-Z0-9]
+        matches = set(self._values[lo:hi])
+        return matches.pop() if len(matches) == 1 and None not in matches else None
+
+
+class Quote:
+    """Stock quote (compact, read-only record)."""
+
+    __slots__ = ("ticker", "name", "currency", "price", "change", "sector")
+
+    def __init__(
+        self, ticker: str, name: str, currency: str, price: float, change: float, sector: str = "",
+    ):
+        self.ticker = ticker
+        self.name = name
+        self.currency = currency
+        self.price = price
+        self.change = change
+        self.sector = sector
+
+    def __repr__(self):
+        return f"Quote({self.ticker!r}, {self.currency} {self.price:.2f}, {self.change:+.2f}%)"
+
+
+class FxRate:
+    """Exchange rate for a currency pair (compact, read-only record)."""
+
+    __slots__ = ("pair", "rate", "change")
+
+    def __init__(self, pair: str, rate: float, change: float):
+        self.pair = pair
+        self.rate = rate
+        self.change = change
+
+    def __repr__(self):
+        return f"FxRate({self.pair!r}, {self.rate:.4f}, {self.change:+.2f}%)"
+
+
+class FxMatrix:
+    """Exchange rates between every snapshot currency (currency x currency matrix).
+
+    Each currency linked to the pivot by a chain of listed pairs gets its
+    value in pivot units; the whole matrix is a single vectorized division
+    (value[i] / value[j]), covering cross and inverse pairs. The same
+    computation over the previous rates (rate / (1 + change)) gives the
+    change of each derived pair. Currencies with no path to the pivot are
+    left out.
+    """
+
+    __slots__ = ("currencies", "_index", "matrix", "previous")
+
+    def __init__(self, pairs: Iterable[str], rates: Iterable[float],
+                 changes: Iterable[float], pivot: str = "USD"):
+        links: dict = {}  # currency -> [(other currency, rate, previous rate)]
+        for pair, rate, change in zip(pairs, rates, changes):
+            base, _, quote = pair.partition("/")
+            if not quote or rate <= 0:
+                continue
+            previous = rate / (1 + change / 100)
+            links.setdefault(base, []).append((quote, rate, previous))
+            links.setdefault(quote, []).append((base, 1 / rate, 1 / previous))
+        if pivot not in links:
+            pivot = next(iter(links), pivot)
+
+        # Breadth-first search from the pivot: 1 currency = rate other
+        values = {pivot: (1.0, 1.0)}
+        queue = [pivot]
+        for currency in queue:
+            value, previous = values[currency]
+            for other, rate, prev_rate in links.get(currency, ()):
+                if other not in values:
+                    values[other] = (value / rate, previous / prev_rate)
+                    queue.append(other)
+
+        self.currencies = tuple(values) if links else ()
+        self._index = {c: i for i, c in enumerate(self.currencies)}
+        current = np.array([values[c][0] for c in self.currencies])
+        before = np.array([values[c][1] for c in self.currencies])
+        self.matrix = current[:, None] / current[None, :]
+        self.previous = before[:, None] / before[None, :]
+
+    def rate(self, base: str, quote: str) -> Optional[tuple]:
+        """(rate, change %) of base in quote, or None if either currency is missing."""
+        i, j = self._index.get(base), self._index.get(quote)
+        if i is None or j is None:
+            return None
+        rate = float(self.matrix[i, j])
+        return rate, (rate / float(self.previous[i, j]) - 1) * 100
+
+    def rates_to(self, currencies: Iterable[str], quote: str) -> np.ndarray:
+        """Rate of each currency in quote (NaN for unknown currencies)."""
+        rows = np.array([self._index.get(c, -1) for c in currencies], dtype=np.intp)
+        j = self._index.get(quote)
+        if j is None:
+            return np.full(len(rows), np.nan)
+        rates = self.matrix[np.maximum(rows, 0), j]
+        rates[rows < 0] = np.nan
+        return rates
+
+
+class SectorStats:
+    """Aggregate of one sector in a snapshot (compact, read-only record)."""
+
+    __slots__ = ("sector", "count", "avg_change", "advancers", "decliners", "best", "worst")
+
+    def __init__(self, sector: str, count: int, avg_change: float, advancers: int,
+                 decliners: int, best: Quote, worst: Quote):
+        self.sector = sector
+        self.count = count
+        self.avg_change = avg_change
+        self.advancers = advancers
+        self.decliners = decliners
+        self.best = best
+        self.worst = worst
+
+    def __repr__(self):
+        return f"SectorStats({self.sector!r}, n={self.count}, {self.avg_change:+.2f}%)"
+
+
+class MarketSnapshot:
+    """Immutable snapshot of quotes and exchange rates.
+
+    Prices and changes live in ``array('d')`` arrays indexed by ticker
+    position, which allows O(1) lookups and vectorized scans over the whole
+    universe without intermediate objects.
+    """
+
+    __slots__ = (
+        "version", "as_of",
+        "tickers", "names", "currencies", "prices", "changes", "_index", "_quotes", "_resolver",
+        "sectors", "_sector_members", "_sector_stats",
+        "pairs", "rates", "rate_changes", "_fx_index", "_fx", "fx_matrix",
+    )
+
+    def __init__(
+        self,
+        version: int,
+        quotes: Iterable[tuple],
+        fx: Iterable[tuple],
+        as_of: str = "",
+    ):
+        self.version = int(version)
+        self.as_of = as_of
+
+        quotes = [
+            (str(t).upper(), n, c, float(p), float(ch), rest[0] if rest else "")
+            for t, n, c, p, ch, *rest in quotes
+        ]
+        self.tickers = tuple(q[0] for q in quotes)
+        self.names = tuple(q[1] for q in quotes)
+        self.currencies = tuple(q[2] for q in quotes)
+        self.prices = array("d", (q[3] for q in quotes))
+        self.changes = array("d", (q[4] for q in quotes))
+        self._index = {t: i for i, t in enumerate(self.tickers)}
+        self._quotes = tuple(Quote(*q) for q in quotes)
+        self._resolver = TickerIndex(self.tickers, self.names)
+        self.sectors = tuple(q[5] for q in quotes)
+        self._build_sectors()
+
+        fx = [(str(p).upper(), float(r), float(ch)) for p, r, ch in fx]
+        self.pairs = tuple(f[0] for f in fx)
+        self.rates = array("d", (f[1] for f in fx))
+        self.rate_changes = array("d", (f[2] for f in fx))
+        self._fx_index = {p: i for i, p in enumerate(self.pairs)}
+        self._fx = tuple(FxRate(*f) for f in fx)
+        self.fx_matrix = FxMatrix(self.pairs, self.rates, self.rate_changes)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MarketSnapshot":
+        """Build a snapshot from the JSON format documented in the module."""
+        return cls(
+            version=data.get("version", 1),
+            quotes=data.get("quotes", ()),
+            fx=data.get("fx", ()),
+            as_of=data.get("as_of", ""),
+        )
+
+    def resolve(self, query: str, prefixes: bool = True) -> Optional[str]:
+        """Ticker for a ticker, company name, alias or prefix (e.g. "Itau")."""
+        return self._resolver.resolve(query, prefixes)
+
+    def index_of(self, ticker: str) -> int:
+        """Position of the ticker (or company name) in the arrays, or -1 if missing."""
+        i = self._index.get(ticker.upper().strip())
+        if i is None:
+            resolved = self._resolver.resolve(ticker)
+            i = -1 if resolved is None else self._index[resolved]
+        return i
+
+    def quote(self, ticker: str) -> Optional[Quote]:
+        """Return the quote for the ticker or company, or None if missing."""
+        i = self.index_of(ticker)
+        return None if i < 0 else self._quotes[i]
+
+    def quotes(self, tickers: Iterable[str]) -> list:
+        """Resolve several tickers at once; items not found become None."""
+        records = self._quotes
+        positions = [self.index_of(t) for t in tickers]
+        return [records[i] if i >= 0 else None for i in positions]
+
+    def _build_sectors(self) -> None:
+        """Precompute members and aggregates per sector (once per snapshot)."""
+        members: dict = {}
+        for i, sector in enumerate(self.sectors):
+            if sector:
+                members.setdefault(sector, array("I")).append(i)
+        self._sector_members = members
+
+        changes, records, stats = self.changes, self._quotes, []
+        for sector, idx in members.items():
+            best = max(idx, key=changes.__getitem__)
+            worst = min(idx, key=changes.__getitem__)
+            stats.append(SectorStats(
+                sector=sector,
+                count=len(idx),
+                avg_change=sum(changes[i] for i in idx) / len(idx),
+                advancers=sum(1 for i in idx if changes[i] > 0),
+                decliners=sum(1 for i in idx if changes[i] < 0),
+                best=records[best],
+                worst=records[worst],
+            ))
+        stats.sort(key=lambda st: st.avg_change, reverse=True)
+        self._sector_stats = tuple(stats)
+
+    def sector_stats(self) -> tuple:
+        """Per-sector aggregates, from best to worst average performance."""
+        return self._sector_stats
+
+    def resolve_sector(self, name: str) -> Optional[str]:
+        """Canonical sector name (ignores accents/case, accepts a prefix)."""
+        key = fold(name)
+        if not key:
+            return None
+        candidates = [s for s in self._sector_members if fold(s).startswith(key)]
+        exact = [s for s in candidates if fold(s) == key]
+        if exact:
+            return exact[0]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def top_movers(
+        self,
+        k: int = 5,
+        losers: bool = False,
+        sector: Optional[str] = None,
+        currency: Optional[str] = None,
+    ) -> list:
+        """Top gainers (or losers) with a heap: O(n log k), without sorting the universe.
+
+        Args:
+            k: number of stocks
+            losers: True for the biggest losers
+            sector: canonical sector name (see resolve_sector), or None for all
+            currency: "BRL" (B3), "USD" (US) or None for all
+        """
+        candidates = self._sector_members.get(sector, ()) if sector else range(len(self.tickers))
+        if currency:
+            currencies = self.currencies
+            candidates = [i for i in candidates if currencies[i] == currency]
+        select = heapq.nsmallest if losers else heapq.nlargest
+        return [self._quotes[i] for i in select(k, candidates, key=self.changes.__getitem__)]
+
+    def fx(self, pair: str) -> Optional[FxRate]:
+        """Rate for the pair (e.g. USD/BRL, EUR/USD, BRL/USD), or None if a currency is missing.
+
+        Pairs listed in the snapshot are returned as they are; the others are
+        triangulated through the FxMatrix.
+        """
+        key = pair.upper().strip().replace(" ", "").replace("-", "/")
+        if "/" not in key and len(key) == 6:
+            key = f"{key[:3]}/{key[3:]}"
+        i = self._fx_index.get(key)
+        if i is not None:
+            return self._fx[i]
+        base, _, quote = key.partition("/")
+        cross = self.fx_matrix.rate(base, quote) if base != quote else None
+        return None if cross is None else FxRate(key, *cross)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __repr__(self):
+        return (
+            f"MarketSnapshot(version={self.version}, tickers={len(self.tickers)}, "
+            f"pairs={len(self.pairs)})"
+        )
+
+
+def load_universe(path: str = UNIVERSE_PATH) -> list:
+    """Simulated quotes for the default universe (with sector).
+
+    Tickers in DEFAULT_QUOTES keep their fixed values; the others get a price
+    and change from a generator seeded with the ticker itself, so the data is
+    the same across replicas and restarts.
+    """
+    fixed = {q[0]: q for q in DEFAULT_QUOTES}
+    if not os.path.exists(path):
+        return list(DEFAULT_QUOTES)
+    quotes = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f, delimiter=";"):
+            ticker, sector = row["ticker"], row["sector"]
+            if ticker in fixed:
+                quotes.append(fixed[ticker] + (sector,))
+                continue
+            rng = random.Random(ticker)
+            price = rng.uniform(4, 90) if row["currency"] == "BRL" else rng.uniform(15, 600)
+            change = max(-9.0, min(9.0, rng.gauss(0.2, 1.8)))
+            quotes.append(
+                (ticker, row["name"], row["currency"], round(price, 2), round(change, 2), sector)
+            )
+    return quotes
+
+
+def default_snapshot() -> MarketSnapshot:
+    """Snapshot with the module's simulated data and the default universe."""
+    return MarketSnapshot(version=1, quotes=load_universe(), fx=DEFAULT_FX)
+
+
+def load_snapshot(path: Optional[str] = None) -> MarketSnapshot:
+    """Load a snapshot from a JSON file or, without a file, the built-in data."""
+    path = path or os.getenv("MARKET_DATA_PATH")
+    if not path:
+        return default_snapshot()
+    with open(path, encoding="utf-8") as f:
+        snapshot = MarketSnapshot.from_dict(json.load(f))
+    logger.info("Market snapshot loaded from %s: %r", path, snapshot)
+    return snapshot
+
+
+# =============================================================
+# Current snapshot of the process
+# =============================================================
+
+_current: Optional[MarketSnapshot] = None
+_lock = threading.Lock()
+
+
+def get_snapshot() -> MarketSnapshot:
+    """Return the current snapshot, loading it on the first call."""
+    snapshot = _current
+    if snapshot is None:
+        with _lock:
+            if _current is None:
+                _publish(load_snapshot())
+            snapshot = _current
+    return snapshot
+
+
+def swap_snapshot(snapshot: MarketSnapshot) -> Optional[MarketSnapshot]:
+    """Atomically publish a new snapshot and return the previous one.
+
+    Raises:
+        ValueError: if the version is not greater than the current snapshot's.
+    """
+    with _lock:
+        previous = _current
+        if previous is not None and snapshot.version <= previous.version:
+            raise ValueError(
+                f"Snapshot version must increase "
+                f"(current={previous.version}, new={snapshot.version})"
+            )
+        _publish(snapshot)
+    logger.info("Market snapshot published: %r", snapshot)
+    return previous
+
+
+def _publish(snapshot: MarketSnapshot) -> None:
+    global _current
+    _current = snapshot
@@ -0,0 +1,291 @@
+"""
+Portfolio valuation and Value-at-Risk (VaR).
+
+Takes positions as free text ("100 PETR4, 50 AAPL, 2000 USD"), values each
+one in the base currency and computes the risk of the equity part:
+
+- vectorized FX conversion: an exposure matrix (positions x currencies)
+  multiplied by the base currency column of the snapshot's FxMatrix
+  (cross pairs already triangulated);
+- historical VaR: P&L of the current portfolio applied to the returns of
+  the last VAR_LOOKBACK trading days of the local history
+  (price_history.py);
+- Monte Carlo VaR: multivariate normal returns with the historical mean
+  and covariance, VAR_PATHS scenarios simulated in chunks on a
+  ProcessPoolExecutor, so the CPU-bound simulation neither blocks the
+  server event loop nor competes for the GIL with other requests.
+
+FX is held constant over the horizon: currency risk is not modeled.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from typing import Optional
+
+import numpy as np
+
+from market_data import get_snapshot
+from price_history import CLOSE, DATE, get_store
+
+VAR_PATHS = int(os.getenv("VAR_PATHS", "100000"))
+VAR_LOOKBACK = int(os.getenv("VAR_LOOKBACK", "250"))
+# Scenarios per task sent to the pool. Small chunks bound memory and the work
+# still running after a timeout (only chunks already dispatched)
+VAR_CHUNK = int(os.getenv("VAR_CHUNK", "10000"))
+# Must stay below the tool call timeout
+VAR_TIMEOUT = float(os.getenv("VAR_TIMEOUT", "20"))
+VAR_WORKERS = int(os.getenv("VAR_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+MAX_POSITIONS = 50
+
+_NUMBER = re.compile(r"^\d[\d.,]*$")
+_SEPARATORS = re.compile(r"[;\n]|,\s+|,(?=[^\W\d])|\s+e\s+")
+# A comma right after a symbol ("PETR4,50 AAPL") also separates items;
+# between digits ("1,5") it is a decimal mark
+_SYMBOL_COMMA = re.compile(r"\b([^\W\d][\w.]*),(?=\d)")
+
+
+def parse_number(text: str) -> float:
+    """Quantity in Brazilian or US format (2.000, 2,000, 1,5, 1.5)."""
+    if "," in text and "." in text:
+        decimal = "," if text.rfind(",") > text.rfind(".") else "."
+        thousands = "." if decimal == "," else ","
+        return float(text.replace(thousands, "").replace(decimal, "."))
+    sep = "," if "," in text else "."
+    head, _, tail = text.rpartition(sep)
+    if head and len(tail) == 3:
+        return float(text.replace(sep, ""))
+    return float(text.replace(",", "."))
+
+
+def parse_holdings(text: str) -> tuple:
+    """([(quantity, symbol), ...], chunks that were not understood).
+
+    Each item is "quantity symbol" or "symbol quantity"; the symbol can be
+    a ticker, a company name or a currency code.
+    """
+    holdings, invalid = [], []
+    text = _SYMBOL_COMMA.sub(r"\1;", text)
+    for chunk in _SEPARATORS.split(text):
+        words = chunk.replace(":", " ").replace("x ", " ").split()
+        if not words:
+            continue
+        if _NUMBER.match(words[0]) and len(words) > 1:
+            number, symbol = words[0], " ".join(words[1:])
+        elif _NUMBER.match(words[-1]) and len(words) > 1:
+            number, symbol = words[-1], " ".join(words[:-1])
+        else:
+            invalid.append(chunk.strip())
+            continue
+        try:
+            holdings.append((parse_number(number), symbol))
+        except ValueError:
+            invalid.append(chunk.strip())
+    return holdings, invalid
+
+
+class Position:
+    """Valued position: a stock (ticker) or cash in a currency (ticker None)."""
+
+    __slots__ = ("symbol", "ticker", "quantity", "currency", "price", "value")
+
+    def __init__(self, symbol: str, ticker: Optional[str], quantity: float,
+                 currency: str, price: float):
+        self.symbol = symbol
+        self.ticker = ticker
+        self.quantity = quantity
+        self.currency = currency
+        self.price = price
+        self.value = 0.0
+
+
+def build_positions(holdings: list, base: str) -> tuple:
+    """(positions valued in the base currency, symbols not found)."""
+    snapshot = get_snapshot()
+    merged, missing = {}, []
+    for quantity, symbol in holdings[:MAX_POSITIONS]:
+        code = symbol.upper().strip()
+        quote = snapshot.quote(symbol)
+        if quote is not None:
+            key = (quote.ticker, quote.currency, quote.price)
+        elif code in snapshot.fx_matrix.currencies:
+            key = (None, code, 1.0)
+        else:
+            missing.append(symbol)
+            continue
+        merged[key] = merged.get(key, 0.0) + quantity
+
+    positions = [
+        Position(ticker or currency, ticker, quantity, currency, price)
+        for (ticker, currency, price), quantity in merged.items()
+    ]
+    if positions:
+        currencies = sorted({p.currency for p in positions})
+        column = {c: i for i, c in enumerate(currencies)}
+        # Exposure matrix (positions x currencies) in local currency
+        exposure = np.zeros((len(positions), len(currencies)))
+        for i, p in enumerate(positions):
+            exposure[i, column[p.currency]] = p.quantity * p.price
+        values = exposure @ snapshot.fx_matrix.rates_to(currencies, base)
+        for p, value in zip(positions, values):
+            p.value = float(value)
+    return positions, missing
+
+
+def aligned_returns(tickers: list, lookback: int = VAR_LOOKBACK) -> Optional[np.ndarray]:
+    """Daily log returns (T, n) on the dates shared by the tickers, or None."""
+    store = get_store()
+    tables = [store.series(t) for t in tickers]
+    if any(t is None or t.shape[1] < 3 for t in tables):
+        return None
+    tails = [t[:, -(lookback + 1):] for t in tables]
+    common = reduce(np.intersect1d, (t[DATE] for t in tails))
+    if len(common) < 3:
+        return None
+    closes = np.column_stack([
+        t[CLOSE, np.searchsorted(t[DATE], common)] for t in tails
+    ])
+    return np.diff(np.log(closes), axis=0)
+
+
+def simulate_pnl(values: np.ndarray, mean: np.ndarray, cov: np.ndarray,
+                 paths: int, seed: int) -> np.ndarray:
+    """P&L of `paths` multivariate normal scenarios (runs on the process pool)."""
+    rng = np.random.default_rng(seed)
+    jitter = np.eye(len(values)) * 1e-12 * max(np.trace(cov), 1e-12)
+    chol = np.linalg.cholesky(cov + jitter)
+    returns = mean + rng.standard_normal((paths, len(values))) @ chol.T
+    return np.expm1(returns) @ values
+
+
+def value_at_risk(pnl: np.ndarray, confidence: float) -> tuple:
+    """(VaR, CVaR) as positive losses."""
+    cutoff = np.quantile(pnl, 1.0 - confidence)
+    tail = pnl[pnl <= cutoff]
+    return float(-cutoff), float(-tail.mean()) if len(tail) else float(-cutoff)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_risk_pool() -> ProcessPoolExecutor:
+    """Process pool for the Monte Carlo VaR (created on first use).
+
+    Uses "spawn": the server already runs threads (tools, telemetry), and
+    forking in that state can deadlock the child process.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=VAR_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_risk_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def monte_carlo_var(values: np.ndarray, returns: np.ndarray, horizon: int,
+                          confidence: float, paths: int = VAR_PATHS,
+                          seed: Optional[int] = None) -> tuple:
+    """Monte Carlo (VaR, CVaR), simulated in chunks on the process pool.
+
+    If the wait is cancelled (asyncio.wait_for timeout) or a chunk fails,
+    chunks still queued in the pool are cancelled; only those already
+    dispatched to worker processes (at most VAR_WORKERS + 1) finish.
+    """
+    mean = returns.mean(axis=0) * horizon
+    cov = np.atleast_2d(np.cov(returns, rowvar=False)) * horizon
+    chunks = [VAR_CHUNK] * (paths // VAR_CHUNK) + ([paths % VAR_CHUNK] if paths % VAR_CHUNK else [])
+    seeds = np.random.SeedSequence(seed).generate_state(len(chunks))
+
+    pool = get_risk_pool()
+    futures = [
+        pool.submit(simulate_pnl, values, mean, cov, size, int(s))
+        for size, s in zip(chunks, seeds)
+    ]
+    try:
+        results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return value_at_risk(np.concatenate(results), confidence)
+
+
+async def describe_portfolio(holdings: str, base_currency: str = "BRL",
+                             confidence: float = 0.95, horizon_days: int = 1) -> str:
+    """Portfolio value and risk (historical and Monte Carlo VaR), as text for the LLM."""
+    base = base_currency.upper().strip() or "BRL"
+    parsed, invalid = parse_holdings(holdings)
+    if not parsed:
+        return (
+            "Nenhuma posicao reconhecida. Informe quantidade e ativo, "
+            "ex: 100 PETR4, 50 AAPL, 2000 USD."
+        )
+    positions, missing = build_positions(parsed, base)
+    if any(np.isnan(p.value) for p in positions):
+        return f"Moeda de referencia '{base}' sem cotacao para converter a carteira."
+    if confidence > 1:
+        confidence /= 100  # accepts 95 or 0.95
+    confidence = min(max(confidence, 0.5), 0.999)
+    horizon = max(1, min(int(horizon_days), 30))
+
+    total = sum(p.value for p in positions)
+    lines = [
+        f"Carteira em {base}:",
+        f"Ativo | Qtde | Moeda | Preco | Valor ({base}) | Peso",
+    ]
+    for p in sorted(positions, key=lambda p: -p.value):
+        # Cash: the price shown is the conversion rate to the base currency
+        if p.ticker:
+            label, price = p.symbol, p.price
+        else:
+            label, price = f"{p.symbol} (caixa)", p.value / p.quantity
+        weight = p.value / total * 100 if total else 0.0
+        lines.append(
+            f"{label} | {p.quantity:g} | {p.currency} | {price:.2f} | "
+            f"{p.value:.2f} | {weight:.1f}%"
+        )
+    lines.append(f"Total: {total:.2f} {base}")
+
+    stocks = [p for p in positions if p.ticker]
+    returns = aligned_returns([p.ticker for p in stocks]) if stocks else None
+    if stocks and returns is not None and total > 0:
+        values = np.array([p.value for p in stocks])
+        pnl = np.expm1(returns) @ values
+        hist_var, hist_cvar = value_at_risk(pnl, confidence)
+        scale = np.sqrt(horizon)  # square-root-of-time rule for the historical VaR
+        lines += [
+            f"Risco (horizonte de {horizon} {'pregao' if horizon == 1 else 'pregoes'}, "
+            f"confianca {confidence:.0%}):",
+            f"- VaR historico: {hist_var * scale:.2f} {base} "
+            f"({hist_var * scale / total:.2%}) | CVaR: {hist_cvar * scale:.2f} {base} "
+            f"[{len(pnl)} pregoes]",
+        ]
+        try:
+            mc_var, mc_cvar = await asyncio.wait_for(
+                monte_carlo_var(values, returns, horizon, confidence), VAR_TIMEOUT
+            )
+            lines.append(
+                f"- VaR Monte Carlo: {mc_var:.2f} {base} ({mc_var / total:.2%}) | "
+                f"CVaR: {mc_cvar:.2f} {base} [{VAR_PATHS} cenarios]"
+            )
+        except asyncio.TimeoutError:
+            lines.append("- VaR Monte Carlo indisponivel: simulacao excedeu o tempo limite.")
+        lines.append("Cambio mantido constante no horizonte (risco cambial nao modelado).")
+    elif stocks:
+        lines.append("Historico insuficiente para calcular o VaR.")
+
+    if missing:
+        lines.append(f"Nao encontrados: {', '.join(missing)}")
+    if invalid:
+        lines.append(f"Itens ignorados (sem quantidade): {', '.join(invalid)}")
+    return "\n".join(lines)
@@ -0,0 +1,318 @@
+"""
+OHLC price history in memory-mapped files, one per ticker.
+
+Layout: PRICE_HISTORY_DIR/<TICKER>.npy, float64 with shape (6, n) in
+columnar format, ascending dates:
+
+    row 0: date (days since 1970-01-01)
+    rows 1-5: open, high, low, close, volume
+
+Files are opened with np.load(mmap_mode="r"): the operating system pages in
+only the part that is read, and the map stays open for the whole process.
+A period query is a binary search over the dates (searchsorted) and a
+zero-copy slice of the columns, instead of loading the history on every
+request.
+
+Offline load from CSV files (one per ticker, columns
+date,open,high,low,close,volume):
+
+    python price_history.py load-csv ./csv --out ./history
+
+When a ticker has no file, a simulated history (deterministic per ticker,
+ending at the snapshot price) is generated and written on the first query
+under PRICE_HISTORY_DIR/synthetic/<date>-v<snapshot version>/; when the
+date rolls over or a new snapshot version is published, the history is
+generated again (and older directories are removed), so it never drifts
+from the current quote. PRICE_HISTORY_SYNTHETIC=false disables this.
+"""
+
+import argparse
+import csv
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from market_data import get_snapshot
+
+logger = logging.getLogger(__name__)
+
+PRICE_HISTORY_DIR = os.getenv(
+    "PRICE_HISTORY_DIR", os.path.join(tempfile.gettempdir(), "price_history")
+)
+PRICE_HISTORY_SYNTHETIC = os.getenv("PRICE_HISTORY_SYNTHETIC", "true").lower() == "true"
+# Trading days generated in the simulated history (~2 years)
+SYNTHETIC_DAYS = 504
+# Table rows returned to the LLM; longer periods call for a larger interval
+MAX_ROWS = 40
+
+DATE, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+INTERVALS = {"1d": "diario", "1wk": "semanal", "1mo": "mensal"}
+
+_RELATIVE = re.compile(r"^(\d+)\s*(d|w|m|y)$")
+_RELATIVE_DAYS = {"d": 1, "w": 7, "m": 30, "y": 365}
+
+
+def to_day(value: str) -> int:
+    """YYYY-MM-DD -> days since 1970-01-01."""
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def from_day(day: float) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def write_series(path: str, table: np.ndarray) -> None:
+    """Atomically write a (6, n) table sorted by date."""
+    order = np.argsort(table[DATE], kind="stable")
+    tmp = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp, np.ascontiguousarray(table[:, order], dtype=np.float64))
+    os.replace(tmp, path)
+
+
+def synthetic_stamp() -> tuple:
+    """(date, snapshot version) identifying the valid simulated history."""
+    return date.today().isoformat(), get_snapshot().version
+
+
+def synthetic_dir(root: str, stamp: tuple) -> str:
+    day, version = stamp
+    return os.path.join(root, "synthetic", f"{day}-v{version}")
+
+
+def synthesize(ticker: str, last_price: float, end: Optional[str] = None,
+               days: int = SYNTHETIC_DAYS) -> np.ndarray:
+    """Simulated history (geometric random walk) ending at last_price."""
+    seed = int.from_bytes(hashlib.sha256(ticker.encode()).digest()[:8], "little")
+    rng = np.random.default_rng(seed)
+
+    end_day = np.datetime64(end or date.today().isoformat(), "D")
+    calendar = np.arange(end_day - int(days * 1.6), end_day + 1, dtype="datetime64[D]")
+    dates = calendar[np.is_busday(calendar)][-days:]
+    n = len(dates)
+
+    log_close = np.cumsum(rng.normal(0.0003, 0.018, n))
+    close = last_price * np.exp(log_close - log_close[-1])
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.004, n))
+    spread = np.abs(rng.normal(0, 0.008, n))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = np.round(rng.lognormal(14, 0.5, n))
+    return np.vstack([dates.astype(np.int64), open_, high, low, close, volume]).round(4)
+
+
+class PriceHistoryStore:
+    """Opens (once) and queries the memory-mapped files per ticker."""
+
+    def __init__(self, root: str = PRICE_HISTORY_DIR, synthetic: bool = PRICE_HISTORY_SYNTHETIC):
+        self.root = root
+        self.synthetic = synthetic
+        self._maps: dict = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def path(self, ticker: str, root: Optional[str] = None) -> str:
+        return os.path.join(root or self.root, f"{ticker.replace('/', '_')}.npy")
+
+    def series(self, ticker: str) -> Optional[np.ndarray]:
+        """Memory-mapped (6, n) table for the ticker, or None if there is no history."""
+        stamp = synthetic_stamp() if self.synthetic else None
+        if stamp != self._stamp:
+            # New date or snapshot version: reopen everything (simulated data is regenerated)
+            with self._lock:
+                if stamp != self._stamp:
+                    self._maps = {}
+                    self._stamp = stamp
+        table = self._maps.get(ticker)
+        if table is not None:
+            return table
+        with self._lock:
+            table = self._maps.get(ticker)
+            if table is None:
+                table = self._open(ticker, stamp)
+                if table is not None and stamp == self._stamp:
+                    self._maps[ticker] = table
+        return table
+
+    def _open(self, ticker: str, stamp: Optional[tuple]) -> Optional[np.ndarray]:
+        path = self.path(ticker)
+        if os.path.exists(path):
+            return np.load(path, mmap_mode="r")
+        quote = get_snapshot().quote(ticker)
+        if not self.synthetic or quote is None:
+            return None
+        folder = synthetic_dir(self.root, stamp)
+        path = self.path(ticker, folder)
+        if not os.path.exists(path):
+            if not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok=True)
+                self._prune_synthetic(folder)
+            write_series(path, synthesize(ticker, quote.price, end=stamp[0]))
+        return np.load(path, mmap_mode="r")
+
+    def _prune_synthetic(self, keep: str) -> None:
+        """Remove simulated histories from earlier dates/versions."""
+        parent = os.path.dirname(keep)
+        for name in os.listdir(parent):
+            old = os.path.join(parent, name)
+            if old != keep:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def range(self, ticker: str, start_day: int, end_day: int) -> Optional[np.ndarray]:
+        """Zero-copy (6, k) slice with dates in [start_day, end_day]."""
+        table = self.series(ticker)
+        if table is None:
+            return None
+        dates = table[DATE]
+        lo = int(np.searchsorted(dates, start_day, side="left"))
+        hi = int(np.searchsorted(dates, end_day, side="right"))
+        return table[:, lo:hi]
+
+
+def resample(block: np.ndarray, interval: str) -> np.ndarray:
+    """Aggregate a daily slice into weeks or months (vectorized with reduceat)."""
+    if interval == "1d" or block.shape[1] == 0:
+        return block
+    days = block[DATE].astype("datetime64[D]")
+    if interval == "1wk":
+        keys = (days - np.datetime64("1970-01-05", "D")).astype(np.int64) // 7  # weeks (Monday)
+    else:
+        keys = days.astype("datetime64[M]").astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], block.shape[1]] - 1
+    return np.vstack([
+        block[DATE, ends],
+        block[OPEN, starts],
+        np.maximum.reduceat(block[HIGH], starts),
+        np.minimum.reduceat(block[LOW], starts),
+        block[CLOSE, ends],
+        np.add.reduceat(block[VOLUME], starts),
+    ])
+
+
+def parse_period(start: str, end: str, last_day: int) -> tuple:
+    """(start_day, end_day) from YYYY-MM-DD dates or periods (5d, 1m, 1y)."""
+    end_day = to_day(end) if end.strip() else last_day
+    match = _RELATIVE.match(start.strip().lower() or "1m")
+    if match:
+        start_day = end_day - int(match.group(1)) * _RELATIVE_DAYS[match.group(2)]
+    else:
+        start_day = to_day(start.strip())
+    return start_day, end_day
+
+
+def describe_history(ticker: str, start: str = "1m", end: str = "", interval: str = "1d") -> str:
+    """Summary and OHLC table for a period, as compact text for the LLM."""
+    quote = get_snapshot().quote(ticker)
+    if quote is None:
+        return f"Ticker '{ticker.upper().strip()}' nao encontrado."
+    interval = interval.lower().strip() if interval.lower().strip() in INTERVALS else "1d"
+
+    store = get_store()
+    table = store.series(quote.ticker)
+    if table is None or table.shape[1] == 0:
+        return f"Sem historico de precos para {quote.ticker}."
+    try:
+        start_day, end_day = parse_period(start, end, int(table[DATE, -1]))
+    except ValueError:
+        return f"Periodo invalido (start='{start}', end='{end}'). Use AAAA-MM-DD ou periodos como 5d, 1m, 6m, 1y."
+
+    block = store.range(quote.ticker, start_day, end_day)
+    if block is None or block.shape[1] == 0:
+        return f"Sem historico para {quote.ticker} entre {from_day(start_day)} e {from_day(end_day)}."
+
+    first_close, last_close = block[CLOSE, 0], block[CLOSE, -1]
+    lines = [
+        f"{quote.ticker} ({quote.name}) {from_day(block[DATE, 0])} a {from_day(block[DATE, -1])}, "
+        f"{INTERVALS[interval]}, {block.shape[1]} pregoes, {quote.currency}",
+        f"Inicio: {first_close:.2f} | Fim: {last_close:.2f} | "
+        f"Retorno: {(last_close / first_close - 1) * 100:+.2f}% | "
+        f"Maxima: {block[HIGH].max():.2f} | Minima: {block[LOW].min():.2f}",
+    ]
+
+    rows = resample(block, interval)
+    if rows.shape[1] > MAX_ROWS:
+        lines.append(
+            f"Mostrando os ultimos {MAX_ROWS} de {rows.shape[1]} periodos "
+            f"(use interval 1wk ou 1mo para periodos longos)."
+        )
+        rows = rows[:, -MAX_ROWS:]
+    lines.append("Data | Abertura | Maxima | Minima | Fechamento | Volume")
+    for d, o, h, lo, c, v in rows.T:
+        lines.append(f"{from_day(d)} | {o:.2f} | {h:.2f} | {lo:.2f} | {c:.2f} | {v:.0f}")
+    return "\n".join(lines)
+
+
+# =============================================================
+# Process-wide store
+# =============================================================
+
+_store: Optional[PriceHistoryStore] = None
+
+
+def get_store() -> PriceHistoryStore:
+    global _store
+    if _store is None:
+        _store = PriceHistoryStore()
+    return _store
+
+
+# =============================================================
+# Offline load (CLI)
+# =============================================================
+
+def load_csv(path: str) -> np.ndarray:
+    """Read a date,open,high,low,close,volume CSV into a (6, n) table."""
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = [
+            (to_day(r["date"][:10]), float(r["open"]), float(r["high"]),
+             float(r["low"]), float(r["close"]), float(r.get("volume") or 0))
+            for r in csv.DictReader(f)
+        ]
+    return np.array(rows, dtype=np.float64).reshape(-1, 6).T
+
+
+def load_csv_dir(source: str, dest: str = PRICE_HISTORY_DIR) -> int:
+    """Convert every <TICKER>.csv in source into .npy files in dest."""
+    os.makedirs(dest, exist_ok=True)
+    count = 0
+    for name in sorted(os.listdir(source)):
+        if not name.lower().endswith(".csv"):
+            continue
+        ticker = os.path.splitext(name)[0].upper()
+        write_series(os.path.join(dest, f"{ticker}.npy"), load_csv(os.path.join(source, name)))
+        count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load of the OHLC history")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load-csv", help="Convert CSV files (one per ticker) into .npy files")
+    load.add_argument("source", help="Directory with <TICKER>.csv")
+    load.add_argument("--out", default=PRICE_HISTORY_DIR)
+    synth = sub.add_parser("synthesize", help="Generate simulated history for the whole snapshot")
+    synth.add_argument("--out", default=PRICE_HISTORY_DIR)
+    args = parser.parse_args()
+
+    if args.command == "load-csv":
+        print(f"{load_csv_dir(args.source, args.out)} tickers written to {args.out}")
+    else:
+        stamp = synthetic_stamp()
+        out = synthetic_dir(args.out, stamp)
+        os.makedirs(out, exist_ok=True)
+        snapshot = get_snapshot()
+        for ticker, price in zip(snapshot.tickers, snapshot.prices):
+            write_series(os.path.join(out, f"{ticker}.npy"), synthesize(ticker, price, end=stamp[0]))
+        print(f"{len(snapshot)} tickers written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Agent answer cache for repeated questions.
+
+Many users ask the same question within a few minutes ("resumo do
+mercado"), and each one ran the whole graph. ResponseCache keeps the final
+answer per (normalized question, market snapshot version):
+
+- when a new snapshot is published (swap_snapshot), every entry from the
+  previous version is dropped, since the quotes changed;
+- memory is bounded by an LRU with byte accounting
+  (RESPONSE_CACHE_MAX_BYTES) and a safety TTL (RESPONSE_CACHE_TTL);
+- hits and misses are exported as OpenTelemetry counters.
+
+Only questions without session history are cached: with history, the
+answer depends on the conversation context.
+"""
+
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from opentelemetry import metrics
+
+from fast_path import normalize
+from market_data import get_snapshot
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+
+meter = metrics.get_meter(__name__)
+hit_counter = meter.create_counter(
+    "agent.response_cache.hits", description="Answers served from the cache"
+)
+miss_counter = meter.create_counter(
+    "agent.response_cache.misses", description="Questions that had to run the graph"
+)
+
+
+class ResponseCache:
+    """Byte-bounded LRU of answers, tied to the snapshot version."""
+
+    def __init__(
+        self,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        ttl: float = RESPONSE_CACHE_TTL,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[tuple, tuple[float, str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._version = None
+
+    def key_for(self, question: str) -> tuple:
+        """Key (normalized question, current snapshot version).
+
+        Taken before running the graph: if the snapshot changes during the
+        run, put() discards the answer computed from stale data.
+        """
+        version = get_snapshot().version
+        if version != self._version:
+            # New snapshot: previous answers quote old prices
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+        return normalize(question), version
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Cached answer for the key, or None."""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            miss_counter.add(1)
+            return None
+        self._entries.move_to_end(key)
+        hit_counter.add(1)
+        return entry[1]
+
+    def put(self, key: tuple, answer: str) -> None:
+        """Store the final answer to a question without history."""
+        if not self.enabled or not answer or key[1] != self._version:
+            return
+        size = sys.getsizeof(key[0]) + sys.getsizeof(answer)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, answer, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
@@ -0,0 +1,242 @@
+"""
+Per-session conversation history for the LangGraph agent.
+
+Each /chat request (or Bot Framework activity) carries only the new
+message; the session history is loaded from here, the graph runs on
+history + new message, and the result is saved back.
+
+Unlike a LangGraph checkpointer, which writes the full state on every
+superstep, only the session's final message list is persisted, in a
+compact format (minimal JSON + zlib).
+
+Backends:
+- MemorySessionStore (default): in-memory LRU bounded by session count,
+  bytes and idle expiry.
+- SqliteSessionStore: local SQLite file (SESSION_DB_PATH); writes run on
+  a dedicated thread, off the request path.
+
+Concurrent turns of the same session must run under store.lock(session_id):
+otherwise each one loads the same history and the last save erases the
+other turn. The lock is per replica; with several replicas, use session
+affinity at the ingress.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "3600"))
+
+
+# =============================================================
+# Compact serialization
+# =============================================================
+
+def dump_messages(messages: list) -> bytes:
+    """Serialize Human/AI/Tool messages to minimal compressed JSON."""
+    rows = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            rows.append(["h", msg.content])
+        elif isinstance(msg, AIMessage):
+            calls = [[tc["id"], tc["name"], tc["args"]] for tc in msg.tool_calls]
+            rows.append(["a", msg.content, calls] if calls else ["a", msg.content])
+        elif isinstance(msg, ToolMessage):
+            rows.append(["t", msg.content, msg.tool_call_id, msg.name, msg.status])
+    raw = json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(raw.encode("utf-8"), 1)
+
+
+def load_messages(blob: bytes) -> list:
+    """Inverse of dump_messages."""
+    messages = []
+    for row in json.loads(zlib.decompress(blob)):
+        kind = row[0]
+        if kind == "h":
+            messages.append(HumanMessage(content=row[1]))
+        elif kind == "a":
+            calls = row[2] if len(row) > 2 else []
+            messages.append(AIMessage(
+                content=row[1],
+                tool_calls=[{"id": i, "name": n, "args": a} for i, n, a in calls],
+            ))
+        elif kind == "t":
+            messages.append(ToolMessage(
+                content=row[1], tool_call_id=row[2], name=row[3], status=row[4],
+            ))
+    return messages
+
+
+# =============================================================
+# Per-session concurrency
+# =============================================================
+
+class SessionLocks:
+    """One asyncio.Lock per session_id, created on use and dropped on release."""
+
+    def __init__(self):
+        self._locks: dict = {}  # session_id -> [lock, holders]
+
+    @contextlib.asynccontextmanager
+    async def hold(self, session_id: str):
+        entry = self._locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[session_id]
+
+    def __len__(self):
+        return len(self._locks)
+
+
+# =============================================================
+# Backends
+# =============================================================
+
+class MemorySessionStore:
+    """In-memory sessions with an LRU bounded by count and bytes."""
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        max_bytes: int = SESSION_MAX_BYTES,
+        idle_ttl: float = SESSION_IDLE_TTL,
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self.lock = SessionLocks().hold
+
+    async def load(self, session_id: str) -> list:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return []
+        last_access, blob = entry
+        if time.monotonic() - last_access > self.idle_ttl:
+            self._drop(session_id)
+            return []
+        self._sessions[session_id] = (time.monotonic(), blob)
+        self._sessions.move_to_end(session_id)
+        return load_messages(blob)
+
+    def save(self, session_id: str, messages: list) -> None:
+        blob = dump_messages(messages)
+        self._drop(session_id)
+        self._sessions[session_id] = (time.monotonic(), blob)
+        self._bytes += len(blob)
+        self._evict()
+
+    async def aclose(self) -> None:
+        self._sessions.clear()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _drop(self, session_id: str) -> None:
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def _evict(self) -> None:
+        # Oldest first: idle sessions, then LRU until within limits
+        now = time.monotonic()
+        while self._sessions:
+            oldest, (last_access, _) = next(iter(self._sessions.items()))
+            over_limit = len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            if not over_limit and now - last_access <= self.idle_ttl:
+                break
+            self._drop(oldest)
+
+
+class SqliteSessionStore:
+    """Sessions in a local SQLite file.
+
+    Reads and writes go through the same dedicated thread, so a read always
+    sees the session's earlier writes, and save() returns without waiting
+    for the disk.
+    """
+
+    def __init__(self, path: str, idle_ttl: float = SESSION_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-db")
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._executor.submit(self._init_db).result()
+        self.lock = SessionLocks().hold
+
+    def _init_db(self) -> None:
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY, blob BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.idle_ttl,)
+            )
+
+    def _load(self, session_id: str) -> Optional[bytes]:
+        row = self._conn.execute(
+            "SELECT blob FROM sessions WHERE id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.idle_ttl),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _save(self, session_id: str, blob: bytes) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, blob, updated_at) VALUES (?, ?, ?)",
+                (session_id, blob, now),
+            )
+            self._conn.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (now - self.idle_ttl,)
+            )
+
+    async def load(self, session_id: str) -> list:
+        blob = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._load, session_id
+        )
+        return load_messages(blob) if blob else []
+
+    def save(self, session_id: str, messages: list) -> None:
+        future = self._executor.submit(self._save, session_id, dump_messages(messages))
+        future.add_done_callback(_log_write_error)
+
+    async def aclose(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self._conn.close()
+
+
+def _log_write_error(future) -> None:
+    if future.exception() is not None:
+        logger.error("Failed to save session: %s", future.exception())
+
+
+def create_session_store():
+    """Backend selected by SESSION_DB_PATH (SQLite) or in memory."""
+    path = os.getenv("SESSION_DB_PATH")
+    if path:
+        logger.info("Sessions in SQLite: %s", path)
+        return SqliteSessionStore(path)
+    return MemorySessionStore()
@@ -8,19 +8,26 @@ Uso:
     python chat.py --lesson 1          # Declarativo
     python chat.py --lesson 2          # Hosted MAF
     python chat.py --lesson 3          # Hosted LangGraph
-    python chat.py --lesson 4          # ACA Connected (auto-resolve endpoint)
+    python chat.py --lesson 4          # ACA Connected (auto-resolve endpoint, em cache)
     python chat.py --lesson 1 --once "Qual a cotacao da PETR4?"
+    python chat.py --lesson 3 --stream  # Resposta em streaming + TTFT
+    python chat.py --lesson 4 --load perguntas.txt --concurrency 8   # Teste de carga
 
 Requer: pip install azure-identity requests python-dotenv
+        (modo --load: pip install aiohttp; ver loadgen.py)
 """
 
 import argparse
+import asyncio
 import json
 import os
 import subprocess
 import sys
+import threading
+import time
 
 import requests
+from requests.adapters import HTTPAdapter
 from azure.identity import DefaultAzureCredential
 from dotenv import load_dotenv
 
@@ -66,11 +73,160 @@ LESSONS = {
 }
 
 
+# ── Credencial e conexoes reutilizadas ───────────────────────────
+
+TOKEN_SCOPE = "https://ai.azure.com/.default"
+# Renova o token um pouco antes de expirar, para nao falhar no meio de uma chamada
+TOKEN_REFRESH_MARGIN = 300
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+
+
+class TokenCache:
+    """Uma unica DefaultAzureCredential por processo, com o token em cache.
+
+    O token so e renovado quando esta a TOKEN_REFRESH_MARGIN segundos de
+    expirar (ou apos um 401), em vez de um get_token a cada mensagem.
+    """
+
+    def __init__(self, scope=TOKEN_SCOPE, margin=TOKEN_REFRESH_MARGIN):
+        self.scope = scope
+        self.margin = margin
+        self._credential = None
+        self._token = None
+        self._lock = threading.Lock()
+
+    def _expired(self):
+        return self._token is None or self._token.expires_on - self.margin <= time.time()
+
+    def get(self):
+        if self._expired():
+            with self._lock:
+                if self._expired():
+                    if self._credential is None:
+                        self._credential = DefaultAzureCredential()
+                    self._token = self._credential.get_token(self.scope)
+        return self._token.token
+
+    def invalidate(self):
+        self._token = None
+
+
+_tokens = TokenCache()
+_sessions = {}
+
+
+def get_session(endpoint):
+    """Session HTTP por endpoint: keep-alive e pool de conexoes reutilizadas.
+
+    Evita um novo handshake TCP+TLS a cada mensagem.
+    """
+    session = _sessions.get(endpoint)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _sessions[endpoint] = session
+    return session
+
+
+def close_sessions():
+    for session in _sessions.values():
+        session.close()
+    _sessions.clear()
+
+
+# ── Cache de endpoints ACA ───────────────────────────────────────
+
+ENDPOINT_CACHE_FILE = os.environ.get(
+    "ENDPOINT_CACHE_FILE",
+    os.path.join(os.path.expanduser("~"), ".cache", "foundry-agents-workshop", "endpoints.json"),
+)
+ENDPOINT_CACHE_TTL = int(os.environ.get("ENDPOINT_CACHE_TTL", str(24 * 3600)))
+
+
+class EndpointCache:
+    """FQDNs de Container Apps em disco, por (resource group, app), com TTL.
+
+    Evita rodar `az containerapp show` (varios segundos de startup do CLI)
+    a cada execucao do chat.py. A entrada e descartada ao expirar ou quando
+    a conexao com o endpoint falha (app recriado, FQDN novo).
+    """
+
+    def __init__(self, path=ENDPOINT_CACHE_FILE, ttl=ENDPOINT_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(app_name, rg):
+        return f"{rg}/{app_name}"
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self, entries):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Escrita atomica: varias execucoes em paralelo nao corrompem o arquivo
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            print(f"  AVISO: Nao foi possivel gravar o cache de endpoints: {exc}", file=sys.stderr)
+
+    def get(self, app_name, rg):
+        entry = self._load().get(self._key(app_name, rg))
+        if not isinstance(entry, dict) or not entry.get("url"):
+            return None
+        if time.time() - entry.get("resolved_at", 0) > self.ttl:
+            return None
+        return entry["url"]
+
+    def put(self, app_name, rg, url):
+        entries = self._load()
+        entries[self._key(app_name, rg)] = {"url": url, "resolved_at": time.time()}
+        self._save(entries)
+
+    def invalidate(self, url):
+        """Remove as entradas que apontam para `url`; retorna True se havia alguma."""
+        entries = self._load()
+        stale = [key for key, entry in entries.items()
+                 if isinstance(entry, dict) and entry.get("url") == url]
+        for key in stale:
+            del entries[key]
+        if stale:
+            self._save(entries)
+        return bool(stale)
+
+
+_endpoints = EndpointCache()
+
+
+def _invalidate_endpoint(endpoint):
+    if _endpoints.invalidate(endpoint):
+        print(
+            f"  AVISO: Falha de conexao com {endpoint}; endpoint removido do cache "
+            "(a proxima execucao resolve de novo via az CLI)",
+            file=sys.stderr,
+        )
+
+
 # ── Funcao de invocacao ──────────────────────────────────────────
 
-def _resolve_aca_endpoint(app_name: str) -> str:
-    """Resolve o FQDN do Container App via az CLI."""
+def _resolve_aca_endpoint(app_name: str, refresh: bool = False) -> str:
+    """Resolve o FQDN do Container App pelo cache em disco ou, se ausente, via az CLI."""
     rg = os.environ.get("RESOURCE_GROUP", "rg-ai-agents-workshop")
+    if not refresh:
+        cached = _endpoints.get(app_name, rg)
+        if cached:
+            print(f"  ACA endpoint (cache): {cached}")
+            return cached
     try:
         cmd = (
             f'az containerapp show --name {app_name} '
@@ -84,6 +240,7 @@ def _resolve_aca_endpoint(app_name: str) -> str:
         if fqdn:
             url = f"https://{fqdn}"
             print(f"  ACA endpoint resolvido: {url}")
+            _endpoints.put(app_name, rg, url)
             return url
     except Exception as exc:
         print(f"  AVISO: Nao foi possivel resolver ACA endpoint: {exc}", file=sys.stderr)
@@ -92,8 +249,97 @@ def _resolve_aca_endpoint(app_name: str) -> str:
     sys.exit(1)
 
 
-def invoke_agent(endpoint, lesson_config, user_message):
-    """Invoca o agente via REST.
+def _auth_headers():
+    return {
+        "Authorization": f"Bearer {_tokens.get()}",
+        "Content-Type": "application/json",
+    }
+
+
+API_VERSION = "2025-11-15-preview"
+HISTORY_MODES = ("conversation", "previous_response", "none")
+
+
+class Conversation:
+    """Estado multi-turno do chat, reaproveitado no servidor a cada mensagem.
+
+    - Foundry (licoes 1-3): uma conversation criada na primeira mensagem
+      ou, em mode="previous_response" (ou se a criacao falhar), o
+      encadeamento por previous_response_id;
+    - ACA (licao 4): o session_id devolvido pelo /chat.
+
+    Assim cada turno envia so a mensagem nova, e o agente responde
+    perguntas de seguimento ("e a VALE3?") com o contexto do servidor.
+    Tambem acumula o uso de tokens informado em cada resposta.
+    """
+
+    def __init__(self, endpoint, lesson_config, mode="conversation"):
+        self.endpoint = endpoint
+        self.lesson_config = lesson_config
+        self.mode = mode
+        self.reset()
+
+    def reset(self):
+        self.conversation_id = None
+        self.previous_response_id = None
+        self.session_id = None
+        self.last_usage = None
+        self.total_usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+
+    def apply(self, body):
+        """Acrescenta ao body os identificadores da conversa em andamento."""
+        if self.mode == "none":
+            return body
+        if self.lesson_config["type"] == "aca":
+            if self.session_id:
+                body["session_id"] = self.session_id
+            return body
+        if self.mode == "conversation" and self.conversation_id is None:
+            self._create_conversation()
+        if self.conversation_id:
+            body["conversation"] = self.conversation_id
+        elif self.previous_response_id:
+            body["previous_response_id"] = self.previous_response_id
+        return body
+
+    def _create_conversation(self):
+        url = f"{self.endpoint}/openai/conversations?api-version={API_VERSION}"
+        try:
+            resp = _post(self.endpoint, self.lesson_config, url, {})
+            self.conversation_id = resp.json()["id"]
+        except Exception as exc:
+            print(f"  AVISO: conversation indisponivel ({exc}); usando previous_response_id",
+                  file=sys.stderr)
+            self.mode = "previous_response"
+
+    def update(self, data):
+        """Registra id/sessao e uso de tokens de uma resposta (JSON final)."""
+        if self.lesson_config["type"] == "aca":
+            self.session_id = data.get("session_id") or self.session_id
+        else:
+            self.previous_response_id = data.get("id") or self.previous_response_id
+        usage = data.get("usage")
+        self.last_usage = usage
+        if usage:
+            for key in self.total_usage:
+                self.total_usage[key] += usage.get(key) or 0
+
+    def describe_usage(self):
+        """Linha com o uso de tokens do ultimo turno e o acumulado."""
+        usage = self.last_usage
+        if not usage:
+            # Resposta sem bloco usage (ex.: agente ACA anterior a essa versao)
+            return "Tokens: uso de tokens indisponivel"
+        return (
+            f"Tokens: entrada {usage.get('input_tokens', 0)} | "
+            f"saida {usage.get('output_tokens', 0)} | "
+            f"total {usage.get('total_tokens', 0)} "
+            f"(acumulado na conversa: {self.total_usage['total_tokens']})"
+        )
+
+
+def build_request(endpoint, lesson_config, user_message):
+    """Monta (url, body) da chamada ao agente.
 
     Adapta o body conforme o tipo do agente:
     - Declarativo: Responses API com name + type
@@ -102,18 +348,10 @@ def invoke_agent(endpoint, lesson_config, user_message):
     """
     # ACA: chamada direta ao Container App (sem Foundry)
     if lesson_config["type"] == "aca":
-        url = f"{endpoint}/chat"
-        headers = {"Content-Type": "application/json"}
-        body = {"message": user_message}
-        resp = requests.post(url, headers=headers, json=body, timeout=120)
-        resp.raise_for_status()
-        return resp.json().get("response", "(sem resposta)")
+        return f"{endpoint}/chat", {"message": user_message}
 
     # Foundry agents (declarativo, hosted)
-    credential = DefaultAzureCredential()
-    token = credential.get_token("https://ai.azure.com/.default").token
-
-    url = f"{endpoint}/openai/responses?api-version=2025-11-15-preview"
+    url = f"{endpoint}/openai/responses?api-version={API_VERSION}"
 
     agent_ref = {
         "name": lesson_config["name"],
@@ -128,17 +366,14 @@ def invoke_agent(endpoint, lesson_config, user_message):
         "input": [{"role": "user", "content": user_message}],
         "agent": agent_ref,
     }
+    return url, body
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-    }
 
-    resp = requests.post(url, headers=headers, json=body, timeout=120)
-    resp.raise_for_status()
-    data = resp.json()
+def extract_text(lesson_config, data):
+    """Extrai o texto da resposta (ACA: campo response; Foundry: output_text)."""
+    if lesson_config["type"] == "aca":
+        return data.get("response", "(sem resposta)")
 
-    # Extrair texto da resposta
     for item in data.get("output", []):
         if item.get("type") == "message":
             for content in item.get("content", []):
@@ -148,6 +383,109 @@ def invoke_agent(endpoint, lesson_config, user_message):
     return f"(sem texto na resposta - output: {data.get('output', [])})"
 
 
+def _post(endpoint, lesson_config, url, body, stream=False):
+    """POST pela Session do endpoint; Foundry leva o token (renovado apos um 401)."""
+    session = get_session(endpoint)
+
+    if lesson_config["type"] == "aca":
+        headers = {"Content-Type": "application/json"}
+        try:
+            resp = session.post(url, headers=headers, json=body, timeout=120, stream=stream)
+        except requests.ConnectionError:
+            _invalidate_endpoint(endpoint)
+            raise
+    else:
+        resp = session.post(url, headers=_auth_headers(), json=body, timeout=120, stream=stream)
+        if resp.status_code == 401:
+            # Token revogado/expirado antes do previsto: renova e tenta uma vez
+            resp.close()
+            _tokens.invalidate()
+            resp = session.post(url, headers=_auth_headers(), json=body, timeout=120, stream=stream)
+    resp.raise_for_status()
+    return resp
+
+
+def invoke_agent(endpoint, lesson_config, user_message, conversation=None):
+    """Invoca o agente via REST e retorna o texto da resposta."""
+    url, body = build_request(endpoint, lesson_config, user_message)
+    if conversation is not None:
+        conversation.apply(body)
+    data = _post(endpoint, lesson_config, url, body).json()
+    if conversation is not None:
+        conversation.update(data)
+    return extract_text(lesson_config, data)
+
+
+def iter_sse(resp):
+    """Itera (evento, dados) de uma resposta Server-Sent Events."""
+    resp.encoding = "utf-8"  # text/event-stream sem charset viraria latin-1
+    event, data = None, []
+    # chunk_size=None: entrega cada pedaco assim que chega, sem bufferizar
+    for line in resp.iter_lines(chunk_size=None, decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+        elif not line and data:
+            payload = "\n".join(data)
+            yield event, (json.loads(payload) if payload != "[DONE]" else {})
+            event, data = None, []
+
+
+def stream_agent(endpoint, lesson_config, user_message, on_text, conversation=None):
+    """Invoca o agente em streaming, chamando on_text a cada trecho de texto.
+
+    - ACA: POST /chat/stream (eventos token, tool_start, tool_end, done)
+    - Foundry: Responses API com stream=true (response.output_text.delta)
+
+    Retorna (texto completo, TTFT em s ou None, tempo total em s).
+    """
+    url, body = build_request(endpoint, lesson_config, user_message)
+    if conversation is not None:
+        conversation.apply(body)
+    if lesson_config["type"] == "aca":
+        url = f"{url}/stream"
+    else:
+        body["stream"] = True
+
+    started = time.perf_counter()
+    ttft, parts = None, []
+    with _post(endpoint, lesson_config, url, body, stream=True) as resp:
+        for event, data in iter_sse(resp):
+            kind = event or data.get("type", "")
+            if kind in ("token", "response.output_text.delta"):
+                text = data.get("content") if kind == "token" else data.get("delta")
+                if text:
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    parts.append(text)
+                    on_text(text)
+            elif kind == "tool_start":
+                on_text(f"\n  [ferramenta {', '.join(data.get('tools', []))}...]\n")
+            elif kind == "tool_end" and data.get("status") == "error":
+                on_text(f"  [ferramenta {data.get('tool')} falhou]\n")
+            elif kind == "done" and not parts:
+                # Fast path/cache do ACA: resposta inteira no evento final
+                ttft = time.perf_counter() - started
+                parts.append(data.get("response", ""))
+                on_text(parts[-1])
+            if kind in ("done", "response.completed") and conversation is not None:
+                conversation.update(data.get("response", {}) if kind != "done" else data)
+            elif kind in ("error", "response.failed"):
+                detail = data.get("detail") or data.get("message") or data
+                raise RuntimeError(f"erro no streaming: {detail}")
+    return "".join(parts), ttft, time.perf_counter() - started
+
+
+def _print_chunk(text):
+    print(text, end="", flush=True)
+
+
+def _format_timing(ttft, total):
+    first = f"{ttft:.2f}s" if ttft is not None else "-"
+    return f"(TTFT {first} | total {total:.2f}s)"
+
+
 # ── Interface de chat ────────────────────────────────────────────
 
 def print_header(lesson_num, config, endpoint):
@@ -164,13 +502,14 @@ def print_header(lesson_num, config, endpoint):
     print("=" * 60)
     print()
     print("Digite sua pergunta e pressione Enter.")
-    print("Comandos: 'sair' ou 'quit' para encerrar.")
+    print("Comandos: 'sair' ou 'quit' para encerrar, 'nova' para iniciar outra conversa.")
     print()
 
 
-def chat_loop(endpoint, lesson_num, config):
-    """Loop interativo de chat com o agente."""
+def chat_loop(endpoint, lesson_num, config, stream=False, history="conversation"):
+    """Loop interativo de chat com o agente (multi-turno, ver Conversation)."""
     print_header(lesson_num, config, endpoint)
+    conversation = Conversation(endpoint, config, mode=history)
 
     while True:
         try:
@@ -186,20 +525,39 @@ def chat_loop(endpoint, lesson_num, config):
             print("Ate logo!")
             break
 
+        if user_input.lower() in ("nova", "reset"):
+            conversation = Conversation(endpoint, config, mode=history)
+            print("Nova conversa iniciada.\n")
+            continue
+
         try:
-            response = invoke_agent(endpoint, config, user_input)
-            print(f"\nAgente > {response}\n")
+            if stream:
+                print("\nAgente > ", end="", flush=True)
+                _, ttft, total = stream_agent(
+                    endpoint, config, user_input, _print_chunk, conversation
+                )
+                print(f"\n{_format_timing(ttft, total)}")
+            else:
+                response = invoke_agent(endpoint, config, user_input, conversation)
+                print(f"\nAgente > {response}")
+            print(conversation.describe_usage())
+            print()
         except requests.HTTPError as exc:
             print(f"\nERRO HTTP {exc.response.status_code}: {exc.response.text[:500]}\n")
         except Exception as exc:
             print(f"\nERRO: {exc}\n")
 
 
-def single_query(endpoint, config, message):
+def single_query(endpoint, config, message, stream=False):
     """Executa uma unica query e imprime a resposta."""
     try:
-        response = invoke_agent(endpoint, config, message)
-        print(response)
+        if stream:
+            _, ttft, total = stream_agent(endpoint, config, message, _print_chunk)
+            print()
+            print(_format_timing(ttft, total), file=sys.stderr)
+        else:
+            response = invoke_agent(endpoint, config, message)
+            print(response)
     except requests.HTTPError as exc:
         print(f"ERRO HTTP {exc.response.status_code}: {exc.response.text[:500]}", file=sys.stderr)
         sys.exit(1)
@@ -208,6 +566,57 @@ def single_query(endpoint, config, message):
         sys.exit(1)
 
 
+def load_mode(endpoint, lesson_num, config, args):
+    """Modo --load: reenvia o arquivo de perguntas e reporta latencia/erros."""
+    try:
+        import loadgen
+    except ImportError:
+        print("ERRO: o modo --load requer aiohttp (pip install aiohttp)", file=sys.stderr)
+        sys.exit(1)
+
+    questions = loadgen.load_questions(args.load)
+    if not questions:
+        print(f"ERRO: nenhuma pergunta em {args.load}", file=sys.stderr)
+        sys.exit(1)
+    total = args.requests or len(questions)
+
+    async def auth_headers():
+        # get_token bloqueia: so vai para uma thread quando o token precisa renovar
+        if _tokens._expired():
+            await asyncio.to_thread(_tokens.get)
+        return _auth_headers()
+
+    async def run():
+        runner, target = None, endpoint
+        if args.stand_in:
+            runner, target = await loadgen.start_stand_in()
+        needs_auth = config["type"] != "aca" and not args.stand_in
+        try:
+            records, duration = await loadgen.run_load(
+                lambda question: build_request(target, config, question),
+                questions, total,
+                concurrency=args.concurrency, rps=args.rps, timeout=args.timeout,
+                headers=auth_headers if needs_auth else None,
+            )
+        finally:
+            if runner is not None:
+                await runner.cleanup()
+        return records, duration, target
+
+    pacing = f"{args.rps} req/s (max {args.concurrency} em voo)" if args.rps else f"concorrencia {args.concurrency}"
+    print(f"Carga: {total} requisicoes, {pacing}, {len(questions)} perguntas distintas...")
+    records, duration, target = asyncio.run(run())
+    summary = loadgen.summarize(records, duration)
+    if config["type"] == "aca" and not summary["ok"] and any(
+        str(r["status"]).startswith("ClientConnector") for r in records
+    ):
+        _invalidate_endpoint(target)
+    summary.update(lesson=lesson_num, endpoint=target, concurrency=args.concurrency, rps=args.rps)
+    loadgen.print_report(summary, f"Carga - Lesson {lesson_num} - {config['description']}")
+    if args.output:
+        loadgen.export(args.output, summary, records)
+
+
 # ── Main ─────────────────────────────────────────────────────────
 
 def main():
@@ -220,7 +629,12 @@ def main():
             "  python chat.py --lesson 2              # Chat com agente hosted MAF\n"
             "  python chat.py --lesson 3              # Chat com agente hosted LangGraph\n"
             "  python chat.py --lesson 4              # ACA connected (auto-resolve)\n"
+            "  python chat.py --lesson 4 --refresh-endpoint   # ignora o cache de endpoints\n"
             '  python chat.py --lesson 1 --once "Qual a cotacao da PETR4?"\n'
+            "  python chat.py --lesson 3 --stream     # Streaming com TTFT e tempo total\n"
+            "  python chat.py --lesson 4 --load perguntas.txt --concurrency 8 --requests 200\n"
+            "  python chat.py --lesson 2 --load perguntas.txt --rps 5 --output carga.json\n"
+            "  python chat.py --lesson 4 --load perguntas.txt --stand-in   # servidor local\n"
         ),
     )
     parser.add_argument(
@@ -240,16 +654,51 @@ def main():
         metavar="MENSAGEM",
         help="Envia uma unica mensagem e encerra (modo nao-interativo)",
     )
+    parser.add_argument(
+        "--refresh-endpoint",
+        action="store_true",
+        help="Licao 4: ignora o cache de endpoints e resolve o FQDN via az CLI",
+    )
+    parser.add_argument(
+        "--history",
+        choices=HISTORY_MODES,
+        default="conversation",
+        help="Contexto entre turnos no Foundry: conversation (default), "
+             "previous_response (encadeia previous_response_id) ou none",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Imprime a resposta conforme chega (SSE) e mede TTFT e tempo total",
+    )
+    load = parser.add_argument_group("teste de carga")
+    load.add_argument(
+        "--load",
+        metavar="ARQUIVO",
+        help="Modo de carga: reenvia as perguntas do arquivo (uma por linha)",
+    )
+    load.add_argument("--concurrency", type=int, default=4, help="Requisicoes simultaneas (default: 4)")
+    load.add_argument("--rps", type=float, help="Taxa alvo em requisicoes/s (carga aberta)")
+    load.add_argument("--requests", type=int, help="Total de requisicoes (default: uma por pergunta)")
+    load.add_argument("--timeout", type=float, default=120.0, help="Timeout por requisicao em segundos")
+    load.add_argument("--output", metavar="ARQUIVO", help="Exporta o resultado (.json ou .csv)")
+    load.add_argument(
+        "--stand-in",
+        action="store_true",
+        help="Usa um servidor local que imita o agente (sem Azure)",
+    )
     args = parser.parse_args()
 
     config = LESSONS[args.lesson]
 
     # Resolver endpoint: ACA tem endpoint proprio, demais usam Foundry
     endpoint = args.endpoint
-    if config["type"] == "aca":
+    if args.load and args.stand_in:
+        endpoint = "stand-in"  # substituido pela URL do servidor local
+    elif config["type"] == "aca":
         endpoint = config.get("endpoint") or args.endpoint
         if not endpoint or endpoint == DEFAULT_ENDPOINT:
-            endpoint = _resolve_aca_endpoint(config["name"])
+            endpoint = _resolve_aca_endpoint(config["name"], refresh=args.refresh_endpoint)
 
     if not endpoint:
         print(
@@ -260,10 +709,15 @@ def main():
         )
         sys.exit(1)
 
-    if args.once:
-        single_query(endpoint, config, args.once)
-    else:
-        chat_loop(endpoint, args.lesson, config)
+    try:
+        if args.load:
+            load_mode(endpoint, args.lesson, config, args)
+        elif args.once:
+            single_query(endpoint, config, args.once, stream=args.stream)
+        else:
+            chat_loop(endpoint, args.lesson, config, stream=args.stream, history=args.history)
+    finally:
+        close_sessions()
 
 
 if __name__ == "__main__":
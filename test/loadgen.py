@@ -0,0 +1,266 @@
+"""
+Geracao de carga contra os agentes do workshop (modo --load do chat.py).
+
+Reenvia as perguntas de um arquivo (uma por linha) com concorrencia fixa
+(--concurrency) ou a uma taxa alvo (--rps), usando asyncio e um unico
+cliente HTTP com pool de conexoes (aiohttp), e reporta:
+
+- latencia p50/p90/p99 e tempo ate o primeiro byte (TTFB);
+- no modo --rps, a espera na fila antes do envio (a latencia e o TTFB
+  contam a partir do horario agendado, para nao esconder a fila quando o
+  servidor fica lento - "coordinated omission");
+- erros por status HTTP (timeouts e falhas de conexao incluidos);
+- throughput (requisicoes/s).
+
+O resultado pode ser exportado em JSON (resumo + requisicoes) ou CSV
+(uma linha por requisicao) com --output.
+
+Para validar o cenario sem Azure, --stand-in sobe no mesmo processo um
+servidor local que imita /chat (ACA) e /openai/responses (Foundry) com
+latencia configuravel. O mesmo servidor roda isolado com:
+
+    python loadgen.py --port 8099 --latency 0.3
+
+Uso (via chat.py):
+    python chat.py --lesson 4 --load perguntas.txt --concurrency 8 --requests 200
+    python chat.py --lesson 2 --load perguntas.txt --rps 5 --requests 100 --output carga.json
+    python chat.py --lesson 4 --load perguntas.txt --stand-in
+
+Requer: pip install aiohttp
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import random
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+PERCENTILES = (50, 90, 99)
+
+
+def load_questions(path):
+    """Perguntas do arquivo (uma por linha; linhas vazias e # sao ignoradas)."""
+    with open(path, encoding="utf-8") as f:
+        questions = [line.strip() for line in f]
+    return [q for q in questions if q and not q.startswith("#")]
+
+
+def percentile(sorted_values, p):
+    """Percentil com interpolacao linear sobre uma lista ja ordenada."""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+# ── Execucao ─────────────────────────────────────────────────────
+
+async def _send(session, build_request, headers, index, question, started, scheduled=None):
+    """Envia uma requisicao e mede TTFB (cabecalhos) e latencia total (corpo lido).
+
+    Com `scheduled` (carga aberta), os tempos contam a partir do horario em
+    que a requisicao deveria ter saido, e `queue_wait` registra quanto ela
+    esperou por uma vaga antes de ser enviada.
+    """
+    url, body = build_request(question)
+    record = {"index": index, "question": question, "start": 0.0, "queue_wait": 0.0,
+              "status": None, "ttfb": None, "latency": None, "bytes": 0}
+    sent = time.perf_counter()
+    t0 = sent if scheduled is None else scheduled
+    record["start"] = round(t0 - started, 4)
+    record["queue_wait"] = sent - t0
+    try:
+        async with session.post(url, json=body, headers=await headers()) as resp:
+            record["ttfb"] = time.perf_counter() - t0
+            record["status"] = resp.status
+            record["bytes"] = len(await resp.read())
+    except asyncio.TimeoutError:
+        record["status"] = "timeout"
+    except aiohttp.ClientError as exc:
+        record["status"] = type(exc).__name__
+    record["latency"] = time.perf_counter() - t0
+    return record
+
+
+async def run_load(build_request, questions, total, concurrency=4, rps=None,
+                   timeout=120.0, headers=None):
+    """Executa a carga e retorna (registros por requisicao, duracao em segundos).
+
+    Sem rps, `concurrency` workers enviam requisicoes em sequencia (carga
+    fechada). Com rps, as requisicoes sao disparadas a taxa fixa (carga
+    aberta) e `concurrency` limita quantas ficam em voo ao mesmo tempo; a
+    latencia inclui a espera por essa vaga.
+    """
+    if headers is None:
+        async def headers():
+            return {"Content-Type": "application/json"}
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    records = []
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        started = time.perf_counter()
+
+        async def one(i, scheduled=None):
+            question = questions[i % len(questions)]
+            records.append(await _send(session, build_request, headers, i, question,
+                                       started, scheduled))
+
+        if rps:
+            limit = asyncio.Semaphore(concurrency)
+
+            async def paced(i, scheduled):
+                async with limit:
+                    await one(i, scheduled)
+
+            tasks = []
+            for i in range(total):
+                scheduled = started + i / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(paced(i, scheduled)))
+            await asyncio.gather(*tasks)
+        else:
+            counter = iter(range(total))
+
+            async def worker():
+                for i in counter:
+                    await one(i)
+
+            await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+        duration = time.perf_counter() - started
+
+    records.sort(key=lambda r: r["index"])
+    return records, duration
+
+
+def summarize(records, duration):
+    """Resumo: percentis de latencia, TTFB e espera na fila, erros por status e throughput."""
+    ok = [r for r in records if r["status"] == 200]
+    latencies = sorted(r["latency"] for r in ok)
+    ttfbs = sorted(r["ttfb"] for r in ok)
+    by_status = {}
+    for r in records:
+        key = str(r["status"])
+        by_status[key] = by_status.get(key, 0) + 1
+
+    def dist(values):
+        stats = {f"p{p}": percentile(values, p) for p in PERCENTILES}
+        stats["mean"] = sum(values) / len(values) if values else None
+        stats["max"] = values[-1] if values else None
+        return stats
+
+    return {
+        "requests": len(records),
+        "ok": len(ok),
+        "errors": len(records) - len(ok),
+        "error_rate": (len(records) - len(ok)) / len(records) if records else 0.0,
+        "duration_s": duration,
+        "throughput_rps": len(records) / duration if duration else 0.0,
+        "ok_rps": len(ok) / duration if duration else 0.0,
+        "latency_s": dist(latencies),
+        "ttfb_s": dist(ttfbs),
+        "queue_wait_s": dist(sorted(r["queue_wait"] for r in records)),
+        "by_status": by_status,
+    }
+
+
+def print_report(summary, title):
+    def row(label, stats):
+        if stats["p50"] is None:
+            return f"  {label:<14} (sem respostas 200)"
+        cells = " | ".join(f"p{p} {stats[f'p{p}']:.3f}" for p in PERCENTILES)
+        return f"  {label:<14} {cells} | max {stats['max']:.3f}"
+
+    print()
+    print("=" * 60)
+    print(f"  {title}")
+    print("=" * 60)
+    print(f"  Requisicoes:   {summary['requests']} ({summary['ok']} ok, "
+          f"{summary['errors']} erros, {summary['error_rate']:.1%})")
+    print(f"  Duracao:       {summary['duration_s']:.2f}s")
+    print(f"  Throughput:    {summary['throughput_rps']:.2f} req/s "
+          f"({summary['ok_rps']:.2f} ok/s)")
+    print(row("Latencia (s):", summary["latency_s"]))
+    print(row("TTFB (s):", summary["ttfb_s"]))
+    if summary["queue_wait_s"]["max"]:
+        print(row("Fila (s):", summary["queue_wait_s"]))
+    statuses = ", ".join(f"{k}={v}" for k, v in sorted(summary["by_status"].items()))
+    print(f"  Status:        {statuses}")
+    print()
+
+
+def export(path, summary, records):
+    """Exporta em JSON (resumo + requisicoes) ou CSV (por requisicao), pela extensao."""
+    if path.lower().endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(records[0]) if records else ["index"])
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "requests": records}, f, ensure_ascii=False, indent=2)
+    print(f"Resultado exportado em {path}")
+
+
+# ── Servidor substituto local ────────────────────────────────────
+
+def create_stand_in_app(latency=0.3, error_rate=0.0):
+    """App aiohttp que imita /chat (ACA) e /openai/responses (Foundry)."""
+
+    async def answer(request):
+        await request.read()
+        await asyncio.sleep(max(0.0, random.gauss(latency, latency / 4)))
+        if random.random() < error_rate:
+            return web.json_response({"error": "stand-in"}, status=503)
+        return None
+
+    async def chat(request):
+        return await answer(request) or web.json_response(
+            {"response": "Resposta simulada.", "session_id": "stand-in"}
+        )
+
+    async def responses(request):
+        return await answer(request) or web.json_response({
+            "output": [{"type": "message", "content": [
+                {"type": "output_text", "text": "Resposta simulada."}
+            ]}],
+        })
+
+    app = web.Application()
+    app.router.add_post("/chat", chat)
+    app.router.add_post("/openai/responses", responses)
+    return app
+
+
+async def start_stand_in(latency=0.3, error_rate=0.0, port=0):
+    """Sobe o servidor substituto no event loop atual; retorna (runner, url)."""
+    runner = web.AppRunner(create_stand_in_app(latency, error_rate))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor substituto local para testes de carga")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.3, help="Latencia media (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracao de respostas 503")
+    args = parser.parse_args()
+    print(f"Servidor substituto em http://127.0.0.1:{args.port}", file=sys.stderr)
+    web.run_app(create_stand_in_app(args.latency, args.error_rate),
+                host="127.0.0.1", port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()